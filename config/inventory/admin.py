@@ -12,4 +12,12 @@ admin.site.register(ProfitLossReport)
 admin.site.register(Block)
 admin.site.register(Customer)
 admin.site.register(Order)
-admin.site.register(OrderItem)
\ No newline at end of file
+admin.site.register(OrderItem)
+admin.site.register(IdempotencyKey)
+admin.site.register(ItemStockTotal)
+admin.site.register(BlockDailyProfit)
+admin.site.register(DailySales)
+admin.site.register(ItemDailySales)
+admin.site.register(ItemSalesTotal)
+admin.site.register(OwnerLedger)
+admin.site.register(Job)
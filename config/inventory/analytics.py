@@ -0,0 +1,133 @@
+import calendar
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import OwnerLedger, ProfitLossReport
+from .rollups import TOP_SELLER_WINDOWS, block_profit, daily_sales, top_sellers
+
+
+# The dashboard widgets. Each function takes the tenant admin plus the
+# keyword arguments its parser reads from the query string, and returns the
+# payload its own endpoint serves. Parsers raise ValueError with a message
+# fit for the client.
+
+
+def no_parameters(params):
+    return {}
+
+
+def parse_date_range(params):
+    try:
+        return {
+            'start_date': date.fromisoformat(params['start']) if 'start' in params else None,
+            'end_date': date.fromisoformat(params['end']) if 'end' in params else None,
+        }
+    except ValueError:
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+
+
+def parse_top_sellers(params):
+    window = params.get('window', 'all')
+    if window not in TOP_SELLER_WINDOWS:
+        raise ValueError(f"Invalid window. Choose one of: {', '.join(TOP_SELLER_WINDOWS)}")
+    try:
+        k = int(params.get('k', 5))
+    except ValueError:
+        raise ValueError("k must be an integer")
+    if not 1 <= k <= 100:
+        raise ValueError("k must be between 1 and 100")
+    return {'window': window, 'k': k}
+
+
+def inventory_summary(owner):
+    ledger = OwnerLedger.objects.filter(owner=owner).first() or OwnerLedger()
+    return {
+        "total_items": ledger.on_hand + ledger.sold,
+        "total_sold": ledger.sold,
+        "total_unsold": ledger.on_hand,
+        "total_damaged": ledger.damaged,
+        "total_transferred": ledger.transferred,
+    }
+
+
+def block_profit_share(owner, start_date=None, end_date=None):
+    block_profits = list(block_profit(owner, start_date, end_date))
+    total_profit = sum((row['profit'] for row in block_profits), Decimal('0'))
+
+    data = []
+    for row in block_profits:
+        profit = row['profit']
+        percent = (profit / total_profit * 100) if total_profit > 0 else 0
+        data.append({
+            "block": row['block_name'],
+            "profit": round(profit, 2),
+            "percent": round(percent, 2),
+        })
+    return {"total_profit": round(total_profit, 2), "block_wise_data": data}
+
+
+def weekly_sales(owner):
+    today = timezone.localdate()
+    start_of_week = today - timedelta(days=today.weekday())
+    start_of_prev_week = start_of_week - timedelta(days=7)
+    sales = daily_sales(owner, start_of_prev_week, start_of_week + timedelta(days=6))
+
+    def series(name, start_date):
+        amounts = []
+        quantities = []
+        for i in range(7):
+            day = sales.get(start_date + timedelta(days=i), {"revenue": 0, "quantity": 0})
+            amounts.append(float(day["revenue"]))
+            quantities.append(day["quantity"])
+        return {
+            "name": name,
+            "data": amounts,
+            "quantity": quantities,
+            "total": round(sum(amounts), 2),
+            "total_quantity": sum(quantities),
+        }
+
+    return {
+        "categories": list(calendar.day_name),
+        "series": [series("Current Week", start_of_week), series("Previous Week", start_of_prev_week)],
+    }
+
+
+def top_selling_products(owner, window='all', k=5):
+    return [
+        {"item_name": item["item_name"], "sku": item["sku"], "quantity_sold": item["quantity_sold"]}
+        for item in top_sellers(owner, window, k)
+    ]
+
+
+def _profit_by(owner, field, label):
+    rows = (
+        ProfitLossReport.objects.filter(item__owner=owner).values(field)
+        .annotate(total_profit=Sum('profit'))
+        .filter(total_profit__gte=0).order_by(field)
+    )
+    return [{label: row[field], "profit": float(row['total_profit'] or 0)} for row in rows]
+
+
+def item_wise_profit(owner):
+    return _profit_by(owner, 'item__name', 'item')
+
+
+def category_wise_profit(owner):
+    return _profit_by(owner, 'item__category__name', 'category')
+
+
+Widget = namedtuple('Widget', 'function parse')
+
+WIDGETS = {
+    'summary': Widget(inventory_summary, no_parameters),
+    'top_selling_products': Widget(top_selling_products, parse_top_sellers),
+    'block_profit': Widget(block_profit_share, parse_date_range),
+    'weekly_sales': Widget(weekly_sales, no_parameters),
+    'item_wise_profit': Widget(item_wise_profit, no_parameters),
+    'category_wise_profit': Widget(category_wise_profit, no_parameters),
+}
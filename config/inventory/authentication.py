@@ -0,0 +1,126 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+
+# Claims that let a request be authenticated without loading the user.
+USER_TYPE_CLAIM = 'user_type'
+TENANT_CLAIM = 'tenant_id'
+
+_checked = {}
+_checked_lock = threading.Lock()
+
+
+class TenantRefreshToken(RefreshToken):
+    """
+    Refresh token that also carries the user's type and effective admin.
+
+    The access token minted from it copies both claims, which is what
+    TenantJWTAuthentication reads.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[USER_TYPE_CLAIM] = user.user_type
+        token[TENANT_CLAIM] = user.admin_owner_id if user.user_type == CustomUser.UserType.EMPLOYEE else user.pk
+        return token
+
+
+def _ttl():
+    return getattr(settings, 'JWT_PRINCIPAL_TTL', 30)
+
+
+def _principal(user_id, user_type, tenant_id):
+    """
+    A CustomUser holding only what the token says; every other field is
+    deferred and loaded on first access, like a .only() queryset. from_db
+    takes the values in the model's field order.
+    """
+    user = CustomUser.from_db(
+        DEFAULT_DB_ALIAS, ['id', 'user_type', 'is_active', 'admin_owner_id'],
+        [user_id, user_type, True, tenant_id if user_type == CustomUser.UserType.EMPLOYEE else None],
+    )
+    if user_type == CustomUser.UserType.EMPLOYEE and tenant_id is not None:
+        # Prime the relation so effective_admin does not query.
+        user.admin_owner = CustomUser.from_db(
+            DEFAULT_DB_ALIAS, ['id', 'user_type', 'is_active'], [tenant_id, CustomUser.UserType.ADMIN, True],
+        )
+    return user
+
+
+def _check(user_id, user_type, tenant_id):
+    """
+    Raise AuthenticationFailed if the user behind the claims has been
+    deleted, deactivated or moved to another tenant. The answer is kept
+    for JWT_PRINCIPAL_TTL seconds per process.
+    """
+    now = time.monotonic()
+    with _checked_lock:
+        entry = _checked.get(user_id)
+    if entry is None or now - entry[0] >= _ttl():
+        row = (
+            CustomUser.objects.filter(pk=user_id)
+            .values_list('is_active', 'user_type', 'admin_owner_id').first()
+        )
+        entry = (now, row)
+        with _checked_lock:
+            _checked[user_id] = entry
+
+    row = entry[1]
+    if row is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    is_active, current_type, admin_owner_id = row
+    if not is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    current_tenant = admin_owner_id if current_type == CustomUser.UserType.EMPLOYEE else user_id
+    if (current_type, current_tenant) != (user_type, tenant_id):
+        raise AuthenticationFailed(_("Token no longer matches the account; sign in again"), code="token_stale")
+
+
+def forget(user_id):
+    """Drop the cached account check, so the next request re-reads the user."""
+    with _checked_lock:
+        _checked.pop(user_id, None)
+
+
+def clear_checks():
+    with _checked_lock:
+        _checked.clear()
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds request.user from the token's claims.
+
+    Tokens from TenantRefreshToken name the user, its type and its effective
+    admin, so a request needs no user query and effective_admin needs no
+    admin_owner query. Whether the account is still active and in the same
+    tenant is checked against the database at most once per
+    JWT_PRINCIPAL_TTL seconds per user and process; a deactivated user is
+    locked out within that window, or at once in the process that saved the
+    change. Tokens without the claims, and every token while
+    CHECK_REVOKE_TOKEN is on, fall back to the usual lookup.
+    """
+
+    def get_user(self, validated_token):
+        claims = (USER_TYPE_CLAIM, TENANT_CLAIM)
+        if api_settings.CHECK_REVOKE_TOKEN or any(claim not in validated_token for claim in claims):
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_type = validated_token[USER_TYPE_CLAIM]
+        tenant_id = validated_token[TENANT_CLAIM]
+        _check(user_id, user_type, tenant_id)
+        return _principal(user_id, user_type, tenant_id)
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CACHE_HEADER = 'X-Cache'
+# Validators set by @conditional are stored with the entry, so a hit can
+# still answer If-None-Match without touching the database.
+STORED_HEADERS = ('ETag', 'Last-Modified')
+
+# Which cached catalog reads go stale when rows of each model change.
+NAMESPACES = ('categories', 'items', 'warehouses')
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'catalog')]
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _version_key(owner_id, namespace):
+    return f"catalog:{namespace}:{owner_id}:version"
+
+
+def _version(owner_id, namespace):
+    # Seeded from the clock rather than 1, so a version key that gets evicted
+    # comes back as a value no stale entry was ever stored under.
+    key = _version_key(owner_id, namespace)
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(owner_id, namespace):
+    key = _version_key(owner_id, namespace)
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(owner_id, *namespaces):
+    """
+    Drop the owner's cached catalog reads for `namespaces` (all by default).
+
+    Entries are never deleted one by one: the owner's version for the
+    namespace moves on and old keys simply stop being read until they
+    expire. The bump happens now, so the writer sees its own change, and
+    again on commit, so a read that cached the pre-commit rows in between
+    does not survive.
+    """
+    if owner_id is None:
+        return
+    namespaces = namespaces or NAMESPACES
+
+    def bump():
+        for namespace in namespaces:
+            _bump(owner_id, namespace)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _record(namespace, outcome):
+    with _stats_lock:
+        _stats[namespace][outcome] += 1
+
+
+def cache_stats():
+    """{namespace: {"hits", "misses"}} for this process."""
+    with _stats_lock:
+        return {namespace: dict(counts) for namespace, counts in _stats.items()}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _entry_key(request, namespace, owner_id, view, kwargs):
+    params = sorted((name, value) for name in request.query_params for value in request.query_params.getlist(name))
+    raw = repr((view, sorted(kwargs.items()), params))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"catalog:{namespace}:{owner_id}:{_version(owner_id, namespace)}:{digest}"
+
+
+def cached_catalog(namespace):
+    """
+    Cache successful GET responses of an APIView handler per tenant.
+
+    The key is the caller's effective admin, the view, its URL kwargs and the
+    query string, under the tenant's current version of `namespace`; writes
+    to the matching models bump that version (see signals.py). Responses
+    carry X-Cache: HIT or MISS. Put it above @conditional.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            owner = request.user.effective_admin
+            if owner is None:
+                return view_method(self, request, *args, **kwargs)
+
+            key = _entry_key(request, namespace, owner.id, type(self).__name__, kwargs)
+            cached = _cache().get(key)
+            if cached is not None:
+                _record(namespace, 'hits')
+                data, status_code, headers = cached
+                response = Response(data, status=status_code, headers=headers)
+                response[CACHE_HEADER] = 'HIT'
+                return get_conditional_response(request, etag=headers.get('ETag'), response=response)
+
+            _record(namespace, 'misses')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+                _cache().set(key, (response.data, response.status_code, headers), timeout=_timeout())
+            response[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,256 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import Category, Item
+from .write_queue import write_transaction
+
+FORMATS = ('csv', 'jsonl')
+COLUMNS = ('sku', 'name', 'category', 'unit_price', 'selling_price')
+# What to do with a row whose SKU the tenant already has.
+ON_CONFLICT = ('update', 'skip')
+UPDATE_FIELDS = ['name', 'category', 'unit_price', 'selling_price', 'updated_at']
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be read as the requested format at all."""
+
+
+def guess_format(file_name):
+    """'csv' or 'jsonl' from a file name's extension, or None."""
+    name = (file_name or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def _lines(stream):
+    # Decode a binary upload incrementally; a BOM from spreadsheet exports is dropped.
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def check_upload(upload, format):
+    """
+    Raise ImportFormatError unless `format` is known and, for CSV, the
+    header row has every column. Leaves the upload rewound.
+    """
+    if format not in FORMATS:
+        raise ImportFormatError(f"Unknown format {format!r}; use one of {', '.join(FORMATS)}")
+    if format == 'csv':
+        header = next(csv.reader([upload.readline().decode('utf-8-sig', errors='replace')]), [])
+        upload.seek(0)
+        missing = [column for column in COLUMNS if column not in header]
+        if missing:
+            raise ImportFormatError(f"CSV header is missing {', '.join(missing)}")
+
+
+def read_rows(stream, format):
+    """
+    Yield (line number, row dict or error message) from a binary CSV (with
+    a header row) or JSON Lines stream, one row at a time.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(_lines(stream))
+        if reader.fieldnames is None:
+            return
+        missing = [column for column in COLUMNS if column not in reader.fieldnames]
+        if missing:
+            raise ImportFormatError(f"CSV header is missing {', '.join(missing)}")
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for number, line in enumerate(_lines(stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, f"Invalid JSON: {exc}"
+                continue
+            yield number, row if isinstance(row, dict) else "Each line must be a JSON object"
+    else:
+        raise ImportFormatError(f"Unknown format {format!r}; use one of {', '.join(FORMATS)}")
+
+
+def _clean(row):
+    """The row's values converted and checked against the Item fields, or raise ValidationError."""
+    values, errors = {}, {}
+    for column in COLUMNS:
+        raw = row.get(column)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, ''):
+            errors[column] = ["This field is required."]
+            continue
+        field = Category._meta.get_field('name') if column == 'category' else Item._meta.get_field(column)
+        try:
+            values[column] = field.clean(str(raw), None)
+        except ValidationError as exc:
+            errors[column] = exc.messages
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+class CatalogImport:
+    """
+    Create or update one tenant's items (and their categories, by name)
+    from parsed rows, a chunk at a time.
+
+    Each chunk costs one SKU lookup, one category insert for names not
+    seen before, one bulk_create and one bulk_update, all in a single
+    transaction. Bad rows are reported and left out; they never abort the
+    import. SKUs are unique across tenants, so a SKU that belongs to
+    another tenant is a per-row error.
+    """
+
+    def __init__(self, owner, on_conflict='update', chunk_size=None, max_errors=None):
+        if on_conflict not in ON_CONFLICT:
+            raise ValueError(f"on_conflict must be one of {', '.join(ON_CONFLICT)}")
+        self.owner = owner
+        self.on_conflict = on_conflict
+        self.chunk_size = chunk_size or getattr(settings, 'CATALOG_IMPORT_CHUNK_SIZE', 1000)
+        self.max_errors = max_errors if max_errors is not None else getattr(settings, 'CATALOG_IMPORT_MAX_ERRORS', 1000)
+        self.categories = None
+        self.seen = set()
+        self.summary = {
+            'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0,
+            'categories_created': 0, 'errors': [],
+        }
+
+    def error(self, line, sku, errors):
+        self.summary['failed'] += 1
+        if len(self.summary['errors']) < self.max_errors:
+            self.summary['errors'].append({'line': line, 'sku': sku, 'errors': errors})
+
+    def run(self, rows):
+        """Import (line, row) pairs as produced by read_rows() and return the summary."""
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_size)):
+            self.import_chunk(chunk)
+        return self.summary
+
+    def import_chunk(self, chunk):
+        valid = []
+        for line, row in chunk:
+            self.summary['rows'] += 1
+            if isinstance(row, str):
+                self.error(line, None, {'row': [row]})
+                continue
+            try:
+                values = _clean(row)
+            except ValidationError as exc:
+                self.error(line, row.get('sku'), exc.message_dict)
+                continue
+            if values['sku'] in self.seen:
+                self.error(line, values['sku'], {'sku': ["Appears earlier in this import."]})
+                continue
+            self.seen.add(values['sku'])
+            valid.append((line, values))
+
+        if valid:
+            try:
+                self.write(valid)
+            except IntegrityError:
+                # Another writer took one of these SKUs between our lookup and
+                # the insert. Looking again usually sorts the chunk out; if it
+                # still conflicts, the chunk's rows are reported, not the import.
+                try:
+                    self.write(valid)
+                except IntegrityError as exc:
+                    for line, values in valid:
+                        self.error(line, values['sku'], {'row': [f"Could not be saved: {exc}"]})
+
+    def _resolve_categories(self, names):
+        if self.categories is None:
+            self.categories = {}
+            for pk, name in Category.objects.filter(owner=self.owner).order_by('-id').values_list('id', 'name'):
+                self.categories[name] = pk
+        new = sorted(set(names) - self.categories.keys())
+        if new:
+            created = Category.objects.bulk_create([Category(owner=self.owner, name=name) for name in new])
+            for category in created:
+                self.categories[category.name] = category.pk
+        return len(new)
+
+    def write(self, valid):
+        counts = dict.fromkeys(('created', 'updated', 'unchanged', 'skipped', 'categories_created'), 0)
+        errors = []
+        with write_transaction():
+            existing = {
+                item.sku: item
+                for item in Item.objects.filter(sku__in=[values['sku'] for _, values in valid]).only(
+                    'id', 'sku', 'owner', 'name', 'category', 'unit_price', 'selling_price',
+                )
+            }
+            rows = []
+            for line, values in valid:
+                item = existing.get(values['sku'])
+                if item is not None and item.owner_id != self.owner.id:
+                    errors.append((line, values['sku'], {'sku': ["Already used by another account."]}))
+                elif item is not None and self.on_conflict == 'skip':
+                    counts['skipped'] += 1
+                else:
+                    rows.append((item, values))
+
+            categories_before = None if self.categories is None else dict(self.categories)
+            try:
+                counts['categories_created'] = self._resolve_categories(values['category'] for _, values in rows)
+                to_create, to_update = [], []
+                now = timezone.now()
+                for item, values in rows:
+                    fields = {
+                        'name': values['name'], 'category_id': self.categories[values['category']],
+                        'unit_price': values['unit_price'], 'selling_price': values['selling_price'],
+                    }
+                    if item is None:
+                        to_create.append(Item(owner=self.owner, sku=values['sku'], **fields))
+                    elif any(getattr(item, name) != value for name, value in fields.items()):
+                        for name, value in fields.items():
+                            setattr(item, name, value)
+                        # bulk_update() skips auto_now; set it like save() would.
+                        item.updated_at = now
+                        to_update.append(item)
+                    else:
+                        counts['unchanged'] += 1
+                Item.objects.bulk_create(to_create)
+                Item.objects.bulk_update(to_update, UPDATE_FIELDS)
+            except IntegrityError:
+                # Rolled back; forget categories this attempt believed it created.
+                self.categories = categories_before
+                raise
+            counts['created'], counts['updated'] = len(to_create), len(to_update)
+
+            # Bulk writes send no signals, so the catalog cache is told here.
+            if to_create or to_update:
+                invalidate(self.owner.id, 'items')
+            if counts['categories_created']:
+                invalidate(self.owner.id, 'categories')
+
+        for key, value in counts.items():
+            self.summary[key] += value
+        for line, sku, messages in errors:
+            self.error(line, sku, messages)
+
+
+def import_catalog(stream, format, owner, **options):
+    """Import a binary CSV or JSON Lines stream into `owner`'s catalog. Returns the summary dict."""
+    return CatalogImport(owner, **options).run(read_rows(stream, format))
@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def _validators(model, owner_field, owner, lookups, related=()):
+    """(etag, last_modified) for the owner's rows of `model`, or None if there are none."""
+    stamps = {'last_modified': Max('updated_at')}
+    stamps.update({f'related_{number}': Max(f'{path}__updated_at') for number, path in enumerate(related)})
+    state = model.objects.filter(**{owner_field: owner}, **lookups).aggregate(
+        count=Count('pk', distinct=bool(related)), **stamps,
+    )
+    if not state['count']:
+        return None
+    last_modified = max(state[name] for name in stamps if state[name] is not None)
+    changed = ":".join(state[name].isoformat() if state[name] else '' for name in stamps)
+    raw = f"{model._meta.label}:{owner.pk}:{sorted(lookups.items())}:{changed}:{state['count']}"
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest()), last_modified.timestamp()
+
+
+def conditional(model, owner_field='owner', related=()):
+    """
+    ETag / Last-Modified support for an APIView GET handler.
+
+    The validators come from one max(updated_at) + count() query over the
+    caller's tenant rows of `model`, narrowed by the URL kwargs for detail
+    routes (pk=..., order_id=...). Responses that also render related rows
+    name them in `related` (e.g. 'customer', 'items__item'), and their
+    max(updated_at) joins the same query, so renaming an item changes the
+    tag of every order that shows it. A matching If-None-Match gets a 304 before
+    the handler runs, so nothing is fetched or serialized. Lists are only
+    answered from the ETag: a delete lowers the count but not
+    max(updated_at), so If-Modified-Since alone could wrongly report a list
+    as unchanged. The handler's query-string filters are not part of the
+    check; any change to the tenant's rows changes the tag.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            owner = request.user.effective_admin
+            if owner is None:
+                return view_method(self, request, *args, **kwargs)
+
+            validators = _validators(model, owner_field, owner, kwargs, related)
+            if validators is None:
+                return view_method(self, request, *args, **kwargs)
+            etag, last_modified = validators
+            is_detail = bool(kwargs)
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=int(last_modified) if is_detail else None,
+            )
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
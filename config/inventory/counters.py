@@ -0,0 +1,49 @@
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+
+def increment(model, key_fields, deltas, defaults=None):
+    """
+    Add to counter columns of `model`, creating missing rows first.
+
+    `deltas` maps a tuple of `key_fields` values to {field: amount}, and
+    `defaults` optionally maps the same keys to extra fields a new row needs.
+    Rows are created with one INSERT ... ON CONFLICT DO NOTHING, and all
+    counters are then bumped with a single UPDATE of the form
+    `field = field + CASE ...`, so concurrent writers never overwrite each
+    other.
+    """
+    if not deltas:
+        return
+
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key)), **(defaults or {}).get(key, {})) for key in deltas],
+        ignore_conflicts=True,
+    )
+
+    pk_name = model._meta.pk.attname
+    if tuple(key_fields) == (pk_name,):
+        pks = {key: key[0] for key in deltas}
+    else:
+        lookup = Q()
+        for key in deltas:
+            lookup |= Q(**dict(zip(key_fields, key)))
+        pks = {
+            tuple(row[1:]): row[0]
+            for row in model.objects.filter(lookup).values_list('pk', *key_fields)
+        }
+
+    fields = {field for amounts in deltas.values() for field in amounts}
+    updates = {}
+    for field in fields:
+        output_field = model._meta.get_field(field).clone()
+        updates[field] = F(field) + Case(
+            *[
+                When(pk=pks[key], then=Value(amounts[field], output_field=output_field))
+                for key, amounts in deltas.items()
+                if amounts.get(field)
+            ],
+            default=Value(0, output_field=output_field),
+            output_field=output_field,
+        )
+    model.objects.filter(pk__in=pks.values()).update(updated_at=timezone.now(), **updates)
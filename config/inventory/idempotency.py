@@ -0,0 +1,163 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .utils import error
+from .write_queue import write_transaction
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def _wait_timeout():
+    return getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+
+
+def _lease():
+    return getattr(settings, 'IDEMPOTENCY_LEASE', timedelta(minutes=2))
+
+
+class LeaseLost(Exception):
+    """Another request took the key over while this one was still running."""
+
+
+def _fingerprint(data):
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def purge_expired_keys():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def _claim(owner, key, request_hash):
+    """Return (record, created). Only one caller can create a given key."""
+    IdempotencyKey.objects.filter(owner=owner, key=key, expires_at__lte=timezone.now()).delete()
+    try:
+        with write_transaction():
+            record = IdempotencyKey.objects.create(
+                owner=owner,
+                key=key,
+                request_hash=request_hash,
+                expires_at=timezone.now() + _ttl(),
+                locked_until=timezone.now() + _lease(),
+            )
+        return record, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(owner=owner, key=key).first(), False
+
+
+def _take_over(record):
+    """
+    Claim a key whose request is still unfinished after its lease ran out,
+    which means its worker died mid-request (its transaction rolled back).
+    Only one retry can win; returns whether this one did.
+    """
+    if record.status_code is not None:
+        return False
+    now = timezone.now()
+    locked_until = now + _lease()
+    taken = IdempotencyKey.objects.filter(
+        Q(locked_until__lte=now) | Q(locked_until=None), pk=record.pk, status_code=None,
+    ).update(locked_until=locked_until, updated_at=now)
+    if taken:
+        record.locked_until = locked_until
+    return bool(taken)
+
+
+def _held(record):
+    return IdempotencyKey.objects.filter(pk=record.pk, locked_until=record.locked_until)
+
+
+def _wait_for_response(record):
+    deadline = time.monotonic() + _wait_timeout()
+    while record is not None and record.status_code is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def _replay(record):
+    response = Response(record.response, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Make an APIView handler safe to retry with an Idempotency-Key header.
+
+    The first request with a key runs the handler and stores its response in
+    the same transaction. Retries with the same key get that response replayed,
+    and a retry that arrives while the first is still running waits for it
+    instead of executing again. A request that outlives IDEMPOTENCY_LEASE
+    (a killed worker) no longer blocks the key: the next retry takes it over
+    and runs the handler, and the old request, should it still finish, can
+    no longer store its response and rolls back.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return error("Idempotency-Key must be at most 255 characters")
+
+        owner = request.user.effective_admin
+        request_hash = _fingerprint(request.data)
+        record, created = _claim(owner, key, request_hash)
+
+        if not created:
+            if record is None:
+                return error("Idempotency-Key expired, please retry", status_code=status.HTTP_409_CONFLICT)
+            if record.request_hash != request_hash:
+                return error(
+                    "Idempotency-Key was already used with a different request",
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            created = _take_over(record)
+
+        if not created:
+            record = _wait_for_response(record)
+            if record is None or record.status_code is None:
+                return error("A request with this Idempotency-Key is still in progress", status_code=status.HTTP_409_CONFLICT)
+            return _replay(record)
+
+        try:
+            with write_transaction():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    stored = _held(record).update(
+                        status_code=response.status_code,
+                        response=response.data,
+                        updated_at=timezone.now(),
+                    )
+                    if not stored:
+                        raise LeaseLost
+        except LeaseLost:
+            return error("A request with this Idempotency-Key is still in progress", status_code=status.HTTP_409_CONFLICT)
+        except Exception:
+            _held(record).delete()
+            raise
+
+        if response.status_code >= 500:
+            _held(record).delete()
+        return response
+
+    return wrapper
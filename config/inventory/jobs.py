@@ -0,0 +1,266 @@
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .catalog_import import ImportFormatError, import_catalog
+from .models import Job, job_output_storage
+from .reports import generate_profit_loss_reports, iter_csv, profit_loss_rows
+
+# kind -> function(job) returning a JSON-serialisable result. Register with @handler.
+HANDLERS = {}
+# kind -> exception classes that mean retrying cannot help; the job fails at once.
+PERMANENT_ERRORS = {}
+
+
+def handler(kind, permanent=()):
+    def register(function):
+        HANDLERS[kind] = function
+        PERMANENT_ERRORS[kind] = tuple(permanent)
+        return function
+    return register
+
+
+def concurrency_limit(kind):
+    return getattr(settings, 'JOB_CONCURRENCY', {}).get(kind, getattr(settings, 'JOB_DEFAULT_CONCURRENCY', 4))
+
+
+def retry_delay(attempts):
+    """Seconds before retry number `attempts`: JOB_RETRY_BACKOFF doubled per failed attempt, capped."""
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_RETRY_MAX_DELAY', 3600))
+
+
+def _lease():
+    return timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 3600))
+
+
+def enqueue(kind, payload=None, owner=None, run_at=None, max_attempts=3, unique_key=None):
+    """
+    Queue a job of a registered kind. With unique_key, enqueueing the same
+    key again returns the existing job instead of adding another.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    fields = {
+        'kind': kind, 'payload': payload or {}, 'owner': owner, 'run_at': run_at or timezone.now(),
+        'max_attempts': max_attempts,
+    }
+    if unique_key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(unique_key=unique_key, **fields)
+    except IntegrityError:
+        return Job.objects.get(unique_key=unique_key)
+
+
+def _running_counts():
+    return dict(
+        Job.objects.filter(status=Job.Status.RUNNING).values('kind').annotate(running=Count('id'))
+        .values_list('kind', 'running')
+    )
+
+
+def _within_limit(job_id, kind):
+    # Running jobs of a kind are ranked by when they started; whichever
+    # claims land past the limit give their job back. Every worker sees the
+    # same ranking, so two racing claims cannot both keep a last slot.
+    limit = concurrency_limit(kind)
+    first = Job.objects.filter(kind=kind, status=Job.Status.RUNNING).order_by('started_at', 'id')
+    return job_id in first.values_list('id', flat=True)[:limit]
+
+
+def claim(worker, kinds=None):
+    """
+    Take the next due job whose kind is under its concurrency limit and mark
+    it running for `worker`, or return None. Each step is a single
+    conditional UPDATE, so any number of workers can claim at once.
+    """
+    now = timezone.now()
+    running = _running_counts()
+    full = {kind for kind, count in running.items() if count >= concurrency_limit(kind)}
+    due = Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now).exclude(kind__in=full)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+
+    for job_id, kind in due.order_by('run_at', 'id').values_list('id', 'kind')[:50]:
+        if kind in full:
+            continue
+        claimed = Job.objects.filter(pk=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, worker=worker, started_at=now, lease_expires_at=now + _lease(),
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        if not claimed:
+            continue
+        if not _within_limit(job_id, kind):
+            Job.objects.filter(pk=job_id, worker=worker).update(
+                status=Job.Status.QUEUED, worker='', started_at=None, lease_expires_at=None,
+                attempts=F('attempts') - 1, updated_at=timezone.now(),
+            )
+            full.add(kind)
+            continue
+        return Job.objects.get(pk=job_id)
+    return None
+
+
+def _finish_attempt(job, error, retry=True):
+    """Requeue the job with backoff, or fail it once it has used all its attempts (or must not retry)."""
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        changes = {'status': Job.Status.QUEUED, 'run_at': now + timedelta(seconds=retry_delay(job.attempts))}
+    else:
+        changes = {'status': Job.Status.FAILED, 'finished_at': now}
+    return Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker).update(
+        error=error, lease_expires_at=None, updated_at=now, **changes,
+    )
+
+
+def renew_lease(job):
+    """Push the running job's lease JOB_LEASE_SECONDS ahead. Returns 0 once the job is no longer this worker's."""
+    now = timezone.now()
+    return Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker).update(
+        lease_expires_at=now + _lease(), updated_at=now,
+    )
+
+
+@contextmanager
+def _leased(job):
+    # Renew the lease a few times per lease period for as long as the job
+    # runs, so only a worker that died lets it expire and get reaped.
+    done = threading.Event()
+
+    def heartbeat():
+        try:
+            while not done.wait(_lease().total_seconds() / 3):
+                if not renew_lease(job):
+                    break
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def run(job):
+    """Run a claimed job and record its outcome. Returns the job's new status."""
+    function = HANDLERS.get(job.kind)
+    try:
+        if function is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        with _leased(job):
+            result = function(job)
+    except Exception as exc:
+        _finish_attempt(job, traceback.format_exc(), retry=not isinstance(exc, PERMANENT_ERRORS.get(job.kind, ())))
+    else:
+        now = timezone.now()
+        Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker).update(
+            status=Job.Status.SUCCEEDED, result=result, output=job.output.name or '', error='',
+            finished_at=now, lease_expires_at=None, updated_at=now,
+        )
+    return Job.objects.values_list('status', flat=True).get(pk=job.pk)
+
+
+def reap_expired():
+    """Treat running jobs whose lease ran out (their worker died) as a failed attempt."""
+    reaped = 0
+    for job in Job.objects.filter(status=Job.Status.RUNNING, lease_expires_at__lt=timezone.now()):
+        reaped += _finish_attempt(job, f"Lease expired while running on {job.worker or 'an unknown worker'}")
+    return reaped
+
+
+def purge_outputs(now=None):
+    """
+    Delete the output files of jobs that finished more than
+    JOB_OUTPUT_RETENTION_DAYS ago and clear them from the job. Returns how
+    many were removed.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=getattr(settings, 'JOB_OUTPUT_RETENTION_DAYS', 7))
+    purged = 0
+    expired = Job.objects.filter(
+        status__in=[Job.Status.SUCCEEDED, Job.Status.FAILED], finished_at__lt=cutoff,
+    ).exclude(output='')
+    for job in expired.only('id', 'output'):
+        job.output.delete(save=False)
+        purged += Job.objects.filter(pk=job.pk).update(output='', updated_at=timezone.now())
+    return purged
+
+
+def schedule_due(now=None):
+    """
+    Enqueue today's run of every JOB_SCHEDULES entry ((kind, "HH:MM") in
+    local time) once its time has passed. Runs missed while no worker was up
+    are not made up, except today's.
+    """
+    now = timezone.localtime(now)
+    enqueued = []
+    for kind, at in getattr(settings, 'JOB_SCHEDULES', []):
+        occurrence = timezone.make_aware(datetime.combine(now.date(), time.fromisoformat(at)))
+        if occurrence <= now:
+            enqueued.append(enqueue(kind, run_at=occurrence, unique_key=f"schedule:{kind}:{occurrence.isoformat()}"))
+    return enqueued
+
+
+def _day(value, default):
+    return date.fromisoformat(value) if value else default
+
+
+@handler('profit_loss_report')
+def profit_loss_report(job):
+    """
+    Profit & loss reports for payload start..end (default: the day before
+    the job was due, so the nightly run covers the day that just ended).
+    """
+    start = _day(job.payload.get('start'), timezone.localdate(job.run_at) - timedelta(days=1))
+    end = _day(job.payload.get('end'), start)
+    counts = generate_profit_loss_reports(start, end, workers=job.payload.get('workers', 1))
+    return {'items': {day.isoformat(): count for day, count in counts.items()}}
+
+
+@handler('profit_loss_export')
+def profit_loss_export(job):
+    """The owner's profit & loss CSV for payload start..end, saved as the job's output."""
+    start = _day(job.payload.get('start'), timezone.localdate())
+    end = _day(job.payload.get('end'), start)
+    compress = job.payload.get('compress', False)
+    file_name = f"profit_loss_report_{start}" + (f"_{end}" if end != start else "") + ".csv"
+    if compress:
+        file_name += ".gz"
+
+    with tempfile.TemporaryFile() as buffer:
+        for chunk in iter_csv(profit_loss_rows(job.owner, start, end), compress=compress):
+            buffer.write(chunk)
+        size = buffer.tell()
+        buffer.seek(0)
+        job.output.save(f"{job.pk}/{file_name}", File(buffer), save=False)
+    return {'file_name': file_name, 'bytes': size}
+
+
+@handler('catalog_import', permanent=(ImportFormatError,))
+def catalog_import(job):
+    """
+    Import the uploaded catalog file named in the payload into the owner's
+    catalog. The upload is removed whatever the outcome, so these jobs are
+    queued with a single attempt; a failed import is uploaded again.
+    """
+    storage = job_output_storage()
+    upload = job.payload['upload']
+    try:
+        with storage.open(upload, 'rb') as stream:
+            return import_catalog(
+                stream, job.payload['format'], job.owner, on_conflict=job.payload.get('on_conflict', 'update'),
+            )
+    finally:
+        storage.delete(upload)
@@ -0,0 +1,105 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import Block, Category, Customer, CustomUser, Inventory, Item, Order, OrderItem, WareHouseLocation
+from ...readers import BlockInventoryItemReader, CustomerReader, OrderReader
+from ...serializers import BlockInventoryItemSerializer, CustomerSerializer, OrderListSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, len(result)
+
+
+def _create_rows(rows, batch_size=5000):
+    admin = CustomUser.objects.create_user(
+        email=f"bench-{time.time_ns()}@example.com", password=None, name="Bench",
+        user_type=CustomUser.UserType.ADMIN,
+    )
+    category = Category.objects.create(owner=admin, name="Bench")
+    warehouse = WareHouseLocation.objects.create(owner=admin, name="Bench")
+    block = Block.objects.create(warehouse=warehouse, name="Bench", item_capacity=rows * 10)
+
+    items = Item.objects.bulk_create([
+        Item(owner=admin, name=f"Item {i}", sku=f"BENCH-{admin.id}-{i}", category=category,
+             unit_price=Decimal('5.00'), selling_price=Decimal('8.00'))
+        for i in range(rows)
+    ], batch_size=batch_size)
+    inventories = Inventory.objects.bulk_create([
+        Inventory(item=item, block=block, current_quantity=10) for item in items
+    ], batch_size=batch_size)
+    customers = Customer.objects.bulk_create([
+        Customer(owner=admin, customer_name=f"Customer {i}", customer_phone=str(i),
+                 customer_email=f"bench-{admin.id}-{i}@example.com", customer_address="Street")
+        for i in range(rows)
+    ], batch_size=batch_size)
+    orders = Order.objects.bulk_create([
+        Order(owner=admin, customer=customers[i], order_id=f"B{admin.id % 1000:03d}{i:06d}")
+        for i in range(rows)
+    ], batch_size=batch_size)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, inventory=inventories[i], item=items[i], quantity=1, selling_price=Decimal('8.00'))
+        for i, order in enumerate(orders)
+        for _ in range(2)
+    ], batch_size=batch_size)
+    return admin, block
+
+
+class Command(BaseCommand):
+    help = "Compare the DRF listing serializers with the values()-based readers at several row counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+
+    def handle(self, *args, **options):
+        header = f"{'listing':<16}{'rows':>8}{'serializer s':>14}{'reader s':>10}{'speedup':>9}"
+        self.stdout.write(header)
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    admin, block = _create_rows(rows)
+                    self._compare(admin, block, rows)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _compare(self, admin, block, rows):
+        orders = Order.objects.filter(owner=admin).order_by('-ordered_at', '-id')
+        customers = Customer.objects.filter(owner=admin).order_by('id')
+        inventories = Inventory.objects.filter(block=block).order_by('id')
+        order_reader = OrderReader()
+        customer_reader = CustomerReader()
+        block_reader = BlockInventoryItemReader()
+
+        cases = [
+            (
+                "orders",
+                lambda: OrderListSerializer(orders.select_related('customer').prefetch_related('items'), many=True).data,
+                lambda: order_reader.render(order_reader.values(orders, 'id')),
+            ),
+            (
+                "customers",
+                lambda: CustomerSerializer(customers, many=True).data,
+                lambda: customer_reader.render(customer_reader.values(customers)),
+            ),
+            (
+                "items in block",
+                lambda: BlockInventoryItemSerializer(
+                    inventories.select_related('item__category'), many=True
+                ).data,
+                lambda: block_reader.render(block_reader.values(inventories)),
+            ),
+        ]
+        for label, serializer, reader in cases:
+            serializer_time, _ = _timed(serializer)
+            reader_time, _ = _timed(reader)
+            speedup = serializer_time / reader_time if reader_time else float('inf')
+            self.stdout.write(f"{label:<16}{rows:>8}{serializer_time:>14.3f}{reader_time:>10.3f}{speedup:>8.1f}x")
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+
+from ...models import (
+    Block, Category, Customer, CustomUser, Inventory, Item, OwnerLedger, StockIn, StockOut, WareHouseLocation,
+)
+from ...orders import place_order
+from ...stock import StockError, stock_in
+from ...write_queue import queue
+from .verify_ledger import derive_ledgers
+
+MODES = ('default', 'production')
+INITIAL_QUANTITY = 1000
+
+
+def build_tenant(label, items):
+    """One tenant with `items` stocked inventories in a single roomy block, and a customer."""
+    with transaction.atomic():
+        admin = CustomUser.objects.create_user(
+            email=f"bench-{label}@example.com", password=None, name=f"Benchmark {label}",
+            user_type=CustomUser.UserType.ADMIN,
+        )
+        category = Category.objects.create(owner=admin, name="Benchmark")
+        warehouse = WareHouseLocation.objects.create(owner=admin, name="Benchmark")
+        block = Block.objects.create(
+            warehouse=warehouse, name="Benchmark", item_capacity=10 ** 9, used_capacity=INITIAL_QUANTITY * items,
+        )
+        customer = Customer.objects.create(
+            owner=admin, customer_name="Benchmark", customer_phone="0", customer_email=f"bench-{label}@example.com",
+            customer_address="Benchmark",
+        )
+        inventories = []
+        for i in range(items):
+            item = Item.objects.create(
+                owner=admin, name=f"Benchmark {i}", sku=f"BENCH-{label}-{i}", category=category,
+                unit_price=5, selling_price=8,
+            )
+            inventories.append(Inventory.objects.create(item=item, block=block, current_quantity=INITIAL_QUANTITY))
+        OwnerLedger.objects.create(owner=admin, on_hand=INITIAL_QUANTITY * items)
+    for inventory in inventories:
+        inventory.item = Item.objects.get(pk=inventory.item_id)
+    return admin, customer, inventories
+
+
+def run_workload(admin, customer, inventories, threads, operations, seed):
+    """
+    Place orders and receive stock from several threads at once, half and
+    half. A write that fails with a database error is counted as lost, not
+    retried, which is what a request would have done.
+    """
+    lock = threading.Lock()
+    latencies = []
+    totals = {"orders": 0, "stock_ins": 0, "rejected": 0, "lost": 0, "sold": 0, "received": 0}
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        timings = []
+        counts = dict.fromkeys(totals, 0)
+        try:
+            for _ in range(operations):
+                started = time.perf_counter()
+                try:
+                    if rng.random() < 0.5:
+                        lines = [
+                            {'inventory_id': inventory.id, 'quantity': 1, 'selling_price': 8}
+                            for inventory in rng.sample(inventories, min(len(inventories), rng.randint(1, 3)))
+                        ]
+                        place_order(admin, admin, customer, lines)
+                        counts["orders"] += 1
+                        counts["sold"] += len(lines)
+                    else:
+                        quantity = rng.randint(1, 3)
+                        stock_in(rng.choice(inventories), quantity, admin, 5)
+                        counts["stock_ins"] += 1
+                        counts["received"] += quantity
+                except StockError:
+                    counts["rejected"] += 1
+                except OperationalError:
+                    counts["lost"] += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(timings)
+            for key, value in counts.items():
+                totals[key] += value
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    totals.update({
+        "elapsed_seconds": round(elapsed, 3),
+        "writes_per_second": round((totals["orders"] + totals["stock_ins"]) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2) if latencies else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+    })
+    return totals
+
+
+def check_tenant(admin, inventories, result):
+    """Whether the tenant's counters agree with each other and with what the workload reported."""
+    on_hand = Inventory.objects.filter(item__owner=admin).aggregate(total=Sum('current_quantity'))['total']
+    ledger = OwnerLedger.objects.get(owner=admin)
+    derived = derive_ledgers()[admin.id]
+    expected = INITIAL_QUANTITY * len(inventories) + result["received"] - result["sold"]
+    received = StockIn.objects.filter(inventory__item__owner=admin).aggregate(total=Sum('quantity'))['total'] or 0
+    sold = StockOut.objects.filter(inventory__item__owner=admin, reason='sale').aggregate(total=Sum('quantity'))['total'] or 0
+    return (
+        on_hand == expected == ledger.on_hand == derived['on_hand']
+        and ledger.sold == derived['sold'] == sold == result["sold"]
+        and received == result["received"]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite modes under concurrent order placement and stock-in. For every mode, a fresh "
+        "database file is migrated and several worker processes, each running several threads, write to it "
+        "at once; the report gives throughput, latency, lost writes and whether the counters still agree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES), help="Comma-separated INVENTORY_SQLITE_MODE values")
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=4, help="Per process")
+        parser.add_argument('--operations', type=int, default=100, help="Per thread")
+        parser.add_argument('--items', type=int, default=20, help="Inventories per worker tenant")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        # Internal: run one worker process against the configured database.
+        parser.add_argument('--worker', type=int, default=None, help=argparse.SUPPRESS)
+        parser.add_argument('--start-at', type=float, default=0, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker'] is not None:
+            return self.run_worker(options)
+
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+        report = {
+            'processes': options['processes'], 'threads': options['threads'],
+            'operations_per_thread': options['operations'], 'modes': {},
+        }
+        for mode in modes:
+            report['modes'][mode] = self.run_mode(mode, options)
+            result = report['modes'][mode]
+            self.stdout.write(
+                f"{mode:<11} {result['writes_per_second']:>8} writes/s  p50 {result['p50_ms']} ms  "
+                f"p99 {result['p99_ms']} ms  lost {result['lost']}  "
+                f"{'consistent' if result['consistent'] else 'INCONSISTENT'}"
+            )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
+
+    def run_mode(self, mode, options):
+        manage = str(Path(settings.BASE_DIR) / 'manage.py')
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'DATABASE_URL': os.path.join(directory, 'benchmark.sqlite3'),
+                'DATABASE_REPLICA_URLS': '',
+                'INVENTORY_SQLITE_MODE': mode,
+            }
+            subprocess.run([sys.executable, manage, 'migrate', '-v', '0'], env=env, check=True)
+
+            start_at = time.time() + 2 + options['processes'] * 0.5
+            common = [
+                '--threads', str(options['threads']), '--operations', str(options['operations']),
+                '--items', str(options['items']), '--seed', str(options['seed']), '--start-at', str(start_at),
+            ]
+            workers = [
+                subprocess.Popen(
+                    [sys.executable, manage, 'benchmark_sqlite_modes', '--worker', str(number), *common],
+                    env=env, stdout=subprocess.PIPE, text=True,
+                )
+                for number in range(options['processes'])
+            ]
+            results = []
+            for worker in workers:
+                stdout, _ = worker.communicate()
+                if worker.returncode:
+                    raise CommandError(f"A {mode} worker failed with exit code {worker.returncode}")
+                results.append(json.loads(stdout))
+
+        combined = {key: sum(result[key] for result in results) for key in ('orders', 'stock_ins', 'rejected', 'lost')}
+        elapsed = max(result['elapsed_seconds'] for result in results)
+        combined.update({
+            'elapsed_seconds': elapsed,
+            'writes_per_second': round((combined['orders'] + combined['stock_ins']) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': statistics.median(result['p50_ms'] for result in results if result['p50_ms'] is not None),
+            'p99_ms': max((result['p99_ms'] for result in results if result['p99_ms'] is not None), default=None),
+            'consistent': all(result['consistent'] for result in results),
+            'queue_wait_seconds': round(sum(result['queue_wait_seconds'] for result in results), 3),
+            'workers': results,
+        })
+        return combined
+
+    def run_worker(self, options):
+        label = f"{options['worker']}-{os.getpid()}"
+        admin, customer, inventories = build_tenant(label, options['items'])
+        connection.close()
+        time.sleep(max(0.0, options['start_at'] - time.time()))
+
+        result = run_workload(
+            admin, customer, inventories, options['threads'], options['operations'], options['seed'] + options['worker'],
+        )
+        result['consistent'] = check_tenant(admin, inventories, result)
+        result['queue_wait_seconds'] = round(queue.waited_seconds, 3)
+        self.stdout.write(json.dumps(result))
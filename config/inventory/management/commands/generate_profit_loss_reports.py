@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...reports import generate_profit_loss_reports, usable_workers
+
+
+class Command(BaseCommand):
+    help = "Generate profit & loss reports for a day or a date range (for backfills and recomputation)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day, YYYY-MM-DD (default: today)")
+        parser.add_argument('--end', help="Last day, YYYY-MM-DD (default: same as --start)")
+        parser.add_argument('--workers', type=int, default=1, help="Days processed in parallel")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else timezone.now().date()
+            end = date.fromisoformat(options['end']) if options['end'] else start
+        except ValueError as exc:
+            raise CommandError(exc)
+        if end < start:
+            raise CommandError("--end must not be before --start")
+
+        if usable_workers(options['workers']) < options['workers']:
+            self.stderr.write("SQLite outside INVENTORY_SQLITE_MODE=production allows one writer; using 1 worker.")
+        results = generate_profit_loss_reports(start, end, workers=options['workers'])
+        for day, item_count in sorted(results.items()):
+            self.stdout.write(f"{day}: {item_count} items")
+        self.stdout.write(self.style.SUCCESS(f"Generated reports for {len(results)} days."))
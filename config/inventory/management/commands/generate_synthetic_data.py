@@ -0,0 +1,285 @@
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ... import rollups
+from ...reports import generate_profit_loss_reports
+from ...models import (
+    Block, Category, Customer, CustomUser, Inventory, Item, ItemStockTotal, Order, OrderItem, OwnerLedger,
+    StockIn, StockOut, WareHouseLocation,
+)
+
+GENERATED_MODELS = [
+    CustomUser, WareHouseLocation, Block, Category, Item, Inventory, ItemStockTotal, Customer,
+    Order, OrderItem, StockIn, StockOut, OwnerLedger,
+]
+DOMAIN = "synthetic.test"
+BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+@contextmanager
+def explicit_timestamps(models):
+    """
+    Let bulk_create keep the timestamps set on the objects instead of
+    stamping them with now(), so generated history can span many days.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def order_code(seed, tenant, number):
+    """A 10-character order id unique per (seed, tenant, number)."""
+    value = ((seed % 1000) * 1000 + tenant) * 10 ** 8 + number
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(BASE36[remainder])
+    return ''.join(reversed(digits)).rjust(10, '0')
+
+
+def stamps(moment):
+    return {'created_at': moment, 'updated_at': moment}
+
+
+class TenantGenerator:
+    def __init__(self, seed, tenant, options, password, end):
+        self.seed = seed
+        self.tenant = tenant
+        self.options = options
+        self.password = password
+        self.end = end
+        self.start = end - timedelta(days=options['days'])
+        self.rng = random.Random(f"{seed}:{tenant}")
+        self.batch_size = options['batch_size']
+        self.counts = defaultdict(int)
+
+    def _create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] += len(created)
+        return created
+
+    def _moment(self):
+        return self.start + timedelta(seconds=self.rng.randrange(int((self.end - self.start).total_seconds())))
+
+    def generate(self):
+        rng = self.rng
+        options = self.options
+        label = f"t{self.tenant}.s{self.seed}"
+
+        admin, = self._create(CustomUser, [CustomUser(
+            email=f"admin.{label}@{DOMAIN}", name=f"Tenant {self.tenant} admin", password=self.password,
+            user_type=CustomUser.UserType.ADMIN, is_verified=True, date_joined=self.start,
+        )])
+        self._create(CustomUser, [
+            CustomUser(
+                email=f"employee{i}.{label}@{DOMAIN}", name=f"Employee {i}", password=self.password,
+                user_type=CustomUser.UserType.EMPLOYEE, admin_owner=admin, date_joined=self.start,
+            )
+            for i in range(options['employees'])
+        ])
+
+        warehouses = self._create(WareHouseLocation, [
+            WareHouseLocation(owner=admin, name=f"Warehouse {i}", address=f"{i} Depot Road", **stamps(self.start))
+            for i in range(options['warehouses'])
+        ])
+        categories = self._create(Category, [
+            Category(owner=admin, name=f"Category {i}", **stamps(self.start))
+            for i in range(options['categories'])
+        ])
+        items = []
+        for i in range(options['items']):
+            unit_price = Decimal(rng.randint(100, 10000)) / 100
+            items.append(Item(
+                owner=admin, name=f"Item {i}", sku=f"{label}-{i}".upper(), category=rng.choice(categories),
+                unit_price=unit_price,
+                selling_price=(unit_price * Decimal(rng.randint(110, 180)) / 100).quantize(Decimal('0.01')),
+                **stamps(self.start),
+            ))
+        items = self._create(Item, items)
+
+        # Place every item in one to three distinct blocks, then size blocks to fit.
+        block_slots = [(w, b) for w in range(len(warehouses)) for b in range(options['blocks_per_warehouse'])]
+        placements = []
+        used = defaultdict(int)
+        for item in items:
+            for slot in rng.sample(block_slots, min(len(block_slots), rng.randint(1, 3))):
+                quantity = rng.randint(0, 200)
+                placements.append((item, slot, quantity))
+                used[slot] += quantity
+
+        blocks = self._create(Block, [
+            Block(
+                warehouse=warehouses[w], name=f"Block {w}-{b}",
+                item_capacity=used[(w, b)] + rng.randint(100, 2000), used_capacity=used[(w, b)],
+                **stamps(self.start),
+            )
+            for w, b in block_slots
+        ])
+        block_by_slot = dict(zip(block_slots, blocks))
+        inventories = self._create(Inventory, [
+            Inventory(item=item, block=block_by_slot[slot], current_quantity=quantity, **stamps(self.start))
+            for item, slot, quantity in placements
+        ])
+
+        stock_totals = defaultdict(int)
+        for inventory in inventories:
+            stock_totals[inventory.item_id] += inventory.current_quantity
+        self._create(ItemStockTotal, [
+            ItemStockTotal(item_id=item.id, total_quantity=stock_totals[item.id], **stamps(self.end))
+            for item in items
+        ])
+
+        customers = self._create(Customer, [
+            Customer(
+                owner=admin, customer_name=f"Customer {i}", customer_phone=f"{rng.randrange(10 ** 9, 10 ** 10)}",
+                customer_email=f"customer{i}.{label}@{DOMAIN}", customer_address=f"{i} Market Street",
+                **stamps(self.start),
+            )
+            for i in range(options['customers'])
+        ])
+
+        items_by_id = {item.id: item for item in items}
+        sold = self._generate_orders(admin, customers, inventories, items_by_id)
+
+        # One opening stock-in per inventory covers both what is on hand and what was sold since.
+        self._create(StockIn, [
+            StockIn(
+                inventory=inventory, quantity=inventory.current_quantity + sold[inventory.id],
+                cost_price=items_by_id[inventory.item_id].unit_price, added_by=admin,
+                date=self.start, **stamps(self.start),
+            )
+            for inventory in inventories
+            if inventory.current_quantity + sold[inventory.id]
+        ])
+        self._create(OwnerLedger, [OwnerLedger(
+            owner=admin, on_hand=sum(stock_totals.values()), sold=sum(sold.values()), **stamps(self.end),
+        )])
+        return self.counts
+
+    def _generate_orders(self, admin, customers, inventories, items_by_id):
+        rng = self.rng
+        sold = defaultdict(int)
+        if not customers or not inventories:
+            return sold
+
+        total = self.options['orders']
+        for first in range(0, total, self.batch_size):
+            numbers = range(first, min(first + self.batch_size, total))
+            moments = sorted(self._moment() for _ in numbers)
+            orders = self._create(Order, [
+                Order(
+                    owner=admin, order_id=order_code(self.seed, self.tenant, number),
+                    customer=rng.choice(customers), status='confirmed', ordered_at=moment, **stamps(moment),
+                )
+                for number, moment in zip(numbers, moments)
+            ])
+
+            order_items = []
+            stock_outs = []
+            for order in orders:
+                lines = rng.sample(inventories, min(len(inventories), rng.randint(1, self.options['max_lines'])))
+                for inventory in lines:
+                    quantity = rng.randint(1, 5)
+                    sold[inventory.id] += quantity
+                    item = items_by_id[inventory.item_id]
+                    order_items.append(OrderItem(
+                        order=order, inventory=inventory, item=item, quantity=quantity,
+                        selling_price=item.selling_price, date=order.ordered_at, **stamps(order.ordered_at),
+                    ))
+                    stock_outs.append(StockOut(
+                        inventory=inventory, quantity=quantity, reason='sale', removed_by=admin,
+                        date=order.ordered_at, **stamps(order.ordered_at),
+                    ))
+            self._create(OrderItem, order_items)
+            self._create(StockOut, stock_outs)
+        return sold
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert deterministic synthetic tenants (users, warehouses, blocks, catalog, stock, customers, "
+        "orders and their ledgers) in bulk. The same seed always produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--tenants', type=int, default=2)
+        parser.add_argument('--employees', type=int, default=3, help="Per tenant")
+        parser.add_argument('--warehouses', type=int, default=3, help="Per tenant")
+        parser.add_argument('--blocks-per-warehouse', type=int, default=10)
+        parser.add_argument('--categories', type=int, default=20, help="Per tenant")
+        parser.add_argument('--items', type=int, default=1000, help="Per tenant")
+        parser.add_argument('--customers', type=int, default=1000, help="Per tenant")
+        parser.add_argument('--orders', type=int, default=10000, help="Per tenant")
+        parser.add_argument('--max-lines', type=int, default=4, help="Most lines in one order")
+        parser.add_argument('--days', type=int, default=90, help="Days of order history")
+        parser.add_argument('--end-date', type=datetime.fromisoformat, default=None,
+                            help="Last day of the history (default today); fix it to reproduce a dataset exactly")
+        parser.add_argument('--password', default="synthetic", help="Password of every generated user")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--report-days', type=int, default=7,
+                            help="Generate profit & loss reports for this many trailing days")
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help="Do not rebuild the sales rollups and reports afterwards")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['tenants'] <= 1000:
+            raise CommandError("--tenants must be between 1 and 1000")
+        if options['orders'] >= 10 ** 8:
+            raise CommandError("--orders must be below 100,000,000 per tenant")
+        if options['warehouses'] < 1 or options['blocks_per_warehouse'] < 1 or options['categories'] < 1:
+            raise CommandError("Every tenant needs at least one warehouse, block and category")
+
+        end = options['end_date'] or datetime.combine(timezone.localdate(), datetime.min.time())
+        end = timezone.make_aware(end) if timezone.is_naive(end) else end
+        password = make_password(options['password'])
+        seed = options['seed']
+        if CustomUser.objects.filter(email=f"admin.t0.s{seed}@{DOMAIN}").exists():
+            raise CommandError(f"Seed {seed} has already been generated in this database")
+
+        totals = defaultdict(int)
+        started = time.perf_counter()
+        with explicit_timestamps(GENERATED_MODELS):
+            for tenant in range(options['tenants']):
+                with transaction.atomic():
+                    counts = TenantGenerator(seed, tenant, options, password, end).generate()
+                for model, count in counts.items():
+                    totals[model] += count
+                self.stdout.write(f"Tenant {tenant}: {sum(counts.values())} rows")
+
+        if not options['skip_rollups']:
+            for rebuild in (
+                rollups.rebuild_block_daily_profit, rollups.rebuild_daily_sales,
+                rollups.rebuild_item_daily_sales, rollups.rebuild_item_sales_totals,
+            ):
+                with transaction.atomic():
+                    rebuild(batch_size=options['batch_size'])
+            if options['report_days'] > 0:
+                last_day = timezone.localdate(end)
+                generate_profit_loss_reports(last_day - timedelta(days=options['report_days'] - 1), last_day)
+
+        elapsed = time.perf_counter() - started
+        for model, count in sorted(totals.items()):
+            self.stdout.write(f"  {model:<18}{count:>12}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(totals.values())} rows for {options['tenants']} tenants in {elapsed:.1f}s "
+            f"(admin logins: admin.t<N>.s{seed}@{DOMAIN} / {options['password']})"
+        ))
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...catalog_import import FORMATS, ON_CONFLICT, ImportFormatError, guess_format, import_catalog
+from ...models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Import items into a tenant's catalog from a CSV (with a header row) or JSON Lines file with "
+        "sku, name, category, unit_price and selling_price. Categories are matched by name and created "
+        "when missing; bad rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--admin', required=True, help="Email of the tenant admin who will own the items")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument('--on-conflict', choices=ON_CONFLICT, default='update',
+                            help="What to do with SKUs the tenant already has")
+        parser.add_argument('--chunk-size', type=int, help="Rows per transaction (default: CATALOG_IMPORT_CHUNK_SIZE)")
+        parser.add_argument('--output', help="Also write the JSON summary, with every reported error, to this file")
+
+    def handle(self, *args, **options):
+        admin = CustomUser.objects.filter(user_type=CustomUser.UserType.ADMIN, email=options['admin']).first()
+        if admin is None:
+            raise CommandError(f"No tenant admin with email {options['admin']}")
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format")
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                summary = import_catalog(
+                    stream, format, admin, on_conflict=options['on_conflict'], chunk_size=options['chunk_size'],
+                )
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(exc)
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(summary, handle, indent=2)
+                handle.write('\n')
+        for error in summary['errors'][:20]:
+            self.stderr.write(f"line {error['line']} ({error['sku']}): {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['rows']} rows: {summary['created']} created, {summary['updated']} updated, "
+            f"{summary['unchanged']} unchanged, {summary['skipped']} skipped, {summary['failed']} failed; "
+            f"{summary['categories_created']} categories created."
+        ))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ...models import Inventory, Item, ItemStockTotal
+
+
+class Command(BaseCommand):
+    help = "Recompute per-item stock totals from Inventory, one chunk of items at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        rebuilt = 0
+
+        while True:
+            item_ids = list(
+                Item.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not item_ids:
+                break
+
+            totals = dict(
+                Inventory.objects.filter(item_id__in=item_ids)
+                .values('item_id')
+                .annotate(total=Sum('current_quantity'))
+                .values_list('item_id', 'total')
+            )
+            now = timezone.now()
+            with transaction.atomic():
+                ItemStockTotal.objects.bulk_create(
+                    [
+                        ItemStockTotal(
+                            item_id=item_id,
+                            total_quantity=totals.get(item_id) or 0,
+                            created_at=now,
+                            updated_at=now,
+                        )
+                        for item_id in item_ids
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['item'],
+                    update_fields=['total_quantity', 'updated_at'],
+                )
+
+            rebuilt += len(item_ids)
+            last_id = item_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stock totals for {rebuilt} items."))
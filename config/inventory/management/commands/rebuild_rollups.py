@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ... import rollups
+
+
+class Command(BaseCommand):
+    help = "Regenerate the sales rollup tables from the full OrderItem history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rebuilds = [
+            ("block daily profit", rollups.rebuild_block_daily_profit),
+            ("daily sales", rollups.rebuild_daily_sales),
+            ("item daily sales", rollups.rebuild_item_daily_sales),
+            ("item sales total", rollups.rebuild_item_sales_totals),
+        ]
+        for label, rebuild in rebuilds:
+            with transaction.atomic():
+                created = rebuild(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} {label} rows."))
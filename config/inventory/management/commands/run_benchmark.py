@@ -0,0 +1,323 @@
+import csv
+import inspect
+import io
+import itertools
+import json
+import platform
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import connection, connections
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+
+from ...authentication import TenantRefreshToken
+from ...middleware import QueryTimer
+from ...models import Block, Category, Customer, CustomUser, Inventory, Item, Order, WareHouseLocation
+
+ROUTE_ARGUMENT = re.compile(r'<(?:\w+:)?(\w+)>')
+
+# Where the URL kwargs of each routed GET handler come from.
+PATH_SAMPLES = {
+    ('ItemDetailAPIView', 'pk'): 'item',
+    ('WareHouseLocationAPIView', 'pk'): 'warehouse',
+    ('EmployeeDetailAPIView', 'pk'): 'employee',
+    ('CreateOrderAPIView', 'order_id'): 'order',
+    ('ItemsInBlockAPIView', 'block_id'): 'block',
+}
+QUERY_SAMPLES = {
+    'ItemByCategoryAPIView': {'category_id': 'category'},
+}
+# Views a tenant admin cannot call, so measuring them would time a 403.
+OPERATOR_ONLY = {'MetricsAPIView'}
+
+
+def _check_inventory(samples, n):
+    inventory = samples['stocked']
+    return inventory and {'data': {'item_id': inventory['item_id'], 'quantity': 1}, 'content_type': 'application/json'}
+
+
+def _stock_in(samples, n):
+    inventory = samples['roomy']
+    return inventory and {
+        'data': {'item_id': inventory['item_id'], 'block_id': inventory['block_id'], 'quantity': 1},
+        'content_type': 'application/json',
+    }
+
+
+def _bulk_stock_in(samples, n):
+    inventory = samples['roomy']
+    return inventory and {
+        'data': {'items': [{'item_id': inventory['item_id'], 'block_id': inventory['block_id'], 'quantity': 1}]},
+        'content_type': 'application/json',
+    }
+
+
+def _create_order(samples, n):
+    inventory, customer = samples['stocked'], samples['customer']
+    return inventory and customer and {
+        'data': {
+            'customer': customer,
+            'items': [{'inventory_id': inventory['id'], 'quantity': 1, 'selling_price': str(inventory['price'])}],
+        },
+        'content_type': 'application/json',
+    }
+
+
+def _catalog_import(samples, n):
+    if samples['category_name'] is None:
+        return None
+    content = io.StringIO()
+    writer = csv.writer(content)
+    writer.writerow(['sku', 'name', 'category', 'unit_price', 'selling_price'])
+    for row in range(20):
+        writer.writerow([f"BENCH-{samples['run']}-{n}-{row}", f"Benchmark {row}", samples['category_name'], '1.00', '2.00'])
+    return {'data': {'file': SimpleUploadedFile('catalog.csv', content.getvalue().encode())}}
+
+
+# POST handlers on the stock, order and catalog write paths, and how to build
+# the Client.post kwargs of request number n from the tenant's data (None
+# when the tenant has nothing to build them from). Stock and order writes
+# move a single unit, so a run of a few hundred requests barely changes
+# the tenant; each import adds 20 new items.
+WRITE_SCENARIOS = {
+    'InventoryCheckAPIView': _check_inventory,
+    'UpdateInventoryAPIView': _stock_in,
+    'BulkStockInAPIView': _bulk_stock_in,
+    'CreateOrderAPIView': _create_order,
+    'CatalogImportAPIView': _catalog_import,
+}
+
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern), pattern
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _samples(admin):
+    order = Order.objects.filter(owner=admin).order_by('-ordered_at').values_list('order_id', flat=True).first()
+    return {
+        'item': Item.objects.filter(owner=admin).values_list('id', flat=True).first(),
+        'category': Category.objects.filter(owner=admin).values_list('id', flat=True).first(),
+        'warehouse': WareHouseLocation.objects.filter(owner=admin).values_list('id', flat=True).first(),
+        'block': Block.objects.filter(warehouse__owner=admin).values_list('id', flat=True).first(),
+        'employee': CustomUser.objects.filter(admin_owner=admin).values_list('id', flat=True).first(),
+        'order': order,
+        'stocked': (
+            Inventory.objects.filter(item__owner=admin, current_quantity__gt=0)
+            .order_by('-current_quantity', 'id')
+            .values('id', 'item_id', 'block_id', price=F('item__selling_price')).first()
+        ),
+        'roomy': (
+            Inventory.objects.filter(item__owner=admin, block__free_capacity__gt=0)
+            .order_by('-block__free_capacity', 'id')
+            .values('id', 'item_id', 'block_id').first()
+        ),
+        'customer': (
+            Customer.objects.filter(owner=admin)
+            .values('customer_name', 'customer_phone', 'customer_email', 'customer_address').first()
+        ),
+        'category_name': Category.objects.filter(owner=admin).values_list('name', flat=True).first(),
+        'run': int(time.time()),
+    }
+
+
+def discover_endpoints(admin, writes=True):
+    """
+    (route, method, url, query, body) for every GET route under api/ that
+    can be filled from the tenant's data, and with `writes` for the POST
+    routes in WRITE_SCENARIOS. `body(n)` gives request n's Client.post
+    kwargs; it is None for GETs.
+    """
+    samples = _samples(admin)
+    endpoints = []
+    skipped = []
+    for route, pattern in _walk(get_resolver().url_patterns):
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if not route.startswith('api/') or view_class is None:
+            continue
+        name = view_class.__name__
+        if name in OPERATOR_ONLY:
+            skipped.append({'route': route, 'reason': "operators only"})
+            continue
+        if writes and name in WRITE_SCENARIOS and not pattern.pattern.converters and hasattr(view_class, 'post'):
+            scenario = WRITE_SCENARIOS[name]
+            if scenario(samples, 0) is None:
+                skipped.append({'route': route, 'reason': "no sample data for its POST body"})
+            else:
+                endpoints.append((route, 'POST', '/' + route, {}, lambda n, scenario=scenario: scenario(samples, n)))
+        if not hasattr(view_class, 'get'):
+            continue
+        params = list(inspect.signature(view_class.get).parameters.values())[2:]
+        converters = pattern.pattern.converters
+        required = {param.name for param in params if param.default is inspect.Parameter.empty}
+        if not set(converters) <= {param.name for param in params} or not required <= set(converters):
+            skipped.append({'route': route, 'reason': "GET handler does not match the route's arguments"})
+            continue
+
+        kwargs = {}
+        for kwarg in converters:
+            value = samples.get(PATH_SAMPLES.get((name, kwarg)))
+            if value is None:
+                break
+            kwargs[kwarg] = value
+        query = {param: samples.get(source) for param, source in QUERY_SAMPLES.get(name, {}).items()}
+        if len(kwargs) != len(converters) or None in query.values():
+            skipped.append({'route': route, 'reason': "no sample data for its arguments"})
+            continue
+
+        url = '/' + ROUTE_ARGUMENT.sub(lambda match: str(kwargs[match.group(1)]), route)
+        endpoints.append((route, 'GET', url, query, None))
+    return endpoints, skipped
+
+
+class Command(BaseCommand):
+    help = (
+        "Call every GET endpoint, and the POST endpoints of the stock, order and catalog write paths, "
+        "in-process with the Django test client from several threads and report p50/p95/p99 latency and "
+        "query counts per route as JSON. Writes change the tenant; use --read-only to leave it as it is."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admin', help="Email of the tenant admin to authenticate as "
+                                            "(default: the admin with the most items)")
+        parser.add_argument('--requests', type=int, default=50, help="Measured requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=2, help="Unmeasured requests per endpoint first")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the request interleaving")
+        parser.add_argument('--label', default='', help="Free text stored in the report, e.g. a commit id")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+        parser.add_argument('--read-only', action='store_true', help="Benchmark GET endpoints only")
+
+    def handle(self, *args, **options):
+        admins = CustomUser.objects.filter(user_type=CustomUser.UserType.ADMIN)
+        if options['admin']:
+            admin = admins.filter(email=options['admin']).first()
+        else:
+            admin = admins.annotate(items=Count('item')).order_by('-items', 'id').first()
+        if admin is None:
+            raise CommandError("No tenant admin to benchmark with; run generate_synthetic_data first")
+        if options['requests'] < 1:
+            raise CommandError("--requests must be at least 1")
+
+        endpoints, skipped = discover_endpoints(admin, writes=not options['read_only'])
+        token = str(TenantRefreshToken.for_user(admin).access_token)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+        numbers = itertools.count(1)
+
+        def call(client, url, query, body):
+            # Built before the clock starts, with a fresh number so imports add new SKUs.
+            post = body(next(numbers)) if body else None
+            timer = QueryTimer()
+            started = time.perf_counter()
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                if post is None:
+                    response = client.get(url, query, **headers)
+                else:
+                    response = client.post(url, **post, **headers)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            return response.status_code, time.perf_counter() - started, timer.count
+
+        warmup_client = Client(raise_request_exception=False)
+        for _ in range(options['warmup']):
+            for _, _, url, query, body in endpoints:
+                call(warmup_client, url, query, body)
+
+        tasks = [index for index in range(len(endpoints)) for _ in range(options['requests'])]
+        random.Random(options['seed']).shuffle(tasks)
+        results = defaultdict(list)
+        lock = threading.Lock()
+
+        def worker(chunk):
+            client = Client(raise_request_exception=False)
+            measured = []
+            try:
+                for index in chunk:
+                    _, _, url, query, body = endpoints[index]
+                    measured.append((index, *call(client, url, query, body)))
+            finally:
+                connection.close()
+            with lock:
+                for index, *result in measured:
+                    results[index].append(result)
+
+        concurrency = max(1, options['concurrency'])
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=worker, args=(tasks[offset::concurrency],))
+            for offset in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = {
+            'label': options['label'],
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'tenant': admin.email,
+            'requests_per_endpoint': options['requests'],
+            'concurrency': concurrency,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_rps': round(len(tasks) / elapsed, 1) if elapsed else None,
+            'endpoints': [],
+            'skipped': skipped,
+        }
+        for index, (route, method, url, query, _) in enumerate(endpoints):
+            samples = results[index]
+            latencies = [seconds * 1000 for _, seconds, _ in samples]
+            queries = [count for _, _, count in samples]
+            statuses = defaultdict(int)
+            for status_code, _, _ in samples:
+                statuses[str(status_code)] += 1
+            report['endpoints'].append({
+                'route': route,
+                'method': method,
+                'url': url,
+                'query': query,
+                'requests': len(samples),
+                'status_codes': dict(statuses),
+                'p50_ms': round(_percentile(latencies, 50), 3),
+                'p95_ms': round(_percentile(latencies, 95), 3),
+                'p99_ms': round(_percentile(latencies, 99), 3),
+                'mean_ms': round(statistics.fmean(latencies), 3),
+                'queries_median': statistics.median(queries),
+                'queries_max': max(queries),
+            })
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f"Benchmarked {len(endpoints)} endpoints ({len(skipped)} skipped) in {elapsed:.1f}s; "
+                f"report written to {options['output']}"
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ...jobs import claim, purge_outputs, reap_expired, run, schedule_due
+
+# Seconds between sweeps for job outputs past their retention.
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the job table: enqueue scheduled runs, requeue jobs whose worker died, "
+        "delete old job outputs, and execute due jobs on a few threads until stopped (or once with --once)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help="Jobs run at once by this worker")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between looks for due jobs")
+        parser.add_argument('--kinds', default='', help="Comma-separated job kinds to take (default: all)")
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}")
+        parser.add_argument('--once', action='store_true', help="Run every job that is due now, then exit")
+
+    def handle(self, *args, **options):
+        kinds = [kind for kind in options['kinds'].split(',') if kind]
+        worker_id = options['worker_id']
+
+        if options['once']:
+            schedule_due()
+            reap_expired()
+            purge_outputs()
+            while (job := claim(worker_id, kinds)) is not None:
+                self.report(job, run(job))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        def work(number):
+            name = f"{worker_id}/{number}"
+            try:
+                while not stop.is_set():
+                    job = claim(name, kinds)
+                    if job is None:
+                        stop.wait(options['poll_interval'])
+                        continue
+                    self.report(job, run(job))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(number,)) for number in range(max(1, options['threads']))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Worker {worker_id} running {len(threads)} threads")
+
+        last_purge = None
+        while not stop.is_set():
+            schedule_due()
+            reaped = reap_expired()
+            if reaped:
+                self.stdout.write(f"Requeued {reaped} jobs whose lease expired")
+            if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL:
+                purged = purge_outputs()
+                if purged:
+                    self.stdout.write(f"Deleted {purged} job outputs past their retention")
+                last_purge = time.monotonic()
+            stop.wait(options['poll_interval'])
+
+        # Running jobs finish before the worker exits.
+        for thread in threads:
+            thread.join()
+        self.stdout.write("Worker stopped")
+
+    def report(self, job, status):
+        self.stdout.write(f"{job.kind} #{job.pk} attempt {job.attempts}/{job.max_attempts}: {status}")
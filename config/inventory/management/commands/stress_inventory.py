@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from ...models import Block, Category, CustomUser, Inventory, Item, WareHouseLocation
+from ...stock import StockError, stock_in, stock_out
+
+
+def run_contention(inventory, user, threads=8, operations=200, max_quantity=3, seed=0):
+    """
+    Hammer one inventory from several threads with random stock-ins and
+    stock-outs. Returns the net change every successful operation reported and
+    the throughput, so callers can compare it with what the database holds.
+    """
+    lock = threading.Lock()
+    totals = {"net": 0, "succeeded": 0, "rejected": 0, "retried": 0}
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        net = succeeded = rejected = retried = 0
+        try:
+            for _ in range(operations):
+                quantity = rng.randint(1, max_quantity)
+                adding = rng.random() < 0.5
+                while True:
+                    try:
+                        if adding:
+                            stock_in(inventory, quantity, user, 0)
+                        else:
+                            stock_out(inventory, quantity, 'transfer', user)
+                    except StockError:
+                        rejected += 1
+                    except OperationalError:
+                        # SQLite reports lock contention instead of blocking.
+                        retried += 1
+                        time.sleep(0.001)
+                        continue
+                    else:
+                        succeeded += 1
+                        net += quantity if adding else -quantity
+                    break
+        finally:
+            connection.close()
+        with lock:
+            totals["net"] += net
+            totals["succeeded"] += succeeded
+            totals["rejected"] += rejected
+            totals["retried"] += retried
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals["elapsed"] = elapsed
+    totals["ops_per_second"] = (totals["succeeded"] + totals["rejected"]) / elapsed if elapsed else 0.0
+    return totals
+
+
+class Command(BaseCommand):
+    help = "Run concurrent stock-ins and stock-outs against one inventory and check that no update is lost."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=200, help="Operations per thread")
+        parser.add_argument('--capacity', type=int, default=500)
+        parser.add_argument('--initial', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            admin = CustomUser.objects.create_user(
+                email=f"stress-{time.time_ns()}@example.com",
+                password=None,
+                name="Stress test",
+                user_type=CustomUser.UserType.ADMIN,
+            )
+            category = Category.objects.create(owner=admin, name="Stress")
+            item = Item.objects.create(
+                owner=admin, name="Stress item", sku=f"STRESS-{admin.id}",
+                category=category, unit_price=0, selling_price=0,
+            )
+            warehouse = WareHouseLocation.objects.create(owner=admin, name="Stress")
+            block = Block.objects.create(
+                warehouse=warehouse, name="Stress",
+                item_capacity=options['capacity'], used_capacity=options['initial'],
+            )
+            inventory = Inventory.objects.create(item=item, block=block, current_quantity=options['initial'])
+
+        try:
+            result = run_contention(
+                inventory, admin,
+                threads=options['threads'],
+                operations=options['operations'],
+                seed=options['seed'],
+            )
+            inventory.refresh_from_db()
+            block.refresh_from_db()
+            expected = options['initial'] + result['net']
+
+            self.stdout.write(
+                f"{result['succeeded']} succeeded, {result['rejected']} rejected, "
+                f"{result['retried']} retried in {result['elapsed']:.2f}s "
+                f"({result['ops_per_second']:.0f} ops/s)"
+            )
+            if inventory.current_quantity != expected or block.used_capacity != expected:
+                self.stderr.write(self.style.ERROR(
+                    f"Lost updates: expected {expected}, inventory has {inventory.current_quantity}, "
+                    f"block has {block.used_capacity}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"No lost updates, final quantity {expected}"))
+        finally:
+            admin.delete()
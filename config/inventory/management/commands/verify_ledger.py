@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ...models import Inventory, OwnerLedger, StockOut
+from ...stock import LEDGER_FIELDS
+
+COUNTERS = ['on_hand', 'sold', 'damaged', 'transferred']
+
+
+def derive_ledgers():
+    """Recompute every tenant's counters from Inventory and the StockOut ledger."""
+    ledgers = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    on_hand = (
+        Inventory.objects.filter(item__owner__isnull=False)
+        .values('item__owner_id')
+        .annotate(total=Sum('current_quantity'))
+        .order_by()
+    )
+    for row in on_hand:
+        ledgers[row['item__owner_id']]['on_hand'] = row['total'] or 0
+
+    removed = (
+        StockOut.objects.filter(inventory__item__owner__isnull=False)
+        .values('inventory__item__owner_id', 'reason')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    for row in removed:
+        field = LEDGER_FIELDS.get(row['reason'])
+        if field:
+            ledgers[row['inventory__item__owner_id']][field] = row['total'] or 0
+
+    return ledgers
+
+
+class Command(BaseCommand):
+    help = "Re-derive each tenant's ledger counters from the stock ledger and report (or fix) drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Overwrite drifted counters with the derived values")
+
+    def handle(self, *args, **options):
+        derived = derive_ledgers()
+        stored = {
+            row['owner_id']: row
+            for row in OwnerLedger.objects.values('owner_id', *COUNTERS)
+        }
+
+        mismatched = []
+        for owner_id in sorted(set(derived) | set(stored)):
+            expected = derived.get(owner_id, dict.fromkeys(COUNTERS, 0))
+            actual = stored.get(owner_id, dict.fromkeys(COUNTERS, 0))
+            diff = {field: (actual[field], expected[field]) for field in COUNTERS if actual[field] != expected[field]}
+            if diff:
+                mismatched.append(owner_id)
+                details = ", ".join(f"{field} {have} != {want}" for field, (have, want) in diff.items())
+                self.stdout.write(self.style.WARNING(f"Owner {owner_id}: {details}"))
+
+        if mismatched and options['fix']:
+            now = timezone.now()
+            with transaction.atomic():
+                OwnerLedger.objects.bulk_create(
+                    [
+                        OwnerLedger(
+                            owner_id=owner_id, created_at=now, updated_at=now,
+                            **derived.get(owner_id, dict.fromkeys(COUNTERS, 0))
+                        )
+                        for owner_id in mismatched
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['owner'],
+                    update_fields=[*COUNTERS, 'updated_at'],
+                )
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(mismatched)} ledgers."))
+        elif mismatched:
+            self.stdout.write(self.style.ERROR(f"{len(mismatched)} ledgers drifted; rerun with --fix to repair."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All ledgers match the stock ledger."))
@@ -0,0 +1,145 @@
+import bisect
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+
+from .cache import cache_stats
+
+
+# Upper bounds, in seconds, of the request latency histogram.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _RouteStats:
+    __slots__ = ('buckets', 'latency_sum', 'sampled', 'queries', 'query_seconds')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.sampled = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class Registry:
+    """
+    In-process request metrics, keyed by (route, method).
+
+    Every request is counted by status code. Latency and SQL figures are
+    only recorded for sampled requests, so the histogram count is the number
+    of sampled requests, not of all requests. Each worker process keeps its
+    own registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._routes = defaultdict(_RouteStats)
+
+    def count(self, route, method, status_code):
+        with self._lock:
+            self._requests[(route, method, status_code)] += 1
+
+    def observe(self, route, method, seconds, queries, query_seconds):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._routes[(route, method)]
+            stats.buckets[index] += 1
+            stats.latency_sum += seconds
+            stats.sampled += 1
+            stats.queries += queries
+            stats.query_seconds += query_seconds
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._routes.clear()
+
+    def snapshot(self):
+        with self._lock:
+            requests = dict(self._requests)
+            routes = {
+                key: (list(stats.buckets), stats.latency_sum, stats.sampled, stats.queries, stats.query_seconds)
+                for key, stats in self._routes.items()
+            }
+        return requests, routes
+
+
+registry = Registry()
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus():
+    """The registry and the catalog cache counters in Prometheus text format."""
+    requests, routes = registry.snapshot()
+    lines = [
+        '# HELP inventory_http_requests_total Requests handled, by route, method and status.',
+        '# TYPE inventory_http_requests_total counter',
+    ]
+    for (route, method, status_code), value in sorted(requests.items()):
+        lines.append(f'inventory_http_requests_total{_labels(route=route, method=method, status=status_code)} {value}')
+
+    lines += [
+        '# HELP inventory_http_request_duration_seconds Latency of sampled requests.',
+        '# TYPE inventory_http_request_duration_seconds histogram',
+    ]
+    for (route, method), (buckets, latency_sum, sampled, _, _) in sorted(routes.items()):
+        cumulative = 0
+        for bound, value in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+            cumulative += value
+            lines.append(
+                f'inventory_http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}'
+            )
+        lines.append(f'inventory_http_request_duration_seconds_sum{_labels(route=route, method=method)} {latency_sum}')
+        lines.append(f'inventory_http_request_duration_seconds_count{_labels(route=route, method=method)} {sampled}')
+
+    lines += [
+        '# HELP inventory_db_queries_total SQL queries run by sampled requests.',
+        '# TYPE inventory_db_queries_total counter',
+    ]
+    lines += [
+        f'inventory_db_queries_total{_labels(route=route, method=method)} {stats[3]}'
+        for (route, method), stats in sorted(routes.items())
+    ]
+    lines += [
+        '# HELP inventory_db_query_seconds_total Time spent in SQL by sampled requests.',
+        '# TYPE inventory_db_query_seconds_total counter',
+    ]
+    lines += [
+        f'inventory_db_query_seconds_total{_labels(route=route, method=method)} {stats[4]}'
+        for (route, method), stats in sorted(routes.items())
+    ]
+
+    cache = cache_stats()
+    lines += [
+        '# HELP inventory_catalog_cache_requests_total Catalog cache lookups, by namespace and outcome.',
+        '# TYPE inventory_catalog_cache_requests_total counter',
+    ]
+    for namespace, counts in sorted(cache.items()):
+        for outcome in ('hits', 'misses'):
+            lines.append(
+                f'inventory_catalog_cache_requests_total{_labels(namespace=namespace, outcome=outcome)} {counts[outcome]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+class CanScrapeMetrics(BasePermission):
+    """
+    Metrics cover every tenant, so they are for operators only: staff
+    accounts, or a scraper sending METRICS_TOKEN in the X-Metrics-Token
+    header. Tenant admins sign themselves up and get neither.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_authenticated and request.user.is_staff:
+            return True
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        return bool(token) and constant_time_compare(request.headers.get('X-Metrics-Token', ''), token)
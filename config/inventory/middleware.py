@@ -0,0 +1,88 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+from .routers import mark_written, tracking_writes
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and the time spent running them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    # The route pattern rather than the path keeps label cardinality bounded.
+    return match.route if match is not None else 'unmatched'
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per-route request counts, latency and SQL usage in metrics.registry.
+
+    METRICS_SAMPLE_RATE (0..1, default 1) is the share of requests whose
+    latency and queries are measured; the rest are only counted. Latency is
+    measured until the response is returned, so a streamed body is not
+    included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        if sample_rate < 1 and random.random() >= sample_rate:
+            response = self.get_response(request)
+            registry.count(_route(request), request.method, response.status_code)
+            return response
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        route = _route(request)
+        registry.count(route, request.method, response.status_code)
+        registry.observe(route, request.method, elapsed, timer.count, timer.seconds)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica routing: when a request writes to the
+    primary, its tenant's @replica_reads handlers stay on the primary for
+    the next REPLICA_STICKY_SECONDS, long enough for the replicas to catch
+    up. Runs after the view, so it sees the user DRF authenticated.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracking_writes() as wrote:
+            response = self.get_response(request)
+            written = wrote()
+        if written and getattr(settings, 'DATABASE_REPLICAS', ()):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                owner = user.effective_admin
+                mark_written(owner.pk if owner is not None else None)
+        return response
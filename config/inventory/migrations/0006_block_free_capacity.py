@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:09
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_customer_owner_order_owner_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='block',
+            name='free_capacity',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('item_capacity'), '-', models.F('used_capacity')), output_field=models.IntegerField()),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('shipped', 'Shipped'), ('confirmed', 'Confirmed')], default='confirmed', max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(fields=['warehouse', 'free_capacity'], name='block_wh_free_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_item_stock_totals(apps, schema_editor):
+    # Existing items start from their current stock, not 0. A frozen copy of
+    # what rebuild_item_stock_totals does, against the models as of this migration.
+    Inventory = apps.get_model('inventory', 'Inventory')
+    Item = apps.get_model('inventory', 'Item')
+    ItemStockTotal = apps.get_model('inventory', 'ItemStockTotal')
+
+    totals = dict(
+        Inventory.objects.exclude(item=None)
+        .values('item_id')
+        .annotate(total=Sum('current_quantity'))
+        .order_by()
+        .values_list('item_id', 'total')
+    )
+    ItemStockTotal.objects.bulk_create(
+        [
+            ItemStockTotal(item_id=item_id, total_quantity=totals.get(item_id) or 0)
+            for item_id in Item.objects.values_list('id', flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStockTotal',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_total', serialize=False, to='inventory.item')),
+                ('total_quantity', models.IntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_item_stock_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_itemstocktotal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profitlossreport',
+            name='generated_on',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    # The weekly chart reads only DailySales; start it from every past order
+    # line instead of zeros. Uses this migration's models, not inventory.rollups.
+    DailySales = apps.get_model('inventory', 'DailySales')
+    OrderItem = apps.get_model('inventory', 'OrderItem')
+
+    days = (
+        OrderItem.objects.filter(order__owner__isnull=False)
+        .values('order__owner_id', day=TruncDate('date'))
+        .annotate(
+            revenue=Sum(ExpressionWrapper(
+                F('selling_price') * F('quantity'), output_field=DecimalField(max_digits=15, decimal_places=2),
+            )),
+            units=Sum('quantity'),
+        )
+        .order_by()
+    )
+    DailySales.objects.bulk_create(
+        [
+            DailySales(owner_id=day['order__owner_id'], day=day['day'], revenue=day['revenue'], quantity=day['units'])
+            for day in days
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_blockdailyprofit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'day'), name='unique_daily_sales')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
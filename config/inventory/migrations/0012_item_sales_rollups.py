@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:16
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_item_sales(apps, schema_editor):
+    """
+    Load past order lines into both item rollups, which top-selling products
+    reads exclusively. One grouped pass gives the per-day rows; the all-time
+    totals are their sums. Written against this migration's models only.
+    """
+    ItemDailySales = apps.get_model('inventory', 'ItemDailySales')
+    ItemSalesTotal = apps.get_model('inventory', 'ItemSalesTotal')
+    OrderItem = apps.get_model('inventory', 'OrderItem')
+
+    rows = (
+        OrderItem.objects.filter(order__owner__isnull=False, item__isnull=False)
+        .values('item_id', 'order__owner_id', day=TruncDate('date'))
+        .annotate(
+            units=Sum('quantity'),
+            revenue=Sum(ExpressionWrapper(
+                F('selling_price') * F('quantity'), output_field=DecimalField(max_digits=15, decimal_places=2),
+            )),
+        )
+        .order_by()
+    )
+    daily = []
+    totals = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
+    for row in rows:
+        daily.append(ItemDailySales(
+            owner_id=row['order__owner_id'], item_id=row['item_id'], day=row['day'],
+            quantity=row['units'], revenue=row['revenue'],
+        ))
+        total = totals[row['item_id']]
+        total['owner_id'] = row['order__owner_id']
+        total['quantity'] += row['units']
+        total['revenue'] += row['revenue']
+
+    ItemDailySales.objects.bulk_create(daily, batch_size=1000)
+    ItemSalesTotal.objects.bulk_create(
+        [ItemSalesTotal(item_id=item_id, **total) for item_id, total in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_dailysales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.item')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'day'], name='item_sales_owner_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'day'), name='unique_item_daily_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemSalesTotal',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_total', serialize=False, to='inventory.item')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_sales_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-quantity'], name='item_sales_owner_qty_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_item_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+# StockOut.reason -> ledger counter, as the stock service mapped them when
+# this migration was written.
+REMOVAL_COUNTERS = {'sale': 'sold', 'damage': 'damaged', 'transfer': 'transferred'}
+
+
+def backfill_ledgers(apps, schema_editor):
+    """
+    Start every existing tenant's ledger from its current stock and past
+    stock-outs. Without it the summary reads 0 on hand and the first sale
+    takes the counter negative.
+    """
+    Inventory = apps.get_model('inventory', 'Inventory')
+    OwnerLedger = apps.get_model('inventory', 'OwnerLedger')
+    StockOut = apps.get_model('inventory', 'StockOut')
+    ledgers = {}
+
+    on_hand = (
+        Inventory.objects.filter(item__owner__isnull=False)
+        .values_list('item__owner_id')
+        .annotate(total=Sum('current_quantity'))
+        .order_by()
+    )
+    for owner_id, total in on_hand:
+        ledgers.setdefault(owner_id, OwnerLedger(owner_id=owner_id)).on_hand = total or 0
+
+    removed = (
+        StockOut.objects.filter(inventory__item__owner__isnull=False, reason__in=REMOVAL_COUNTERS)
+        .values_list('inventory__item__owner_id', 'reason')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    for owner_id, reason, total in removed:
+        setattr(ledgers.setdefault(owner_id, OwnerLedger(owner_id=owner_id)), REMOVAL_COUNTERS[reason], total or 0)
+
+    OwnerLedger.objects.bulk_create(ledgers.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_item_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerLedger',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('on_hand', models.IntegerField(default=0)),
+                ('sold', models.PositiveIntegerField(default=0)),
+                ('damaged', models.PositiveIntegerField(default=0)),
+                ('transferred', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_ownerledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['owner', '-ordered_at', '-id'], name='order_owner_ordered_idx'),
+        ),
+    ]
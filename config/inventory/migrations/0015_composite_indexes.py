@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:26
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_inventories(apps, schema_editor):
+    """
+    Fold rows sharing an (item, block) into the oldest one before the unique
+    constraint is added: quantities are summed and stock movements and order
+    lines are pointed at the surviving row.
+    """
+    Inventory = apps.get_model('inventory', 'Inventory')
+    duplicates = (
+        Inventory.objects.filter(item__isnull=False, block__isnull=False)
+        .values('item_id', 'block_id')
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('current_quantity'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        others = list(
+            Inventory.objects.filter(item_id=row['item_id'], block_id=row['block_id'])
+            .exclude(id=row['keep'])
+            .values_list('id', flat=True)
+        )
+        for model_name in ('StockIn', 'StockOut', 'OrderItem'):
+            apps.get_model('inventory', model_name).objects.filter(inventory_id__in=others).update(inventory_id=row['keep'])
+        Inventory.objects.filter(id=row['keep']).update(current_quantity=row['total'])
+        Inventory.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_order_owner_ordered_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['owner', 'customer_phone'], name='customer_owner_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['owner', 'category'], name='item_owner_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['owner', 'status', '-ordered_at', '-id'], name='order_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['date', 'item'], name='orderitem_date_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profitlossreport',
+            index=models.Index(fields=['item', 'generated_on'], name='plr_item_generated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profitlossreport',
+            index=models.Index(fields=['generated_on', 'item'], name='plr_generated_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockin',
+            index=models.Index(fields=['created_at', 'inventory'], name='stockin_created_inventory_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_inventories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(fields=('item', 'block'), name='unique_inventory_item_block'),
+        ),
+    ]
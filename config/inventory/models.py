@@ -1,4 +1,8 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from .basecontent import BaseContent
 class CustomUserManager(BaseUserManager):
@@ -76,9 +80,22 @@ class Item(BaseContent):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'category'], name='item_owner_category_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+class ItemStockTotal(BaseContent):
+    """Units of an item on hand across all blocks, kept current by the stock service."""
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='stock_total')
+    total_quantity = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.item_id}: {self.total_quantity}"
+
 class WareHouseLocation(BaseContent):
     owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='warehouse',null=True, blank=True,)
     name = models.CharField(max_length=255,null=True,blank=True)
@@ -100,6 +117,16 @@ class Block(BaseContent):
     name = models.CharField(max_length=100)
     item_capacity = models.PositiveIntegerField(help_text="Capacity of this block")
     used_capacity = models.PositiveIntegerField(default=0)
+    free_capacity = models.GeneratedField(
+        expression=models.F('item_capacity') - models.F('used_capacity'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['warehouse', 'free_capacity'], name='block_wh_free_idx'),
+        ]
 
     def available_capacity(self):
         return self.item_capacity - self.used_capacity
@@ -113,6 +140,11 @@ class Inventory(BaseContent):
     current_quantity = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'block'], name='unique_inventory_item_block'),
+        ]
+
     def __str__(self):
         return f"{self.item.name} @ {self.block.name}"
     
@@ -123,6 +155,11 @@ class StockIn(BaseContent):
     date = models.DateTimeField(auto_now_add=True)
     added_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'inventory'], name='stockin_created_inventory_idx'),
+        ]
+
     def __str__(self):
         return f"In: {self.quantity} of {self.inventory.item.name}"
 
@@ -153,12 +190,16 @@ class ProfitLossReport(BaseContent):
 
     profit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
 
-    generated_on = models.DateTimeField(auto_now_add=True)
+    generated_on = models.DateTimeField(default=timezone.now)
 
     class Meta:
         
         verbose_name = "Profit & Loss Report"
         verbose_name_plural = "Profit & Loss Reports"
+        indexes = [
+            models.Index(fields=['item', 'generated_on'], name='plr_item_generated_idx'),
+            models.Index(fields=['generated_on', 'item'], name='plr_generated_item_idx'),
+        ]
 
     def __str__(self):
         return f"{self.generated_on.date()}"
@@ -175,6 +216,11 @@ class Customer(BaseContent):
     customer_email = models.EmailField(unique=True)
     customer_address = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'customer_phone'], name='customer_owner_phone_idx'),
+        ]
+
     def __str__(self):
         return f"customer {self.customer_name}"
 class Order(BaseContent):
@@ -195,6 +241,12 @@ class Order(BaseContent):
     status = models.CharField(max_length=15, choices=ORDER_STATUS, default='confirmed')
     ordered_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-ordered_at', '-id'], name='order_owner_ordered_idx'),
+            models.Index(fields=['owner', 'status', '-ordered_at', '-id'], name='order_owner_status_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id} - {self.customer.customer_name}"
 
@@ -205,7 +257,172 @@ class OrderItem(BaseContent):
     quantity = models.PositiveIntegerField()
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)  # price at time of order
     date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'item'], name='orderitem_date_item_idx'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.inventory.item.name} in {self.order.order_id}"
     
 
+
+
+class IdempotencyKey(BaseContent):
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # While status_code is unset: the request running it owns the key until then.
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='unique_idempotency_key_per_owner'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.owner_id})"
+
+
+class BlockDailyProfit(BaseContent):
+    """Profit from sales out of a block on one day, kept current by order placement."""
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='block_daily_profits')
+    block = models.ForeignKey(Block, on_delete=models.CASCADE, related_name='daily_profits')
+    day = models.DateField()
+    profit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['block', 'day'], name='unique_block_daily_profit'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='block_profit_owner_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.block_id} on {self.day}: {self.profit}"
+
+
+class DailySales(BaseContent):
+    """Revenue and units sold by a tenant on one day, kept current by order placement."""
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'day'], name='unique_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} on {self.day}: {self.revenue}"
+
+
+class ItemDailySales(BaseContent):
+    """Units and revenue of one item sold on one day, kept current by order placement."""
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='item_daily_sales')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'day'], name='unique_item_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='item_sales_owner_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.day}: {self.quantity}"
+
+
+class ItemSalesTotal(BaseContent):
+    """All-time units and revenue of one item, kept current by order placement."""
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='sales_total')
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='item_sales_totals')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-quantity'], name='item_sales_owner_qty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantity}"
+
+
+class OwnerLedger(BaseContent):
+    """Running unit counters for a tenant, kept current by the stock service."""
+    owner = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    on_hand = models.IntegerField(default=0)
+    sold = models.PositiveIntegerField(default=0)
+    damaged = models.PositiveIntegerField(default=0)
+    transferred = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Ledger of {self.owner_id}"
+
+
+class JobOutputStorage(FileSystemStorage):
+    """
+    Files under JOB_OUTPUT_ROOT, outside MEDIA_ROOT: outputs hold tenant
+    data and are only served through the job endpoints.
+    """
+
+    @cached_property
+    def base_location(self):
+        return settings.JOB_OUTPUT_ROOT
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        if setting == 'JOB_OUTPUT_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+        super()._clear_cached_properties(setting, **kwargs)
+
+
+def job_output_storage():
+    return JobOutputStorage()
+
+
+class Job(BaseContent):
+    """A unit of background work, claimed and run by the run_jobs worker."""
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Set for scheduled runs, so every worker enqueues the same run only once.
+    unique_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    output = models.FileField(upload_to='jobs/', storage=job_output_storage, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['kind', 'status'], name='job_kind_status_idx'),
+            models.Index(fields=['owner', '-created_at'], name='job_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
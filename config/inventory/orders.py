@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.utils.crypto import get_random_string
+from rest_framework import status
+
+from . import rollups
+from .models import Inventory, Order, OrderItem, StockOut
+from .stock import (
+    StockError, adjust_item_totals, adjust_ledger, bulk_decrease_quantity, bulk_release_capacity,
+)
+from .write_queue import write_transaction
+
+
+def place_order(owner, user, customer, lines):
+    """
+    Create a confirmed order and take its stock out.
+
+    All inventory rows are locked with one query in primary-key order, so two
+    orders touching the same inventories cannot deadlock, and the order lines,
+    stock-outs and quantity changes are each written with one statement.
+    """
+    requested = defaultdict(int)
+    for line in lines:
+        requested[line['inventory_id']] += line['quantity']
+
+    with write_transaction():
+        inventories = {
+            inventory.id: inventory
+            for inventory in Inventory.objects.select_for_update(of=('self',))
+            .select_related('item')
+            .filter(id__in=requested, item__owner=owner)
+            .order_by('id')
+        }
+
+        for line in lines:
+            if line['inventory_id'] not in inventories:
+                raise StockError(
+                    f"Inventory ID {line['inventory_id']} not found",
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+
+        for inventory_id, quantity in requested.items():
+            inventory = inventories[inventory_id]
+            if inventory.current_quantity < quantity:
+                raise StockError(f"Insufficient stock for {inventory.item.name}")
+
+        order = Order.objects.create(
+            order_id=get_random_string(length=8).upper(),
+            customer=customer,
+            status='confirmed',
+            owner=owner
+        )
+
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                inventory_id=line['inventory_id'],
+                item_id=inventories[line['inventory_id']].item_id,
+                quantity=line['quantity'],
+                selling_price=line['selling_price']
+            )
+            for line in lines
+        ])
+
+        StockOut.objects.bulk_create([
+            StockOut(
+                inventory_id=line['inventory_id'],
+                quantity=line['quantity'],
+                reason='sale',
+                removed_by=user
+            )
+            for line in lines
+        ])
+
+        bulk_decrease_quantity(requested)
+
+        released = defaultdict(int)
+        sold = defaultdict(int)
+        for inventory_id, quantity in requested.items():
+            released[inventories[inventory_id].block_id] += quantity
+            sold[inventories[inventory_id].item_id] -= quantity
+        bulk_release_capacity(released)
+        adjust_item_totals(sold)
+        total = sum(requested.values())
+        adjust_ledger(owner.id, on_hand=-total, reason='sale', quantity=total)
+        rollups.record_order(owner, lines, inventories)
+
+    return order, order_items
@@ -0,0 +1,115 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _page_size(request):
+    default = getattr(settings, 'PAGINATION_DEFAULT_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 500)
+    try:
+        size = int(request.query_params.get('page_size', default))
+    except ValueError:
+        raise InvalidCursor("page_size must be an integer")
+    return max(1, min(size, maximum))
+
+
+def _json_default(value):
+    # Keep full microsecond precision; a truncated timestamp would skip rows.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(values, direction):
+    payload = json.dumps({"v": values, "d": direction}, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['v'], payload['d']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class Page:
+    def __init__(self, rows, next_cursor, previous_cursor):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def envelope(self, results):
+        return {
+            "next": self.next_cursor,
+            "previous": self.previous_cursor,
+            "results": results,
+        }
+
+
+def paginate(request, queryset, ordering):
+    """
+    Keyset pagination over `ordering` (e.g. ('-ordered_at', '-id')), which must
+    end in a unique column. Each page is fetched with a WHERE on the last seen
+    key instead of an OFFSET, so deep pages cost the same as the first one.
+    Works with model instances and with .values() rows.
+    """
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    model_fields = [queryset.model._meta.get_field(name) for name, _ in fields]
+    page_size = _page_size(request)
+
+    cursor = request.query_params.get('cursor')
+    direction = 'next'
+    if cursor:
+        values, direction = _decode(cursor)
+        if direction not in ('next', 'previous') or len(values) != len(fields):
+            raise InvalidCursor("Invalid cursor")
+        try:
+            values = [field.to_python(value) for field, value in zip(model_fields, values)]
+        except Exception:
+            raise InvalidCursor("Invalid cursor")
+
+        forward = direction == 'next'
+        condition = Q()
+        for index, (name, descending) in enumerate(fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            clause = Q(**{f"{name}__{lookup}": values[index]})
+            for (earlier, _), value in zip(fields[:index], values[:index]):
+                clause &= Q(**{earlier: value})
+            condition |= clause
+        queryset = queryset.filter(condition)
+
+    if direction == 'previous':
+        queryset = queryset.order_by(*[name if descending else f"-{name}" for name, descending in fields])
+    else:
+        queryset = queryset.order_by(*ordering)
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'previous':
+        rows.reverse()
+
+    def key(row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in fields]
+        return [getattr(row, field.attname) for field in model_fields]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if direction == 'next':
+            next_cursor = _encode(key(rows[-1]), 'next') if has_more else None
+            previous_cursor = _encode(key(rows[0]), 'previous') if cursor else None
+        else:
+            next_cursor = _encode(key(rows[-1]), 'next')
+            previous_cursor = _encode(key(rows[0]), 'previous') if has_more else None
+
+    return Page(rows, next_cursor, previous_cursor)
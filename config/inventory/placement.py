@@ -0,0 +1,93 @@
+from django.db.models import Case, IntegerField, Sum, Value, When
+
+from .models import Block
+
+
+FIRST_FIT = 'first-fit'
+BEST_FIT = 'best-fit'
+FEWEST_BLOCKS = 'fewest-blocks'
+SAME_WAREHOUSE_FIRST = 'same-warehouse-first'
+
+STRATEGIES = (FIRST_FIT, BEST_FIT, FEWEST_BLOCKS, SAME_WAREHOUSE_FIRST)
+DEFAULT_STRATEGY = FIRST_FIT
+
+
+def free_blocks(owner):
+    """Blocks in the owner's warehouses that still have room, served by block_wh_free_idx."""
+    return Block.objects.filter(
+        warehouse__owner=owner,
+        free_capacity__gt=0,
+    ).values('id', 'name', 'warehouse_id', 'free_capacity')
+
+
+def _fill(blocks, quantity):
+    suggestions = []
+    remaining = quantity
+    for block in blocks:
+        can_store = min(block['free_capacity'], remaining)
+        suggestions.append({
+            "block_id": block['id'],
+            "block_name": block['name'],
+            "warehouse_id": block['warehouse_id'],
+            "available_space": block['free_capacity'],
+            "can_store": can_store,
+        })
+        remaining -= can_store
+        if remaining <= 0:
+            break
+    return suggestions, max(remaining, 0)
+
+
+def _first_fit(owner, quantity, warehouse_id):
+    return _fill(free_blocks(owner).order_by('id').iterator(), quantity)
+
+
+def _fewest_blocks(owner, quantity, warehouse_id):
+    return _fill(free_blocks(owner).order_by('-free_capacity', 'id').iterator(), quantity)
+
+
+def _best_fit(owner, quantity, warehouse_id):
+    # The tightest single block that holds everything; otherwise spread
+    # across the largest blocks so the shipment is split as little as possible.
+    block = free_blocks(owner).filter(free_capacity__gte=quantity).order_by('free_capacity', 'id').first()
+    if block is not None:
+        return _fill([block], quantity)
+    return _fewest_blocks(owner, quantity, warehouse_id)
+
+
+def _same_warehouse_first(owner, quantity, warehouse_id):
+    if warehouse_id is None:
+        warehouse_id = (
+            free_blocks(owner)
+            .values('warehouse_id')
+            .annotate(total_free=Sum('free_capacity'))
+            .order_by('-total_free')
+            .values_list('warehouse_id', flat=True)
+            .first()
+        )
+    blocks = free_blocks(owner).annotate(
+        preferred=Case(
+            When(warehouse_id=warehouse_id, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('preferred', '-free_capacity', 'id')
+    return _fill(blocks.iterator(), quantity)
+
+
+_STRATEGY_FUNCTIONS = {
+    FIRST_FIT: _first_fit,
+    BEST_FIT: _best_fit,
+    FEWEST_BLOCKS: _fewest_blocks,
+    SAME_WAREHOUSE_FIRST: _same_warehouse_first,
+}
+
+
+def suggest_placement(owner, quantity, strategy=DEFAULT_STRATEGY, warehouse_id=None):
+    """
+    Return (suggestions, unplaced_quantity) for storing `quantity` units in the
+    owner's blocks. Only blocks with free capacity are read from the database.
+    """
+    if strategy not in _STRATEGY_FUNCTIONS:
+        raise ValueError(f"Unknown placement strategy '{strategy}'")
+    return _STRATEGY_FUNCTIONS[strategy](owner, quantity, warehouse_id)
@@ -0,0 +1,153 @@
+from collections import defaultdict
+
+from django.utils import timezone
+
+from .models import OrderItem
+
+
+def as_decimal(places=2):
+    def convert(value):
+        return None if value is None else f"{value:.{places}f}"
+    return convert
+
+
+def as_datetime(value):
+    """Same output as DRF's DateTimeField: current timezone, 'Z' for UTC."""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class InvalidFields(Exception):
+    pass
+
+
+class ValuesReader:
+    """
+    Read-only serializer that builds output straight from .values() rows.
+
+    `fields` maps each output name to (lookup, converter). Lookups may follow
+    foreign keys ('customer__customer_name'); the join is done by the same
+    query. Dotted output names ('customer.customer_name') are nested into
+    dicts. A sparse fieldset can be requested with ?fields=a,b, where a
+    top-level name selects the whole group.
+    """
+    fields = {}
+
+    def __init__(self, requested=None):
+        self.selected = self._select(requested)
+
+    def _select(self, requested):
+        if not requested:
+            return dict(self.fields)
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        available = {name.split('.')[0] for name in self.fields} | set(self.nested_fields())
+        unknown = names - available
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return {
+            name: spec for name, spec in self.fields.items()
+            if name.split('.')[0] in names
+        }
+
+    def nested_fields(self):
+        return {}
+
+    def lookups(self, *extra):
+        return list(dict.fromkeys([lookup for lookup, _ in self.selected.values()] + list(extra)))
+
+    def values(self, queryset, *extra):
+        """The queryset reduced to just the columns this reader needs."""
+        return queryset.values(*self.lookups(*extra))
+
+    def render_row(self, row):
+        out = {}
+        for name, (lookup, convert) in self.selected.items():
+            value = row[lookup]
+            if convert is not None:
+                value = convert(value)
+            if '.' in name:
+                group, key = name.split('.', 1)
+                out.setdefault(group, {})[key] = value
+            else:
+                out[name] = value
+        return out
+
+    def render(self, rows):
+        return [self.render_row(row) for row in rows]
+
+
+class CustomerReader(ValuesReader):
+    fields = {
+        'customer_name': ('customer_name', None),
+        'customer_phone': ('customer_phone', None),
+        'customer_email': ('customer_email', None),
+        'customer_address': ('customer_address', None),
+    }
+
+
+class BlockInventoryItemReader(ValuesReader):
+    fields = {
+        'item_id': ('item_id', None),
+        'item_name': ('item__name', None),
+        'item_sku': ('item__sku', None),
+        'category': ('item__category__name', None),
+        'unit_price': ('item__unit_price', as_decimal(2)),
+        'current_quantity': ('current_quantity', None),
+    }
+
+
+class OrderReader(ValuesReader):
+    fields = {
+        'id': ('id', None),
+        'order_id': ('order_id', None),
+        'customer.customer_name': ('customer__customer_name', None),
+        'customer.customer_phone': ('customer__customer_phone', None),
+        'customer.customer_email': ('customer__customer_email', None),
+        'customer.customer_address': ('customer__customer_address', None),
+        'status': ('status', None),
+        'ordered_at': ('ordered_at', as_datetime),
+    }
+    item_fields = (
+        ('id', None),
+        ('item', None),
+        ('quantity', None),
+        ('selling_price', as_decimal(2)),
+        ('date', as_datetime),
+    )
+
+    def __init__(self, requested=None):
+        self.include_items = not requested or 'items' in {name.strip() for name in requested.split(',')}
+        super().__init__(requested)
+
+    def nested_fields(self):
+        return {'items': self.item_fields}
+
+    def render(self, rows):
+        rows = list(rows)
+        orders = super().render(rows)
+        if not self.include_items:
+            return orders
+
+        # One query for the lines of every order on the page.
+        lines = defaultdict(list)
+        names = [name for name, _ in self.item_fields]
+        converters = [convert for _, convert in self.item_fields]
+        item_rows = (
+            OrderItem.objects.filter(order_id__in=[row['id'] for row in rows])
+            .order_by('id')
+            .values_list('order_id', 'id', 'item_id', 'quantity', 'selling_price', 'date')
+        )
+        for order_id, *values in item_rows:
+            lines[order_id].append({
+                name: convert(value) if convert else value
+                for name, convert, value in zip(names, converters, values)
+            })
+        for row, order in zip(rows, orders):
+            order['items'] = lines[row['id']]
+        return orders
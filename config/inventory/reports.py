@@ -0,0 +1,181 @@
+import csv
+import io
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+
+from .models import Inventory, OrderItem, ProfitLossReport, StockIn
+from .write_queue import write_transaction
+
+
+REPORT_FIELDS = ['total_stock_in', 'total_stock_out', 'total_cost', 'total_revenue', 'profit', 'updated_at']
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes for a calendar day, usable by indexes on datetime columns."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def generate_profit_loss_report(day):
+    """
+    Build the profit & loss rows for one day: one grouped query for stock-in
+    cost, one for order revenue, then bulk inserts/updates of the report rows.
+    """
+    start, end = day_bounds(day)
+
+    stock_in = {
+        row['inventory__item_id']: row
+        for row in StockIn.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('inventory__item_id')
+        .annotate(
+            total_in=Sum('quantity'),
+            total_cost=Sum(F('quantity') * F('cost_price'), output_field=DecimalField())
+        )
+    }
+    sales = {
+        row['item_id']: row
+        for row in OrderItem.objects.filter(date__gte=start, date__lt=end)
+        .values('item_id')
+        .annotate(
+            total_out=Sum('quantity'),
+            total_revenue=Sum(F('quantity') * F('selling_price'), output_field=DecimalField())
+        )
+    }
+
+    item_ids = set(Inventory.objects.exclude(item_id=None).values_list('item_id', flat=True).distinct())
+    item_ids.update(stock_in.keys(), sales.keys())
+    item_ids.discard(None)
+
+    now = timezone.now()
+    with write_transaction():
+        existing = {}
+        for report in ProfitLossReport.objects.filter(generated_on__gte=start, generated_on__lt=end).order_by('id'):
+            existing.setdefault(report.item_id, report)
+
+        to_create = []
+        to_update = []
+        for item_id in item_ids:
+            cost_row = stock_in.get(item_id, {})
+            sales_row = sales.get(item_id, {})
+            total_cost = cost_row.get('total_cost') or 0
+            total_revenue = sales_row.get('total_revenue') or 0
+            values = {
+                'total_stock_in': cost_row.get('total_in') or 0,
+                'total_stock_out': sales_row.get('total_out') or 0,
+                'total_cost': total_cost,
+                'total_revenue': total_revenue,
+                'profit': total_revenue - total_cost,
+                'updated_at': now,
+            }
+
+            report = existing.get(item_id)
+            if report is None:
+                to_create.append(ProfitLossReport(item_id=item_id, generated_on=start, **values))
+            else:
+                for field, value in values.items():
+                    setattr(report, field, value)
+                to_update.append(report)
+
+        ProfitLossReport.objects.bulk_create(to_create, batch_size=1000)
+        ProfitLossReport.objects.bulk_update(to_update, REPORT_FIELDS, batch_size=1000)
+
+    return len(item_ids)
+
+
+def _generate_in_worker(day):
+    try:
+        return generate_profit_loss_report(day)
+    finally:
+        connection.close()
+
+
+def usable_workers(workers):
+    """
+    How many report threads the database can take. SQLite outside production
+    mode upgrades each thread's read transaction to a write lock on demand and
+    has no write queue, so concurrent writers fail with "database is locked";
+    there the days are generated one at a time.
+    """
+    if connection.vendor == 'sqlite' and not getattr(settings, 'SQLITE_WRITE_QUEUE', False):
+        return 1
+    return workers
+
+
+def generate_profit_loss_reports(start_date, end_date=None, workers=1):
+    """
+    Generate reports for every day from start_date to end_date inclusive.
+    With workers > 1 (and a database that allows it, see usable_workers())
+    the days are spread over a thread pool, each thread using its own
+    database connection. Returns {day: items reported}.
+    """
+    end_date = end_date or start_date
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+    workers = usable_workers(workers)
+    if workers <= 1 or len(days) == 1:
+        return {day: generate_profit_loss_report(day) for day in days}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(days, pool.map(_generate_in_worker, days)))
+
+
+CSV_HEADER = [
+    'Item Name',
+    'Total Stock In', 'Total Stock Out',
+    'Total Cost', 'Total Revenue', 'Profit', 'Generated On'
+]
+
+
+def profit_loss_rows(owner, start_date, end_date):
+    """Report rows for the owner's items between two days, read from a server-side cursor in chunks."""
+    start, _ = day_bounds(start_date)
+    _, end = day_bounds(end_date)
+    return (
+        ProfitLossReport.objects.filter(item__owner=owner, generated_on__gte=start, generated_on__lt=end)
+        .order_by('generated_on', 'id')
+        .values_list(
+            'item__name', 'total_stock_in', 'total_stock_out',
+            'total_cost', 'total_revenue', 'profit', 'generated_on'
+        )
+        .iterator(chunk_size=2000)
+    )
+
+
+def iter_csv(rows, compress=False, flush_size=64 * 1024):
+    """
+    Encode rows as CSV, yielding roughly flush_size bytes at a time. Only one
+    chunk is held in memory, so the export size does not affect memory use.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow(CSV_HEADER)
+    for name, stock_in, stock_out, cost, revenue, profit, generated_on in rows:
+        writer.writerow([
+            name, stock_in, stock_out,
+            float(cost), float(revenue), float(profit),
+            generated_on.strftime("%Y-%m-%d")
+        ])
+        if buffer.tell() >= flush_size:
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
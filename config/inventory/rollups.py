@@ -0,0 +1,228 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .counters import increment
+from .models import BlockDailyProfit, DailySales, ItemDailySales, ItemSalesTotal, OrderItem
+from .reports import day_bounds
+
+
+def sale_profit_expression():
+    return ExpressionWrapper(
+        (F('selling_price') - F('item__unit_price')) * F('quantity'),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+def record_order(owner, lines, inventories, day=None):
+    """
+    Fold a placed order into the daily rollups. Called by order placement
+    inside its transaction with the order lines and the locked inventories
+    (with their items loaded).
+    """
+    day = day or timezone.localdate()
+    block_profit = defaultdict(Decimal)
+    item_sales = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
+    revenue = Decimal('0')
+    units = 0
+
+    for line in lines:
+        inventory = inventories[line['inventory_id']]
+        quantity = line['quantity']
+        selling_price = Decimal(line['selling_price'])
+        revenue += selling_price * quantity
+        units += quantity
+        if inventory.item is None:
+            continue
+        item_sales[inventory.item_id]['quantity'] += quantity
+        item_sales[inventory.item_id]['revenue'] += selling_price * quantity
+        if inventory.block_id is not None:
+            block_profit[inventory.block_id] += (selling_price - inventory.item.unit_price) * quantity
+
+    increment(BlockDailyProfit, ('owner_id', 'block_id', 'day'), {
+        (owner.id, block_id, day): {'profit': profit}
+        for block_id, profit in block_profit.items()
+    })
+    increment(DailySales, ('owner_id', 'day'), {
+        (owner.id, day): {'revenue': revenue, 'quantity': units}
+    })
+    increment(ItemDailySales, ('owner_id', 'item_id', 'day'), {
+        (owner.id, item_id, day): sales for item_id, sales in item_sales.items()
+    })
+    increment(
+        ItemSalesTotal, ('item_id',),
+        {(item_id,): sales for item_id, sales in item_sales.items()},
+        defaults={(item_id,): {'owner_id': owner.id} for item_id in item_sales},
+    )
+
+
+def block_profit_from_sales(owner, start_date=None, end_date=None):
+    """Profit per block grouped in the database straight from OrderItem."""
+    order_items = OrderItem.objects.filter(order__owner=owner, inventory__block__isnull=False)
+    if start_date:
+        order_items = order_items.filter(date__gte=day_bounds(start_date)[0])
+    if end_date:
+        order_items = order_items.filter(date__lt=day_bounds(end_date)[1])
+    return (
+        order_items.values(block_id=F('inventory__block_id'), block_name=F('inventory__block__name'))
+        .annotate(profit=Sum(sale_profit_expression()))
+        .order_by('block_name')
+    )
+
+
+def block_profit(owner, start_date=None, end_date=None):
+    """Profit per block read from the BlockDailyProfit rollup."""
+    rows = BlockDailyProfit.objects.filter(owner=owner)
+    if start_date:
+        rows = rows.filter(day__gte=start_date)
+    if end_date:
+        rows = rows.filter(day__lte=end_date)
+    return (
+        rows.values('block_id', block_name=F('block__name'))
+        .annotate(profit=Sum('profit'))
+        .order_by('block_name')
+    )
+
+
+def daily_sales(owner, start_date, end_date):
+    """{day: {"revenue", "quantity"}} for the owner's days with sales in the range."""
+    return {
+        row['day']: row
+        for row in DailySales.objects.filter(owner=owner, day__gte=start_date, day__lte=end_date)
+        .values('day', 'revenue', 'quantity')
+    }
+
+
+TOP_SELLER_WINDOWS = {'1d': 1, '7d': 7, '30d': 30, '90d': 90, 'all': None}
+
+
+def top_sellers(owner, window='all', k=5):
+    """
+    The owner's k best-selling items over the last 1/7/30/90 days or all time.
+    Windowed reads sum at most items x days rollup rows; all-time reads the
+    top k rows of an index on (owner, -quantity).
+    """
+    days = TOP_SELLER_WINDOWS[window]
+    if days is None:
+        rows = ItemSalesTotal.objects.filter(owner=owner, quantity__gt=0).values(
+            'item_id', 'revenue',
+            item_name=F('item__name'), sku=F('item__sku'), quantity_sold=F('quantity'),
+        ).order_by('-quantity', 'item_id')
+    else:
+        since = timezone.localdate() - timedelta(days=days - 1)
+        rows = (
+            ItemDailySales.objects.filter(owner=owner, day__gte=since)
+            .values('item_id', item_name=F('item__name'), sku=F('item__sku'))
+            .annotate(quantity_sold=Sum('quantity'), revenue=Sum('revenue'))
+            .order_by('-quantity_sold', 'item_id')
+        )
+    return list(rows[:k])
+
+
+def _bulk_insert(model, rows, batch_size):
+    batch = []
+    created = 0
+    for row in rows:
+        batch.append(model(**row))
+        if len(batch) >= batch_size:
+            created += len(model.objects.bulk_create(batch))
+            batch = []
+    created += len(model.objects.bulk_create(batch))
+    return created
+
+
+def rebuild_block_daily_profit(batch_size=1000):
+    """Regenerate BlockDailyProfit from the full OrderItem history."""
+    BlockDailyProfit.objects.all().delete()
+    rows = (
+        OrderItem.objects.filter(order__owner__isnull=False, inventory__block__isnull=False)
+        .values(
+            owner_id=F('order__owner_id'),
+            block_id=F('inventory__block_id'),
+            day=TruncDate('date'),
+        )
+        .annotate(profit=Sum(sale_profit_expression()))
+        .order_by()
+    )
+    return _bulk_insert(BlockDailyProfit, rows.iterator(chunk_size=batch_size), batch_size)
+
+
+def rebuild_daily_sales(batch_size=1000):
+    """Regenerate DailySales from the full OrderItem history."""
+    DailySales.objects.all().delete()
+    rows = (
+        OrderItem.objects.filter(order__owner__isnull=False)
+        .values(owner_id=F('order__owner_id'), day=TruncDate('date'))
+        .annotate(
+            revenue=Sum(
+                ExpressionWrapper(F('selling_price') * F('quantity'), output_field=DecimalField(max_digits=15, decimal_places=2))
+            ),
+            units=Sum('quantity'),
+        )
+        .order_by()
+    )
+    return _bulk_insert(
+        DailySales,
+        (
+            {'owner_id': row['owner_id'], 'day': row['day'], 'revenue': row['revenue'], 'quantity': row['units']}
+            for row in rows.iterator(chunk_size=batch_size)
+        ),
+        batch_size,
+    )
+
+
+def _item_sales_rows():
+    return (
+        OrderItem.objects.filter(order__owner__isnull=False, item__isnull=False)
+        .annotate(line_revenue=ExpressionWrapper(
+            F('selling_price') * F('quantity'), output_field=DecimalField(max_digits=15, decimal_places=2)
+        ))
+    )
+
+
+def rebuild_item_daily_sales(batch_size=1000):
+    """Regenerate ItemDailySales from the full OrderItem history."""
+    ItemDailySales.objects.all().delete()
+    rows = (
+        _item_sales_rows()
+        .values('item_id', owner_id=F('order__owner_id'), day=TruncDate('date'))
+        .annotate(units=Sum('quantity'), total_revenue=Sum('line_revenue'))
+        .order_by()
+    )
+    return _bulk_insert(
+        ItemDailySales,
+        (
+            {
+                'owner_id': row['owner_id'], 'item_id': row['item_id'], 'day': row['day'],
+                'quantity': row['units'], 'revenue': row['total_revenue'],
+            }
+            for row in rows.iterator(chunk_size=batch_size)
+        ),
+        batch_size,
+    )
+
+
+def rebuild_item_sales_totals(batch_size=1000):
+    """Regenerate ItemSalesTotal from the full OrderItem history."""
+    ItemSalesTotal.objects.all().delete()
+    rows = (
+        _item_sales_rows()
+        .values('item_id', owner_id=F('order__owner_id'))
+        .annotate(units=Sum('quantity'), total_revenue=Sum('line_revenue'))
+        .order_by()
+    )
+    return _bulk_insert(
+        ItemSalesTotal,
+        (
+            {
+                'owner_id': row['owner_id'], 'item_id': row['item_id'],
+                'quantity': row['units'], 'revenue': row['total_revenue'],
+            }
+            for row in rows.iterator(chunk_size=batch_size)
+        ),
+        batch_size,
+    )
@@ -0,0 +1,115 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# The replica alias reads go to, set only while a @replica_reads handler
+# runs, and whether this request has written through the primary since.
+_replica = ContextVar('inventory_replica', default=None)
+_wrote = ContextVar('inventory_wrote', default=False)
+
+
+def _replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def _sticky_cache():
+    return caches[getattr(settings, 'REPLICA_STICKY_CACHE_ALIAS', 'default')]
+
+
+def _sticky_key(owner_id):
+    return f"replica:sticky:{owner_id}"
+
+
+def mark_written(owner_id):
+    """Keep the tenant's reads on the primary for REPLICA_STICKY_SECONDS."""
+    if owner_id is not None and _replicas():
+        _sticky_cache().set(_sticky_key(owner_id), True, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+def choose_replica(owner):
+    """A replica alias for the owner's reads, or None to stay on the primary."""
+    replicas = _replicas()
+    if not replicas or owner is None or _sticky_cache().get(_sticky_key(owner.pk)):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def reads_from(alias):
+    """Send ORM reads in this context (and threads started from it) to `alias`."""
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+@contextmanager
+def tracking_writes():
+    """Start a fresh read-your-writes scope; yields a callable telling whether it wrote."""
+    token = _wrote.set(False)
+    try:
+        yield _wrote.get
+    finally:
+        _wrote.reset(token)
+
+
+def _iterate_in(context, iterator):
+    iterator = iter(iterator)
+    while True:
+        try:
+            yield context.run(next, iterator)
+        except StopIteration:
+            return
+
+
+def replica_reads(view_method):
+    """
+    Run an APIView GET handler's queries on a replica.
+
+    The caller's tenant stays on the primary for a few seconds after one of
+    its requests wrote (see ReplicaStickinessMiddleware). A streamed body is
+    produced after the handler returns, so it is iterated in the handler's
+    routing context too. Without DATABASE_REPLICAS this does nothing.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        alias = choose_replica(getattr(request.user, 'effective_admin', None))
+        if alias is None:
+            return view_method(self, request, *args, **kwargs)
+        with reads_from(alias):
+            response = view_method(self, request, *args, **kwargs)
+            if response.streaming:
+                response.streaming_content = _iterate_in(copy_context(), response.streaming_content)
+        return response
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to a replica only inside
+    reads_from() (set by @replica_reads), and fall back to the primary once
+    the request has written or while a transaction is open on the primary,
+    so a request always sees its own changes.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or _wrote.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
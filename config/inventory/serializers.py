@@ -1,6 +1,8 @@
 # users/serializers.py
+from django.urls import reverse
 from rest_framework import serializers
 from .models import *
+from .placement import DEFAULT_STRATEGY, STRATEGIES
 
 class SignupSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -23,6 +25,13 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'email', 'user_type'] 
 
 
+class InventoryCheckSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    strategy = serializers.ChoiceField(choices=STRATEGIES, default=DEFAULT_STRATEGY)
+    warehouse_id = serializers.IntegerField(required=False, allow_null=True)
+
+
 class InventoryStockInSuggestionSerializer(serializers.Serializer):
     block_id = serializers.IntegerField()
     can_store = serializers.IntegerField(min_value=1)
@@ -33,6 +42,9 @@ class InventoryStockInSerializer(serializers.Serializer):
     block_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
 
+class BulkStockInSerializer(serializers.Serializer):
+    items = InventoryStockInSerializer(many=True, allow_empty=False, max_length=2000)
+
 class CustomerSerializer(serializers.Serializer):
     customer_name = serializers.CharField(max_length=225)
     customer_phone = serializers.CharField(max_length=15)
@@ -163,4 +175,24 @@ class OrderListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'order_id', 'customer', 'status', 'ordered_at', 'items']
\ No newline at end of file
+        fields = ['id', 'order_id', 'customer', 'status', 'ordered_at', 'items']
+class JobSerializer(serializers.ModelSerializer):
+    error = serializers.SerializerMethodField()
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'payload', 'attempts', 'max_attempts', 'run_at', 'started_at', 'finished_at',
+            'result', 'error', 'download',
+        ]
+
+    def get_error(self, job):
+        # Only the exception line; the traceback stays in the admin.
+        lines = job.error.strip().splitlines()
+        return lines[-1] if lines else None
+
+    def get_download(self, job):
+        if not job.output or job.status != Job.Status.SUCCEEDED:
+            return None
+        return reverse('job-download', kwargs={'pk': job.pk})
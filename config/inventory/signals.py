@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import forget
+from .cache import invalidate
+from .models import Block, Category, CustomUser, Inventory, Item, WareHouseLocation
+from .stock import forget_deleted_stock
+
+
+# Keep the catalog cache in step with saves and deletes. Queryset .update()
+# and bulk_create()/bulk_update() send no signals; code that writes catalog
+# rows that way calls cache.invalidate() itself.
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, instance, **kwargs):
+    invalidate(instance.owner_id, 'categories')
+
+
+@receiver([post_save, post_delete], sender=Item)
+def invalidate_items(sender, instance, **kwargs):
+    invalidate(instance.owner_id, 'items')
+
+
+@receiver([post_save, post_delete], sender=WareHouseLocation)
+def invalidate_warehouses(sender, instance, **kwargs):
+    invalidate(instance.owner_id, 'warehouses')
+
+
+@receiver([post_save, post_delete], sender=Block)
+def invalidate_blocks(sender, instance, **kwargs):
+    if instance.warehouse_id is None:
+        return
+    owner_id = (
+        WareHouseLocation.objects.filter(pk=instance.warehouse_id)
+        .values_list('owner_id', flat=True).first()
+    )
+    invalidate(owner_id, 'warehouses')
+
+
+# Deleting a block, warehouse or item cascades to its Inventory rows, which
+# bypasses the stock service. Before the rows go, take their units off the
+# running totals (pre_delete runs inside the same transaction as the delete).
+@receiver(pre_delete, sender=Inventory)
+def forget_inventory_stock(sender, instance, **kwargs):
+    forget_deleted_stock(instance.item_id, instance.current_quantity)
+
+
+# Re-check a changed account on its next request rather than after the
+# JWT_PRINCIPAL_TTL window; other processes catch up when theirs expires.
+@receiver([post_save, post_delete], sender=CustomUser)
+def forget_account_check(sender, instance, **kwargs):
+    forget(instance.pk)
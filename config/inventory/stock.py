@@ -0,0 +1,284 @@
+from collections import defaultdict
+
+from django.db import IntegrityError
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import status
+
+from .counters import increment
+from .models import Block, Inventory, Item, ItemStockTotal, OwnerLedger, StockIn, StockOut
+from .write_queue import write_transaction
+
+
+class StockError(Exception):
+    def __init__(self, message, errors=None, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.errors = errors
+        self.status_code = status_code
+
+
+def increment_case(deltas, output_field=None):
+    """CASE expression mapping primary keys to the amount each row changes by."""
+    return Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+        output_field=output_field or IntegerField(),
+    )
+
+
+def adjust_item_totals(deltas):
+    """Apply {item_id: change in units} to the per-item stock totals."""
+    increment(ItemStockTotal, ('item_id',), {
+        (item_id,): {'total_quantity': delta}
+        for item_id, delta in deltas.items()
+        if item_id is not None and delta
+    })
+
+
+def forget_deleted_stock(item_id, quantity):
+    """
+    Take a deleted inventory's units off its item's total and its tenant's
+    on-hand count. Only existing rows are changed: when the item or the
+    tenant is being deleted, their counters go with it and must not be
+    recreated.
+    """
+    if item_id is None or not quantity:
+        return
+    now = timezone.now()
+    ItemStockTotal.objects.filter(item_id=item_id).update(
+        total_quantity=F('total_quantity') - quantity,
+        updated_at=now,
+    )
+    owner_id = Item.objects.filter(pk=item_id).values_list('owner_id', flat=True).first()
+    if owner_id is not None:
+        OwnerLedger.objects.filter(owner_id=owner_id).update(on_hand=F('on_hand') - quantity, updated_at=now)
+
+
+LEDGER_FIELDS = {'sale': 'sold', 'damage': 'damaged', 'transfer': 'transferred'}
+
+
+def adjust_ledger(owner_id, on_hand=0, reason=None, quantity=0):
+    """
+    Update the tenant's running counters: `on_hand` changes the units in stock,
+    and `reason` ('sale', 'damage' or 'transfer') adds `quantity` to that total.
+    """
+    if owner_id is None:
+        return
+    deltas = {'on_hand': on_hand}
+    if reason:
+        deltas[LEDGER_FIELDS[reason]] = quantity
+    increment(OwnerLedger, ('owner_id',), {(owner_id,): deltas})
+
+
+def reserve_capacity(block_id, quantity):
+    """Take `quantity` units of space in a block, only if that much is still free."""
+    updated = Block.objects.filter(pk=block_id, free_capacity__gte=quantity).update(
+        used_capacity=F('used_capacity') + quantity,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise StockError("Not enough block capacity")
+
+
+def release_capacity(block_id, quantity):
+    Block.objects.filter(pk=block_id).update(
+        used_capacity=Greatest(F('used_capacity') - quantity, 0),
+        updated_at=timezone.now(),
+    )
+
+
+def increase_quantity(inventory_id, quantity):
+    Inventory.objects.filter(pk=inventory_id).update(
+        current_quantity=F('current_quantity') + quantity,
+        updated_at=timezone.now(),
+    )
+
+
+def decrease_quantity(inventory_id, quantity):
+    """Remove `quantity` units from an inventory, only if that much is on hand."""
+    updated = Inventory.objects.filter(pk=inventory_id, current_quantity__gte=quantity).update(
+        current_quantity=F('current_quantity') - quantity,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        available = Inventory.objects.filter(pk=inventory_id).values_list('current_quantity', flat=True).first()
+        raise StockError(f"Not enough stock. Available: {available or 0}")
+
+
+def bulk_decrease_quantity(deltas):
+    """
+    Take stock out of several inventories with a single UPDATE. Each row is
+    only changed if it still holds enough stock; otherwise nothing is changed.
+    """
+    updated = Inventory.objects.filter(
+        id__in=deltas,
+        current_quantity__gte=increment_case(deltas),
+    ).update(
+        current_quantity=F('current_quantity') - increment_case(deltas),
+        updated_at=timezone.now(),
+    )
+    if updated != len(deltas):
+        raise StockError("Insufficient stock")
+
+
+def bulk_release_capacity(deltas):
+    Block.objects.filter(id__in=deltas).update(
+        used_capacity=Greatest(F('used_capacity') - increment_case(deltas), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def create_inventory(item, block, quantity, user):
+    try:
+        with write_transaction():
+            reserve_capacity(block.id, quantity)
+            inventory = Inventory.objects.create(item=item, block=block, current_quantity=quantity)
+            adjust_item_totals({item.id: quantity})
+            adjust_ledger(item.owner_id, on_hand=quantity)
+            StockIn.objects.create(
+                inventory=inventory,
+                quantity=quantity,
+                cost_price=item.unit_price,
+                added_by=user
+            )
+    except IntegrityError:
+        # Lost a race with another request creating the same (item, block).
+        raise StockError("Inventory for this item and block already exists")
+    return inventory
+
+
+def stock_in(inventory, quantity, user, cost_price):
+    """
+    Add stock to an existing inventory. Each counter is changed by a single
+    conditional UPDATE, so concurrent stock-ins and stock-outs never overwrite
+    each other's changes.
+    """
+    with write_transaction():
+        reserve_capacity(inventory.block_id, quantity)
+        increase_quantity(inventory.id, quantity)
+        adjust_item_totals({inventory.item_id: quantity})
+        adjust_ledger(inventory.item.owner_id, on_hand=quantity)
+        return StockIn.objects.create(
+            inventory=inventory,
+            quantity=quantity,
+            cost_price=cost_price,
+            added_by=user
+        )
+
+
+def stock_out(inventory, quantity, reason, user):
+    with write_transaction():
+        decrease_quantity(inventory.id, quantity)
+        release_capacity(inventory.block_id, quantity)
+        adjust_item_totals({inventory.item_id: -quantity})
+        adjust_ledger(inventory.item.owner_id, on_hand=-quantity, reason=reason, quantity=quantity)
+        return StockOut.objects.create(
+            inventory=inventory,
+            quantity=quantity,
+            reason=reason,
+            removed_by=user
+        )
+
+
+def bulk_stock_in(owner, user, lines):
+    """
+    Receive many {item_id, block_id, quantity} lines in one transaction.
+
+    Lookups, the capacity check and all writes are set-based, so the number of
+    queries does not depend on the number of lines.
+    """
+    quantities = defaultdict(int)
+    for line in lines:
+        quantities[(line['item_id'], line['block_id'])] += line['quantity']
+
+    item_ids = {item_id for item_id, _ in quantities}
+    block_ids = {block_id for _, block_id in quantities}
+
+    unit_prices = dict(
+        Item.objects.filter(owner=owner, id__in=item_ids).values_list('id', 'unit_price')
+    )
+    missing_items = sorted(item_ids - unit_prices.keys())
+    if missing_items:
+        raise StockError("Item not found", {"item_ids": missing_items}, status.HTTP_404_NOT_FOUND)
+
+    with write_transaction():
+        free = dict(
+            Block.objects.select_for_update(of=('self',))
+            .filter(warehouse__owner=owner, id__in=block_ids)
+            .order_by('id')
+            .values_list('id', 'free_capacity')
+        )
+        missing_blocks = sorted(block_ids - free.keys())
+        if missing_blocks:
+            raise StockError("Block not found", {"block_ids": missing_blocks}, status.HTTP_404_NOT_FOUND)
+
+        per_block = defaultdict(int)
+        for (_, block_id), quantity in quantities.items():
+            per_block[block_id] += quantity
+
+        over_capacity = [
+            {"block_id": block_id, "requested": requested, "available": free[block_id]}
+            for block_id, requested in sorted(per_block.items())
+            if requested > free[block_id]
+        ]
+        if over_capacity:
+            raise StockError("Not enough block capacity", over_capacity)
+
+        existing = {
+            (item_id, block_id): inventory_id
+            for inventory_id, item_id, block_id in Inventory.objects.select_for_update()
+            .filter(item_id__in=item_ids, block_id__in=block_ids)
+            .order_by('id')
+            .values_list('id', 'item_id', 'block_id')
+            if (item_id, block_id) in quantities
+        }
+
+        created = Inventory.objects.bulk_create([
+            Inventory(item_id=item_id, block_id=block_id, current_quantity=quantity)
+            for (item_id, block_id), quantity in quantities.items()
+            if (item_id, block_id) not in existing
+        ])
+        inventory_ids = dict(existing)
+        inventory_ids.update({(inv.item_id, inv.block_id): inv.id for inv in created})
+
+        increments = {existing[key]: quantities[key] for key in existing}
+        if increments:
+            Inventory.objects.filter(id__in=increments).update(
+                current_quantity=F('current_quantity') + increment_case(increments),
+                updated_at=timezone.now(),
+            )
+
+        updated = Block.objects.filter(
+            id__in=per_block,
+            free_capacity__gte=increment_case(per_block),
+        ).update(
+            used_capacity=F('used_capacity') + increment_case(per_block),
+            updated_at=timezone.now(),
+        )
+        if updated != len(per_block):
+            raise StockError("Not enough block capacity")
+
+        StockIn.objects.bulk_create([
+            StockIn(
+                inventory_id=inventory_ids[(item_id, block_id)],
+                quantity=quantity,
+                cost_price=unit_prices[item_id],
+                added_by=user,
+            )
+            for (item_id, block_id), quantity in quantities.items()
+        ])
+
+        per_item = defaultdict(int)
+        for (item_id, _), quantity in quantities.items():
+            per_item[item_id] += quantity
+        adjust_item_totals(per_item)
+        adjust_ledger(owner.id, on_hand=sum(quantities.values()))
+
+    return {
+        "lines": len(quantities),
+        "created_inventories": len(created),
+        "updated_inventories": len(existing),
+        "total_quantity": sum(quantities.values()),
+    }
@@ -1,3 +1,1385 @@
-from django.test import TestCase
+import gzip
+import re
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import analytics, jobs
+from .catalog_import import CatalogImport, import_catalog
+from .authentication import TenantJWTAuthentication, clear_checks
+from .cache import cache_stats, reset_cache_stats
+from .idempotency import _fingerprint
+from .management.commands.stress_inventory import run_contention
+from .management.commands.verify_ledger import derive_ledgers
+from .metrics import registry
+from .models import (
+    Block, BlockDailyProfit, Category, Customer, CustomUser, DailySales, IdempotencyKey, Inventory, Item,
+    ItemDailySales, ItemSalesTotal, ItemStockTotal, Job, Order, OwnerLedger, ProfitLossReport, StockIn, StockOut,
+    WareHouseLocation, job_output_storage,
+)
+from .orders import place_order
+from .readers import BlockInventoryItemReader, InvalidFields, OrderReader
+from .reports import generate_profit_loss_report
+from .routers import PrimaryReplicaRouter, choose_replica, reads_from, tracking_writes
+from .rollups import block_profit, block_profit_from_sales, daily_sales, top_sellers
+from .serializers import BlockInventoryItemSerializer, OrderListSerializer
+from .stock import StockError, create_inventory, stock_in, stock_out
+from .write_queue import WriteQueue, queue as write_queue
+
+
+def create_inventory_fixture(capacity=100, quantity=10):
+    admin = CustomUser.objects.create_user(
+        email="admin@example.com", password="secret123", name="Admin",
+        user_type=CustomUser.UserType.ADMIN,
+    )
+    category = Category.objects.create(owner=admin, name="General")
+    item = Item.objects.create(
+        owner=admin, name="Widget", sku="W-1", category=category,
+        unit_price=5, selling_price=8,
+    )
+    warehouse = WareHouseLocation.objects.create(owner=admin, name="Main")
+    block = Block.objects.create(warehouse=warehouse, name="A1", item_capacity=capacity, used_capacity=quantity)
+    inventory = Inventory.objects.create(item=item, block=block, current_quantity=quantity)
+    return admin, inventory
+
+
+def create_customer(admin, name="Jo", phone="1"):
+    return Customer.objects.create(
+        owner=admin, customer_name=name, customer_phone=phone,
+        customer_email=f"{name.lower()}@example.com", customer_address="Street",
+    )
+
+
+def run_backfill(migration, function):
+    """Call a data migration's function with the historical models of the state it runs in."""
+    state = MigrationExecutor(connection).loader.project_state(('inventory', migration))
+    getattr(import_module(f'inventory.migrations.{migration}'), function)(state.apps, None)
+
+
+class StockMutationTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+
+    def test_stock_in_is_rejected_when_block_is_full(self):
+        with self.assertRaises(StockError):
+            stock_in(self.inventory, 91, self.admin, 5)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_quantity, 10)
+
+    def test_stock_out_is_rejected_when_stock_is_short(self):
+        with self.assertRaises(StockError):
+            stock_out(self.inventory, 11, 'damage', self.admin)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_quantity, 10)
+
+    def test_stock_in_and_out_move_quantity_and_capacity_together(self):
+        stock_in(self.inventory, 15, self.admin, 5)
+        stock_out(self.inventory, 5, 'transfer', self.admin)
+        self.inventory.refresh_from_db()
+        block = Block.objects.get(pk=self.inventory.block_id)
+        self.assertEqual(self.inventory.current_quantity, 20)
+        self.assertEqual(block.used_capacity, 20)
+
+
+class BulkStockInTests(TestCase):
+    url = '/api/inventory-management/bulk-stock-in/'
+
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        self.item, self.block = self.inventory.item, self.inventory.block
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def receive(self, *lines):
+        return self.client.post(self.url, {'items': [
+            {'item_id': item_id, 'block_id': block_id, 'quantity': quantity} for item_id, block_id, quantity in lines
+        ]}, format='json')
+
+    def add_items(self, count):
+        return [
+            Item.objects.create(
+                owner=self.admin, name=f"Part {number}", sku=f"P-{number}", category=self.item.category,
+                unit_price=2, selling_price=3,
+            )
+            for number in range(count)
+        ]
+
+    def test_existing_rows_are_topped_up_and_new_ones_created(self):
+        other = self.add_items(1)[0]
+        response = self.receive((self.item.id, self.block.id, 5), (other.id, self.block.id, 3))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data'], {
+            "lines": 2, "created_inventories": 1, "updated_inventories": 1, "total_quantity": 8,
+        })
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_quantity, 15)
+        self.assertEqual(Inventory.objects.get(item=other).current_quantity, 3)
+        self.assertEqual(Block.objects.get(pk=self.block.id).used_capacity, 18)
+
+    def test_over_capacity_block_rejects_the_whole_batch(self):
+        other = self.add_items(1)[0]
+        response = self.receive((other.id, self.block.id, 10), (self.item.id, self.block.id, 81))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{"block_id": self.block.id, "requested": 91, "available": 90}])
+        self.assertFalse(Inventory.objects.filter(item=other).exists())
+        self.assertEqual(Inventory.objects.get().current_quantity, 10)
+        self.assertEqual(Block.objects.get(pk=self.block.id).used_capacity, 10)
+        self.assertFalse(StockIn.objects.exists())
+
+    def test_another_tenants_item_or_block_is_not_found(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other", user_type=CustomUser.UserType.ADMIN,
+        )
+        their_item = Item.objects.create(
+            owner=other, name="Theirs", sku="T-1", category=Category.objects.create(owner=other, name="Theirs"),
+            unit_price=1, selling_price=2,
+        )
+        their_block = Block.objects.create(
+            warehouse=WareHouseLocation.objects.create(owner=other, name="Theirs"), name="T1", item_capacity=50,
+        )
+        self.assertEqual(self.receive((their_item.id, self.block.id, 1)).status_code, 404)
+        self.assertEqual(self.receive((self.item.id, their_block.id, 1)).status_code, 404)
+        self.assertFalse(StockIn.objects.exists())
+
+    def test_query_count_does_not_grow_with_lines(self):
+        items = self.add_items(6)
+
+        def queries(lines):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.receive(*lines).status_code, 201)
+            return len(captured)
+
+        few = queries([(item.id, self.block.id, 1) for item in items[:1]] + [(self.item.id, self.block.id, 1)])
+        many = queries([(item.id, self.block.id, 1) for item in items] + [(self.item.id, self.block.id, 1)])
+        self.assertEqual(few, many)
+
+
+class ItemStockTotalTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        call_command('rebuild_item_stock_totals', stdout=StringIO())
+
+    def total(self):
+        return ItemStockTotal.objects.get(item_id=self.inventory.item_id).total_quantity
+
+    def test_rebuild_matches_inventory(self):
+        self.assertEqual(self.total(), 10)
+
+    def test_stock_changes_keep_total_current(self):
+        stock_in(self.inventory, 5, self.admin, 5)
+        stock_out(self.inventory, 3, 'damage', self.admin)
+        self.assertEqual(self.total(), 12)
+
+    def test_deleting_a_block_or_warehouse_takes_its_stock_off_the_total(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.delete(f'/api/blocks/delete/{self.inventory.block_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Inventory.objects.exists())
+        self.assertEqual(self.total(), 0)
+
+        block = Block.objects.create(warehouse=WareHouseLocation.objects.get(), name="B1", item_capacity=50)
+        create_inventory(self.inventory.item, block, 7, self.admin)
+        self.assertEqual(self.total(), 7)
+        client.delete(f'/api/warehouses/delete/{block.warehouse_id}/')
+        self.assertEqual(self.total(), 0)
+
+    def test_deleting_an_item_drops_its_total(self):
+        Item.objects.filter(pk=self.inventory.item_id).delete()
+        self.assertFalse(ItemStockTotal.objects.exists())
+
+    def test_migration_starts_existing_items_from_their_stock(self):
+        ItemStockTotal.objects.all().delete()
+        run_backfill('0008_itemstocktotal', 'backfill_item_stock_totals')
+        self.assertEqual(self.total(), 10)
+
+    def test_product_wise_endpoint_is_paginated(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/inventory-management/product-wise-total/', {'page_size': 1})
+        data = response.data['data']
+        self.assertEqual(data['results'], [{"item_id": self.inventory.item_id, "item_name": "Widget", "total_quantity": 10}])
+        self.assertIsNone(data['next'])
+
+
+class InventoryCheckTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def check(self, **data):
+        return self.client.post('/api/inventory-management/check-inventory/', {
+            'item_id': self.inventory.item_id, 'quantity': 5, 'strategy': 'same-warehouse-first', **data,
+        }, format='json')
+
+    def test_preferred_warehouse_must_be_the_tenants(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other", user_type=CustomUser.UserType.ADMIN,
+        )
+        elsewhere = WareHouseLocation.objects.create(owner=other, name="Elsewhere")
+
+        self.assertEqual(self.check(warehouse_id='abc').status_code, 400)
+        self.assertEqual(self.check(warehouse_id=elsewhere.id).status_code, 400)
+        response = self.check(warehouse_id=self.inventory.block.warehouse_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['suggestions'][0]['block_id'], self.inventory.block_id)
+
+    def test_malformed_input_is_a_400(self):
+        self.assertEqual(self.check(quantity='abc').status_code, 400)
+        self.assertEqual(self.check(quantity=0).status_code, 400)
+        self.assertEqual(self.check(item_id='abc').status_code, 400)
+        self.assertEqual(self.check(strategy='random').status_code, 400)
+
+    def placed(self, strategy, quantity, **data):
+        """(block name, units) suggested by a strategy; Main holds A1 (90 free), B1 (30) and C1 (60), Second D1 (200)."""
+        main = self.inventory.block.warehouse
+        second = WareHouseLocation.objects.create(owner=self.admin, name="Second")
+        for warehouse, name, capacity in ((main, "B1", 30), (main, "C1", 60), (second, "D1", 200)):
+            Block.objects.get_or_create(warehouse=warehouse, name=name, defaults={'item_capacity': capacity})
+        response = self.check(strategy=strategy, quantity=quantity, **data)
+        self.assertEqual(response.status_code, 200)
+        return [(row['block_name'], row['can_store']) for row in response.data['suggestions']]
+
+    def test_first_fit_fills_blocks_in_creation_order(self):
+        self.assertEqual(self.placed('first-fit', 100), [("A1", 90), ("B1", 10)])
+
+    def test_best_fit_takes_the_tightest_block_that_holds_everything(self):
+        self.assertEqual(self.placed('best-fit', 50), [("C1", 50)])
+
+    def test_fewest_blocks_starts_from_the_largest(self):
+        self.assertEqual(self.placed('fewest-blocks', 250), [("D1", 200), ("A1", 50)])
+
+    def test_same_warehouse_first_uses_the_preferred_warehouse_before_others(self):
+        main = self.inventory.block.warehouse_id
+        self.assertEqual(
+            self.placed('same-warehouse-first', 200, warehouse_id=main),
+            [("A1", 90), ("C1", 60), ("B1", 30), ("D1", 20)],
+        )
+
+
+class OwnerLedgerTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        call_command('verify_ledger', fix=True, stdout=StringIO())
+
+    def test_stock_movements_update_ledger(self):
+        customer = create_customer(self.admin)
+        stock_in(self.inventory, 6, self.admin, 5)
+        stock_out(self.inventory, 2, 'damage', self.admin)
+        stock_out(self.inventory, 1, 'transfer', self.admin)
+        place_order(self.admin, self.admin, customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 4, 'selling_price': 8},
+        ])
+
+        ledger = OwnerLedger.objects.get(owner=self.admin)
+        self.assertEqual((ledger.on_hand, ledger.sold, ledger.damaged, ledger.transferred), (9, 4, 2, 1))
+
+        out = StringIO()
+        call_command('verify_ledger', stdout=out)
+        self.assertIn("All ledgers match", out.getvalue())
+
+    def test_summary_is_a_single_row_lookup(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = client.get('/api/inventory-management/summary/')
+        self.assertEqual(response.data['total_unsold'], 10)
+
+    def test_cascaded_inventory_deletes_leave_the_ledger_in_step(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.delete(f'/api/blocks/delete/{self.inventory.block_id}/')
+        self.assertEqual(OwnerLedger.objects.get(owner=self.admin).on_hand, 0)
+
+        block = Block.objects.create(warehouse=WareHouseLocation.objects.get(), name="B1", item_capacity=50)
+        create_inventory(self.inventory.item, block, 7, self.admin)
+        client.delete(f'/api/items/delete/{self.inventory.item_id}/')
+        self.assertEqual(OwnerLedger.objects.get(owner=self.admin).on_hand, 0)
+
+        out = StringIO()
+        call_command('verify_ledger', stdout=out)
+        self.assertIn("All ledgers match", out.getvalue())
+
+    def test_migration_starts_existing_tenants_from_their_stock(self):
+        OwnerLedger.objects.all().delete()
+        run_backfill('0013_ownerledger', 'backfill_ledgers')
+        self.assertEqual(OwnerLedger.objects.get(owner=self.admin).on_hand, 10)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin, _ = create_inventory_fixture()
+        customer = create_customer(self.admin)
+        self.orders = [
+            Order.objects.create(owner=self.admin, customer=customer, order_id=f"O{i}")
+            for i in range(5)
+        ]
+        # Ties on ordered_at must be broken by id.
+        Order.objects.filter(pk__in=[self.orders[1].pk, self.orders[2].pk]).update(
+            ordered_at=self.orders[1].ordered_at
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def fetch(self, **params):
+        return self.client.get('/api/inventory-management/orders-list/', {'page_size': 2, **params}).data
+
+    def test_pages_forward_and_back(self):
+        seen = []
+        page = self.fetch()
+        pages = [page]
+        seen += [row['order_id'] for row in page['results']]
+        while page['next']:
+            page = self.fetch(cursor=page['next'])
+            pages.append(page)
+            seen += [row['order_id'] for row in page['results']]
+        self.assertEqual(seen, ["O4", "O3", "O2", "O1", "O0"])
+
+        back = self.fetch(cursor=pages[-1]['previous'])
+        self.assertEqual(back['results'], pages[-2]['results'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/inventory-management/orders-list/', {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_integer_id_filters_are_rejected(self):
+        for url, param in [
+            ('/api/inventory-management/orders-list/', 'customer_id'),
+            ('/api/items/listview/', 'category_id'),
+            ('/api/blocks/listview/', 'warehouse_id'),
+        ]:
+            with self.subTest(param=param):
+                self.assertEqual(self.client.get(url, {param: 'abc'}).status_code, 400)
+
+
+class ReaderTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        customer = create_customer(self.admin)
+        place_order(self.admin, self.admin, customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 2, 'selling_price': 8},
+            {'inventory_id': self.inventory.id, 'quantity': 1, 'selling_price': 9},
+        ])
+
+    def test_order_reader_matches_serializer(self):
+        orders = Order.objects.all()
+        expected = [
+            {**order, 'items': sorted(order['items'], key=lambda line: line['id'])}
+            for order in OrderListSerializer(orders.prefetch_related('items'), many=True).data
+        ]
+        reader = OrderReader()
+        self.assertEqual(reader.render(reader.values(orders)), expected)
+
+    def test_block_items_reader_matches_serializer(self):
+        inventories = Inventory.objects.all()
+        reader = BlockInventoryItemReader()
+        self.assertEqual(
+            reader.render(reader.values(inventories)),
+            BlockInventoryItemSerializer(inventories, many=True).data,
+        )
+
+    def test_block_items_are_only_listed_to_the_blocks_tenant(self):
+        url = f'/api/block-items/{self.inventory.block_id}/'
+        client = APIClient()
+        self.assertEqual(client.get(url).status_code, 401)
+
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other", user_type=CustomUser.UserType.ADMIN,
+        )
+        client.force_authenticate(other)
+        self.assertEqual(client.get(url).status_code, 404)
+
+        client.force_authenticate(self.admin)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 1)
+
+    def test_sparse_fieldset(self):
+        reader = OrderReader('order_id,customer')
+        [order] = reader.render(reader.values(Order.objects.all(), 'id'))
+        self.assertEqual(set(order), {'order_id', 'customer'})
+        with self.assertRaises(InvalidFields):
+            OrderReader('nope')
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        reset_cache_stats()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_repeat_read_is_served_from_cache(self):
+        first = self.client.get('/api/items/listview/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/items/listview/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(cache_stats()['items'], {'hits': 1, 'misses': 1})
+
+    def test_query_parameters_are_part_of_the_key(self):
+        self.client.get('/api/items/listview/')
+        response = self.client.get('/api/items/listview/', {'page_size': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_items_by_category_rejects_a_non_integer_id(self):
+        self.assertEqual(self.client.get('/api/items/by-category/', {'category_id': 'abc'}).status_code, 400)
+        response = self.client.get('/api/items/by-category/', {'category_id': self.inventory.item.category_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_write_invalidates_only_its_tenant_and_namespace(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other",
+            user_type=CustomUser.UserType.ADMIN,
+        )
+        self.client.get('/api/items/listview/')
+        self.client.get('/api/warehouses/listview/')
+
+        Category.objects.create(owner=other, name="Elsewhere")
+        Item.objects.create(
+            owner=self.admin, name="Gadget", sku="G-1", category=self.inventory.item.category,
+            unit_price=1, selling_price=2,
+        )
+
+        items = self.client.get('/api/items/listview/')
+        warehouses = self.client.get('/api/warehouses/listview/')
+        self.assertEqual(items['X-Cache'], 'MISS')
+        self.assertEqual(len(items.json()['results']), 2)
+        self.assertEqual(warehouses['X-Cache'], 'HIT')
+
+    def test_block_change_invalidates_warehouse_reads(self):
+        self.client.get('/api/warehouses/listview/')
+        Block.objects.create(warehouse=self.inventory.block.warehouse, name="A2", item_capacity=10)
+        self.assertEqual(self.client.get('/api/warehouses/listview/')['X-Cache'], 'MISS')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_unchanged_list_returns_304_after_one_query(self):
+        first = self.client.get('/api/blocks/listview/')
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/blocks/listview/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_cached_catalog_read_answers_304_without_queries(self):
+        etag = self.client.get('/api/items/listview/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/items/listview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_stock_movement_changes_the_block_list_etag(self):
+        etag = self.client.get('/api/blocks/listview/')['ETag']
+        stock_in(self.inventory, 5, self.admin, 5)
+        self.assertEqual(self.client.get('/api/blocks/listview/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_update_and_delete_change_the_etag(self):
+        etag = self.client.get('/api/items/listview/')['ETag']
+        item = self.inventory.item
+        item.name = "Renamed"
+        item.save()
+        updated = self.client.get('/api/items/listview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(updated.status_code, 200)
+
+        Item.objects.create(
+            owner=self.admin, name="Gadget", sku="G-1", category=item.category, unit_price=1, selling_price=2,
+        )
+        etag = self.client.get('/api/items/listview/')['ETag']
+        Item.objects.filter(sku="G-1").delete()
+        self.assertEqual(self.client.get('/api/items/listview/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_order_etags_follow_the_items_and_customer_they_show(self):
+        customer = create_customer(self.admin)
+        order, _ = place_order(self.admin, self.admin, customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 1, 'selling_price': 8},
+        ])
+        detail = f'/api/inventory-management/orders/{order.order_id}/'
+        detail_etag = self.client.get(detail)['ETag']
+        list_etag = self.client.get('/api/inventory-management/orders-list/')['ETag']
+
+        Item.objects.filter(pk=self.inventory.item_id).update(name="Renamed", updated_at=timezone.now())
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['items'][0]['item_name'], "Renamed")
+        detail_etag = response['ETag']
+
+        customer.customer_name = "Ann"
+        customer.save()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+        self.assertEqual(
+            self.client.get('/api/inventory-management/orders-list/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200,
+        )
+
+    def test_list_ignores_if_modified_since_alone(self):
+        last_modified = self.client.get('/api/items/listview/')['Last-Modified']
+        response = self.client.get('/api/items/listview/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_honours_if_modified_since(self):
+        url = f'/api/items/detail/{self.inventory.item_id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_validators_are_per_tenant(self):
+        etag = self.client.get('/api/items/listview/')['ETag']
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other",
+            user_type=CustomUser.UserType.ADMIN,
+        )
+        self.client.force_authenticate(other)
+        response = self.client.get('/api/items/listview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Plan assertions are written against SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(TestCase):
+    """Every SELECT an endpoint runs must reach its rows through an index."""
+
+    SCAN = re.compile(r'^SCAN (inventory_\w+)')
+
+    def setUp(self):
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.customer = create_customer(self.admin, name="Ann", phone="555")
+        self.order, _ = place_order(self.admin, self.admin, self.customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 1, 'selling_price': '8.00'},
+        ])
+        generate_profit_loss_report(timezone.localdate())
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def full_scans(self, queries, allowed=()):
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                for *_, detail in cursor.fetchall():
+                    match = self.SCAN.match(detail)
+                    if match and match.group(1) not in allowed:
+                        scans.append(f"{detail}\n    {query['sql']}")
+        return scans
+
+    def test_read_endpoints_use_indexes(self):
+        item = self.inventory.item
+        block = self.inventory.block
+        urls = [
+            '/api/items/listview/',
+            f'/api/items/listview/?category_id={item.category_id}',
+            f'/api/items/detail/{item.id}/',
+            f'/api/items/by-category/?category_id={item.category_id}',
+            '/api/categories/listview/',
+            '/api/categories/all/',
+            '/api/warehouses/listview/',
+            f'/api/warehouses/{block.warehouse_id}/',
+            '/api/blocks/listview/',
+            f'/api/blocks/listview/?warehouse_id={block.warehouse_id}',
+            f'/api/block-items/{block.id}/',
+            '/api/inventory-management/orders-list/',
+            '/api/inventory-management/orders-list/?status=confirmed&ordered_after=2020-01-01',
+            f'/api/inventory-management/orders-list/?customer_id={self.customer.id}',
+            f'/api/inventory-management/orders/{self.order.order_id}/',
+            '/api/inventory-management/customers/',
+            '/api/inventory-management/customers/?phone=555',
+            '/api/inventory-management/summary/',
+            '/api/inventory-management/product-wise-total/',
+            '/api/inventory-management/total-quantity/',
+            '/api/charts/top-selling-products/',
+            '/api/charts/top-selling-products/?window=7d',
+            '/api/charts/block-pie-chart/',
+            '/api/charts/daily-chart/',
+            '/api/export-profit-loss-today/',
+            '/api/item-wise-profit/',
+            '/api/category-wise-profit/',
+            '/api/employees/',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.full_scans(queries), [])
+
+    def test_write_endpoints_use_indexes(self):
+        requests = [
+            ('/api/inventory-management/create-order/', {
+                'customer': {
+                    'customer_name': "Ann", 'customer_phone': "555",
+                    'customer_email': "ann@example.com", 'customer_address': "Street",
+                },
+                'items': [{'inventory_id': self.inventory.id, 'quantity': 1, 'selling_price': '8.00'}],
+            }),
+            ('/api/inventory-management/update-inventory/', {
+                'item_id': self.inventory.item_id, 'block_id': self.inventory.block_id, 'quantity': 1,
+            }),
+            ('/api/inventory-management/stock-out/', {
+                'inventory_id': self.inventory.id, 'quantity': 1, 'reason': 'damage',
+            }),
+            ('/api/inventory-management/bulk-stock-in/', {
+                'items': [{'item_id': self.inventory.item_id, 'block_id': self.inventory.block_id, 'quantity': 1}],
+            }),
+        ]
+        for url, body in requests:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.post(url, body, format='json')
+                self.assertLess(response.status_code, 300)
+                self.assertEqual(self.full_scans(queries), [])
+
+    def test_report_generation_reads_movements_by_date(self):
+        with CaptureQueriesContext(connection) as queries:
+            generate_profit_loss_report(timezone.localdate())
+        # The report covers every stocked item, so listing them is a scan by design.
+        self.assertEqual(self.full_scans(queries, allowed={'inventory_inventory'}), [])
+
+    def test_inventory_is_unique_per_item_and_block(self):
+        with self.assertRaises(StockError):
+            create_inventory(self.inventory.item, self.inventory.block, 1, self.admin)
+        self.assertEqual(Inventory.objects.filter(item=self.inventory.item, block=self.inventory.block).count(), 1)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.operator = CustomUser.objects.create_user(
+            email="ops@example.com", password="secret123", name="Ops", is_staff=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_requests_are_recorded_per_route_with_sql(self):
+        self.client.get('/api/items/listview/')
+        self.client.get(f'/api/items/detail/{self.inventory.item_id}/')
+        self.client.force_authenticate(self.operator)
+        body = self.client.get('/api/metrics/').content.decode()
+
+        self.assertIn(
+            'inventory_http_requests_total{route="api/items/listview/",method="GET",status="200"} 1', body
+        )
+        self.assertIn(
+            'inventory_http_request_duration_seconds_count{route="api/items/detail/<int:pk>/",method="GET"} 1', body
+        )
+        self.assertIn(
+            'inventory_http_request_duration_seconds_bucket{route="api/items/listview/",method="GET",le="+Inf"} 1', body
+        )
+        queries = re.search(r'inventory_db_queries_total\{route="api/items/listview/",method="GET"\} (\d+)', body)
+        self.assertGreater(int(queries.group(1)), 0)
+        self.assertIn('inventory_catalog_cache_requests_total{namespace="items",outcome="misses"} 1', body)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_only_counted(self):
+        self.client.get('/api/items/listview/')
+        requests, routes = registry.snapshot()
+        self.assertEqual(requests[('api/items/listview/', 'GET', 200)], 1)
+        self.assertEqual(routes, {})
+
+    def test_metrics_are_for_operators_only(self):
+        employee = CustomUser.objects.create_user(
+            email="employee@example.com", password="secret123", name="Employee",
+            user_type=CustomUser.UserType.EMPLOYEE, admin_owner=self.admin,
+        )
+        for user in (self.admin, employee):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+
+        with override_settings(METRICS_TOKEN='scrape-me'):
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='wrong').status_code, 401)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='scrape-me').status_code, 200)
+        self.client.force_authenticate(self.operator)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+
+class TenantJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_checks()
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.employee = CustomUser.objects.create_user(
+            email="employee@example.com", password="secret123", name="Employee",
+            user_type=CustomUser.UserType.EMPLOYEE, admin_owner=self.admin,
+        )
+        self.client = APIClient()
+
+    def login(self, email):
+        response = self.client.post('/api/login/', {'email': email, 'password': 'secret123'}, format='json')
+        return response.json()['data']['access']
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return TenantJWTAuthentication().authenticate(request)[0]
+
+    def test_login_token_carries_type_and_tenant(self):
+        token = AccessToken(self.login(self.employee.email))
+        self.assertEqual(token['user_type'], CustomUser.UserType.EMPLOYEE)
+        self.assertEqual(token['tenant_id'], self.admin.id)
+
+    def test_principal_is_built_without_queries(self):
+        access = self.login(self.employee.email)
+        self.authenticate(access)
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+            self.assertEqual(user.effective_admin.id, self.admin.id)
+            self.assertTrue(user.is_authenticated)
+        self.assertEqual(user.email, self.employee.email)
+
+    def test_deactivated_user_is_rejected(self):
+        access = self.login(self.employee.email)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/items/listview/').status_code, 200)
+        self.employee.is_active = False
+        self.employee.save()
+        self.assertEqual(self.client.get('/api/items/listview/').status_code, 401)
+
+    def test_moved_employee_token_is_rejected(self):
+        access = self.login(self.employee.email)
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other",
+            user_type=CustomUser.UserType.ADMIN,
+        )
+        self.employee.admin_owner = other
+        self.employee.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/items/listview/').status_code, 401)
+
+    def test_token_without_claims_falls_back_to_lookup(self):
+        access = str(AccessToken.for_user(self.employee))
+        with self.assertNumQueries(1):
+            user = self.authenticate(access)
+        self.assertEqual(user.effective_admin, self.admin)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_use_the_replica_only_inside_reads_from(self):
+        with tracking_writes():
+            self.assertIsNone(self.router.db_for_read(Item))
+            with reads_from('replica1'):
+                self.assertEqual(self.router.db_for_read(Item), 'replica1')
+                self.assertEqual(self.router.db_for_write(Item), 'default')
+                self.assertIsNone(self.router.db_for_read(Item))
+
+    def test_open_transaction_reads_the_primary(self):
+        with tracking_writes(), reads_from('replica1'), transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Item))
+
+    def test_tenant_sticks_to_the_primary_after_writing(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other",
+            user_type=CustomUser.UserType.ADMIN,
+        )
+        self.assertEqual(choose_replica(self.admin), 'replica1')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/categories/create/', {'name': "Tools"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(choose_replica(self.admin))
+        self.assertEqual(choose_replica(other), 'replica1')
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self, seed):
+        call_command(
+            'generate_synthetic_data', seed=seed, tenants=2, employees=1, warehouses=2, blocks_per_warehouse=2,
+            categories=2, items=20, customers=5, orders=30, batch_size=7, end_date=datetime(2026, 1, 31),
+            stdout=StringIO(),
+        )
+
+    def test_generated_tenants_are_internally_consistent(self):
+        self.generate(seed=3)
+        for ledger in OwnerLedger.objects.all():
+            derived = derive_ledgers()[ledger.owner_id]
+            self.assertEqual((ledger.on_hand, ledger.sold), (derived['on_hand'], derived['sold']))
+        for block in Block.objects.all():
+            on_hand = sum(Inventory.objects.filter(block=block).values_list('current_quantity', flat=True))
+            self.assertEqual(block.used_capacity, on_hand)
+        self.assertEqual(Order.objects.count(), 60)
+        self.assertEqual(Order.objects.filter(ordered_at__gte=timezone.make_aware(datetime(2026, 1, 31))).count(), 0)
+
+    def test_same_seed_generates_the_same_orders(self):
+        self.generate(seed=3)
+        first = list(Order.objects.order_by('order_id').values_list('order_id', 'ordered_at', 'items__quantity'))
+        Order.objects.all().delete()
+        CustomUser.objects.all().delete()
+        self.generate(seed=3)
+        second = list(Order.objects.order_by('order_id').values_list('order_id', 'ordered_at', 'items__quantity'))
+        self.assertEqual(first, second)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        self.customer = create_customer(self.admin)
+
+    def line(self, quantity, inventory_id=None):
+        return {
+            'inventory_id': inventory_id or self.inventory.id,
+            'quantity': quantity,
+            'selling_price': 8,
+        }
+
+    def test_query_count_does_not_grow_with_lines(self):
+        with CaptureQueriesContext(connection) as single:
+            place_order(self.admin, self.admin, self.customer, [self.line(1)])
+        with CaptureQueriesContext(connection) as several:
+            order, order_items = place_order(self.admin, self.admin, self.customer, [self.line(1) for _ in range(5)])
+        self.inventory.refresh_from_db()
+        self.assertEqual(len(several), len(single))
+        self.assertEqual(len(order_items), 5)
+        self.assertEqual(StockOut.objects.filter(reason='sale').count(), 6)
+        self.assertEqual(self.inventory.current_quantity, 4)
+
+    def test_order_is_rolled_back_when_stock_is_short(self):
+        with self.assertRaises(StockError):
+            place_order(self.admin, self.admin, self.customer, [self.line(6), self.line(6)])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_quantity, 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_inventory_is_reported(self):
+        with self.assertRaises(StockError) as ctx:
+            place_order(self.admin, self.admin, self.customer, [self.line(1), self.line(1, inventory_id=999)])
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+class IdempotentOrderTests(TestCase):
+    url = '/api/inventory-management/create-order/'
+
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.payload = {
+            'customer': {
+                'customer_name': "Jo", 'customer_phone': "1",
+                'customer_email': "jo@example.com", 'customer_address': "Street",
+            },
+            'items': [{'inventory_id': self.inventory.id, 'quantity': 2, 'selling_price': "8.00"}],
+        }
+
+    def post(self, payload, key):
+        return self.client.post(self.url, payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.post(self.payload, 'abc')
+        second = self.post(self.payload, 'abc')
+        self.inventory.refresh_from_db()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.inventory.current_quantity, 8)
+
+    def test_key_reused_with_different_payload_is_rejected(self):
+        self.post(self.payload, 'abc')
+        self.payload['items'][0]['quantity'] = 3
+        response = self.post(self.payload, 'abc')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def in_flight_key(self, locked_until):
+        # What a worker killed mid-request leaves behind: a claim with no response.
+        return IdempotencyKey.objects.create(
+            owner=self.admin, key='abc', request_hash=_fingerprint(self.payload),
+            expires_at=timezone.now() + timedelta(hours=24), locked_until=locked_until,
+        )
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_retry_waits_on_a_key_that_is_still_leased(self):
+        self.in_flight_key(timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.post(self.payload, 'abc').status_code, 409)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_retry_takes_over_a_key_whose_lease_ran_out(self):
+        self.in_flight_key(timezone.now() - timedelta(seconds=1))
+        response = self.post(self.payload, 'abc')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.post(self.payload, 'abc')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class ProfitLossReportTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        customer = create_customer(self.admin)
+        stock_in(self.inventory, 4, self.admin, 5)
+        place_order(self.admin, self.admin, customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 3, 'selling_price': 8},
+        ])
+
+    def test_report_is_upserted_per_item_and_day(self):
+        today = timezone.now().date()
+        generate_profit_loss_report(today)
+        generate_profit_loss_report(today)
+
+        report = ProfitLossReport.objects.get()
+        self.assertEqual(report.total_stock_in, 4)
+        self.assertEqual(report.total_stock_out, 3)
+        self.assertEqual(report.total_cost, 20)
+        self.assertEqual(report.total_revenue, 24)
+        self.assertEqual(report.profit, 4)
+
+    def test_several_workers_on_default_sqlite_run_one_day_at_a_time(self):
+        today = timezone.now().date()
+        out, err = StringIO(), StringIO()
+        call_command(
+            'generate_profit_loss_reports', start=str(today - timedelta(days=2)), end=str(today), workers=3,
+            stdout=out, stderr=err,
+        )
+        self.assertIn("using 1 worker", err.getvalue())
+        self.assertIn("Generated reports for 3 days.", out.getvalue())
+        self.assertEqual(ProfitLossReport.objects.count(), 3)
+        self.assertEqual(ProfitLossReport.objects.get(generated_on__date=today).profit, 4)
+
+    def test_export_streams_csv_and_gzip(self):
+        generate_profit_loss_report(timezone.now().date())
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = '/api/export-profit-loss-today/'
+
+        response = client.get(url)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Item Name')
+        self.assertTrue(lines[1].startswith('Widget,4,3,20.0,24.0,4.0,'))
+
+        response = client.get(url, {'compress': 'gzip'})
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)).decode().splitlines(), lines)
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        output_root = tempfile.TemporaryDirectory()
+        self.addCleanup(output_root.cleanup)
+        overrides = override_settings(JOB_OUTPUT_ROOT=output_root.name, JOB_SCHEDULES=[])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.admin, self.inventory = create_inventory_fixture()
+        stock_in(self.inventory, 4, self.admin, 5)
+
+    def test_async_export_is_run_by_the_worker_and_downloaded(self):
+        generate_profit_loss_report(timezone.localdate())
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.get('/api/export-profit-loss-today/', {'async': 'true'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['data']['id']
+        self.assertEqual(response.json()['data']['status'], Job.Status.QUEUED)
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+        data = client.get(f'/api/jobs/{job_id}/').json()['data']
+        self.assertEqual(data['status'], Job.Status.SUCCEEDED)
+
+        response = client.get(data['download'])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Item Name')
+        self.assertTrue(lines[1].startswith('Widget,4,0,'))
+
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other", user_type=CustomUser.UserType.ADMIN,
+        )
+        client.force_authenticate(other)
+        self.assertEqual(client.get(data['download']).status_code, 404)
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        calls = []
+
+        def flaky(job):
+            calls.append(job.attempts)
+            raise RuntimeError("boom")
+
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': flaky}), override_settings(JOB_RETRY_BACKOFF=10):
+            job = jobs.enqueue('flaky', max_attempts=2)
+            self.assertEqual(jobs.run(jobs.claim('test')), Job.Status.QUEUED)
+            job.refresh_from_db()
+            self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+            self.assertIsNone(jobs.claim('test'))
+
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.assertEqual(jobs.run(jobs.claim('test')), Job.Status.FAILED)
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [1, 2])
+        self.assertIn("RuntimeError: boom", job.error)
+        self.assertEqual(jobs.retry_delay(1), 30)
+        self.assertEqual(jobs.retry_delay(3), 120)
+
+    def test_claims_respect_the_concurrency_limit(self):
+        with mock.patch.dict(jobs.HANDLERS, {'slow': lambda job: None}), \
+                override_settings(JOB_CONCURRENCY={'slow': 1}):
+            first, second = jobs.enqueue('slow'), jobs.enqueue('slow')
+            self.assertEqual(jobs.claim('a').pk, first.pk)
+            self.assertIsNone(jobs.claim('b'))
+            jobs.run(Job.objects.get(pk=first.pk))
+            self.assertEqual(jobs.claim('b').pk, second.pk)
+
+    def test_expired_lease_counts_as_a_failed_attempt(self):
+        with mock.patch.dict(jobs.HANDLERS, {'slow': lambda job: None}):
+            job = jobs.enqueue('slow')
+            jobs.claim('dead')
+            Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(jobs.reap_expired(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+
+    def test_lease_is_renewed_while_the_job_runs(self):
+        def slow(job):
+            time.sleep(0.3)
+
+        with mock.patch.dict(jobs.HANDLERS, {'slow': slow}):
+            with override_settings(JOB_LEASE_SECONDS=0.15), \
+                    mock.patch.object(jobs, 'renew_lease', return_value=1) as renew:
+                jobs.enqueue('slow')
+                self.assertEqual(jobs.run(jobs.claim('test')), Job.Status.SUCCEEDED)
+            self.assertGreaterEqual(renew.call_count, 2)
+
+            jobs.enqueue('slow')
+            job = jobs.claim('test')
+            self.assertEqual(jobs.renew_lease(job), 1)
+            Job.objects.filter(pk=job.pk).update(worker='someone-else')
+            self.assertEqual(jobs.renew_lease(job), 0)
+
+    def test_outputs_are_deleted_after_retention(self):
+        generate_profit_loss_report(timezone.localdate())
+        job = jobs.enqueue('profit_loss_export', owner=self.admin)
+        jobs.run(jobs.claim('test'))
+        job.refresh_from_db()
+        self.assertTrue(job.output.storage.exists(job.output.name))
+
+        self.assertEqual(jobs.purge_outputs(), 0)
+        self.assertEqual(jobs.purge_outputs(timezone.now() + timedelta(days=8)), 1)
+        self.assertFalse(job.output.storage.exists(job.output.name))
+        job.refresh_from_db()
+        self.assertEqual(job.output.name, '')
+
+    def test_scheduled_run_is_enqueued_once_and_reports_the_previous_day(self):
+        now = timezone.localtime()
+        with override_settings(JOB_SCHEDULES=[('profit_loss_report', '00:00')]):
+            jobs.schedule_due(now)
+            jobs.schedule_due(now)
+        job = Job.objects.get(kind='profit_loss_report')
+
+        jobs.run(jobs.claim('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(list(job.result['items']), [(now.date() - timedelta(days=1)).isoformat()])
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.admin, self.inventory = create_inventory_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, content, name='catalog.csv', **params):
+        query = '&'.join(f"{key}={value}" for key, value in params.items())
+        return self.client.post(
+            f'/api/items/import/?{query}', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart',
+        )
+
+    def test_csv_import_creates_updates_and_reports_bad_rows(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", password="secret123", name="Other", user_type=CustomUser.UserType.ADMIN,
+        )
+        Item.objects.create(owner=other, name="Theirs", sku="T-1", category=self.inventory.item.category,
+                            unit_price=1, selling_price=2)
+        self.client.get('/api/items/listview/')
+
+        response = self.upload(
+            "sku,name,category,unit_price,selling_price\n"
+            "W-1,Widget v2,General,6,9\n"
+            "N-1,Nut,Hardware,0.10,0.25\n"
+            "N-2,Bolt,Hardware,0.20,abc\n"
+            "N-1,Nut again,Hardware,1,2\n"
+            "T-1,Stolen,Hardware,1,2\n"
+        )
+        summary = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: summary[key] for key in ('rows', 'created', 'updated', 'failed', 'categories_created')},
+            {'rows': 5, 'created': 1, 'updated': 1, 'failed': 3, 'categories_created': 1},
+        )
+        self.assertEqual(sorted(error['line'] for error in summary['errors']), [4, 5, 6])
+
+        widget = Item.objects.get(sku='W-1')
+        self.assertEqual((widget.name, widget.selling_price), ("Widget v2", 9))
+        self.assertEqual(Item.objects.get(sku='N-1').category.name, "Hardware")
+        self.assertEqual(Item.objects.get(sku='T-1').owner, other)
+        # Bulk writes send no signals; the import drops the cached list itself.
+        self.assertEqual(self.client.get('/api/items/listview/')['X-Cache'], 'MISS')
+
+    def test_jsonl_import_in_chunks_with_one_sku_lookup_each(self):
+        lines = [
+            '{"sku": "J-%d", "name": "Item %d", "category": "Bulk", "unit_price": 1, "selling_price": 2}' % (n, n)
+            for n in range(10)
+        ]
+        lines.insert(3, 'not json')
+        content = '\n'.join(lines).encode()
+        with CaptureQueriesContext(connection) as queries:
+            summary = import_catalog(BytesIO(content), 'jsonl', self.admin, chunk_size=4)
+        self.assertEqual((summary['created'], summary['failed']), (10, 1))
+        self.assertEqual(summary['errors'][0]['line'], 4)
+        sku_lookups = [query for query in queries.captured_queries if 'WHERE "inventory_item"."sku" IN' in query['sql']]
+        self.assertEqual(len(sku_lookups), 3)
+
+        summary = import_catalog(BytesIO(content), 'jsonl', self.admin, on_conflict='skip')
+        self.assertEqual((summary['created'], summary['skipped'], summary['categories_created']), (0, 10, 0))
+
+    def test_chunk_that_keeps_conflicting_is_reported_not_raised(self):
+        content = '\n'.join(
+            '{"sku": "J-%d", "name": "Item %d", "category": "Bulk", "unit_price": 1, "selling_price": 2}' % (n, n)
+            for n in range(4)
+        ).encode()
+        write = CatalogImport.write
+
+        def conflicting(importer, valid):
+            if valid[0][1]['sku'] == 'J-0':
+                raise IntegrityError("UNIQUE constraint failed: inventory_item.sku")
+            return write(importer, valid)
+
+        with mock.patch.object(CatalogImport, 'write', autospec=True, side_effect=conflicting):
+            summary = import_catalog(BytesIO(content), 'jsonl', self.admin, chunk_size=2)
+        self.assertEqual((summary['created'], summary['failed']), (2, 2))
+        self.assertEqual([error['sku'] for error in summary['errors']], ['J-0', 'J-1'])
+        self.assertEqual(sorted(Item.objects.filter(sku__startswith='J-').values_list('sku', flat=True)), ['J-2', 'J-3'])
+
+    def test_large_upload_is_imported_by_a_job(self):
+        output_root = tempfile.TemporaryDirectory()
+        self.addCleanup(output_root.cleanup)
+        with override_settings(JOB_OUTPUT_ROOT=output_root.name, JOB_SCHEDULES=[]):
+            response = self.upload(
+                '{"sku": "A-1", "name": "Async", "category": "General", "unit_price": 1, "selling_price": 2}\n',
+                name='catalog.jsonl', **{'async': 'true'},
+            )
+            self.assertEqual(response.status_code, 202)
+            call_command('run_jobs', once=True, stdout=StringIO())
+
+        job = Job.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result['created'], 1)
+        self.assertEqual(Item.objects.get(sku='A-1').category, self.inventory.item.category)
+
+    def test_unreadable_uploads_are_rejected_before_queueing(self):
+        response = self.upload('sku,name\nX-1,Thing\n', file_format='xml', **{'async': 'true'})
+        self.assertEqual(response.status_code, 400)
+        response = self.upload('sku,name\nX-1,Thing\n', **{'async': 'true'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("unit_price", response.json()['error'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_import_job_fails_without_retrying_and_removes_the_upload(self):
+        output_root = tempfile.TemporaryDirectory()
+        self.addCleanup(output_root.cleanup)
+        with override_settings(JOB_OUTPUT_ROOT=output_root.name):
+            storage = job_output_storage()
+            name = storage.save('imports/bad.csv', BytesIO(b'sku,name\n'))
+            job = jobs.enqueue('catalog_import', {'upload': name, 'format': 'csv'}, owner=self.admin)
+            self.assertEqual(jobs.run(jobs.claim('test')), Job.Status.FAILED)
+            self.assertFalse(storage.exists(name))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("ImportFormatError", job.error)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        customer = create_customer(self.admin)
+        for quantity, price in [(2, 8), (3, 10)]:
+            place_order(self.admin, self.admin, customer, [
+                {'inventory_id': self.inventory.id, 'quantity': quantity, 'selling_price': price},
+            ])
+
+    def test_block_profit_rollup_matches_sales(self):
+        expected = [{'block_id': self.inventory.block_id, 'block_name': "A1", 'profit': 21}]
+        self.assertEqual(list(block_profit_from_sales(self.admin)), expected)
+        self.assertEqual(list(block_profit(self.admin)), expected)
+
+    def test_daily_sales_rollup(self):
+        today = timezone.localdate()
+        row = daily_sales(self.admin, today, today)[today]
+        self.assertEqual((row['revenue'], row['quantity']), (46, 5))
+
+    def test_top_sellers_by_window(self):
+        expected = [{
+            'item_id': self.inventory.item_id, 'item_name': "Widget", 'sku': "W-1",
+            'quantity_sold': 5, 'revenue': 46,
+        }]
+        self.assertEqual(top_sellers(self.admin, '7d'), expected)
+        self.assertEqual(top_sellers(self.admin, 'all'), expected)
+
+    def snapshot(self):
+        today = timezone.localdate()
+        return (
+            list(block_profit(self.admin)),
+            daily_sales(self.admin, today, today),
+            top_sellers(self.admin, '1d'),
+            top_sellers(self.admin, 'all'),
+        )
+
+    def test_rebuild_reproduces_rollups(self):
+        before = self.snapshot()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_migrations_backfill_rollups_from_existing_sales(self):
+        before = self.snapshot()
+        BlockDailyProfit.objects.all().delete()
+        DailySales.objects.all().delete()
+        ItemDailySales.objects.all().delete()
+        ItemSalesTotal.objects.all().delete()
+        run_backfill('0010_blockdailyprofit', 'backfill_block_daily_profit')
+        run_backfill('0011_dailysales', 'backfill_daily_sales')
+        run_backfill('0012_item_sales_rollups', 'backfill_item_sales')
+        self.assertEqual(self.snapshot(), before)
+
+    def test_weekly_chart_reads_rollup(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = client.get('/api/charts/daily-chart/')
+        current = response.data['data']['series'][0]
+        self.assertEqual(current['total'], 46.0)
+        self.assertEqual(current['total_quantity'], 5)
+
+
+class WriteQueueTests(TestCase):
+    def test_waiters_get_the_lock_in_arrival_order(self):
+        lock = WriteQueue()
+        order = []
+        lock.acquire()
+        threads = []
+        for number in range(4):
+            thread = threading.Thread(target=lambda n=number: (lock.acquire(), order.append(n), lock.release()))
+            thread.start()
+            while len(lock._waiters) < number + 1:
+                time.sleep(0.001)
+            threads.append(thread)
+        lock.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [0, 1, 2, 3])
+        self.assertEqual(lock.acquired, 5)
+
+    def test_lock_is_reentrant(self):
+        lock = WriteQueue()
+        with lock, lock:
+            self.assertEqual(lock._depth, 2)
+        self.assertIsNone(lock._owner)
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_stock_writes_go_through_the_queue(self):
+        admin, inventory = create_inventory_fixture()
+        acquired = write_queue.acquired
+        stock_in(inventory, 1, admin, 5)
+        self.assertEqual(write_queue.acquired, acquired + 1)
+
+
+class StockContentionTests(TransactionTestCase):
+    def test_concurrent_updates_are_not_lost(self):
+        admin, inventory = create_inventory_fixture(capacity=60, quantity=30)
+
+        result = run_contention(inventory, admin, threads=6, operations=40)
+
+        inventory.refresh_from_db()
+        block = Block.objects.get(pk=inventory.block_id)
+        self.assertEqual(result["succeeded"] + result["rejected"], 6 * 40)
+        self.assertEqual(inventory.current_quantity, 30 + result["net"])
+        self.assertEqual(block.used_capacity, 30 + result["net"])
+        self.assertGreater(result["ops_per_second"], 0)
+
+
+class DashboardTests(TransactionTestCase):
+    def setUp(self):
+        self.admin, self.inventory = create_inventory_fixture()
+        customer = create_customer(self.admin)
+        place_order(self.admin, self.admin, customer, [
+            {'inventory_id': self.inventory.id, 'quantity': 2, 'selling_price': 8},
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        access = str(AccessToken.for_user(self.admin))
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+    def test_bundle_matches_the_widget_endpoints(self):
+        response = self.client.get('/api/dashboard/', {'window': '7d'}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(list(data), list(analytics.WIDGETS))
+        self.assertEqual(data['summary'], self.client.get('/api/inventory-management/summary/').json())
+        self.assertEqual(
+            data['top_selling_products'],
+            self.client.get('/api/charts/top-selling-products/', {'window': '7d'}).json()['data'],
+        )
+        self.assertEqual(data['block_profit'], self.client.get('/api/charts/block-pie-chart/').json()['data'])
+        self.assertEqual(data['weekly_sales'], self.client.get('/api/charts/daily-chart/').json()['data'])
+        self.assertEqual(data['item_wise_profit'], self.client.get('/api/item-wise-profit/').json())
+
+    def test_widgets_are_selectable_and_validated(self):
+        response = self.client.get('/api/dashboard/', {'widgets': 'weekly_sales,summary'}, **self.headers)
+        self.assertEqual(list(response.json()['data']), ['weekly_sales', 'summary'])
+        self.assertEqual(self.client.get('/api/dashboard/', {'widgets': 'nope'}, **self.headers).status_code, 400)
+        response = self.client.get('/api/dashboard/', {'widgets': 'top_selling_products', 'k': 0}, **self.headers)
+        self.assertEqual(response.json()['errors'], {'widget': 'top_selling_products'})
+        self.assertEqual(APIClient().get('/api/dashboard/').status_code, 401)
+
+    async def test_served_under_asgi(self):
+        response = await self.async_client.get(
+            '/api/dashboard/', {'widgets': 'summary'}, headers={'Authorization': self.headers['HTTP_AUTHORIZATION']},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['summary']['total_sold'], 2)
+
+    @override_settings(DASHBOARD_CONCURRENT=True)
+    def test_widgets_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(owner):
+            barrier.wait()
+            return owner.id
+
+        widget = analytics.Widget(meet, analytics.no_parameters)
+        with mock.patch.dict(analytics.WIDGETS, {'a': widget, 'b': widget}, clear=True):
+            response = self.client.get('/api/dashboard/', **self.headers)
+        self.assertEqual(response.json()['data'], {'a': self.admin.id, 'b': self.admin.id})
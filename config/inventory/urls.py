@@ -5,6 +5,8 @@ from .views.inventorymanagement import *
 from .views.commanapi import *
 from django.urls import path
 from .views.adminapi import *
+from .views.dashboard import DashboardAPIView
+from .views.jobs import JobAPIView, JobDownloadAPIView
 
 
 urlpatterns = [
@@ -21,10 +23,12 @@ urlpatterns = [
     
     path('inventory-management/create-inventory/',CreateInventoryAPIView.as_view()),
     path('inventory-management/update-inventory/',UpdateInventoryAPIView.as_view()),
+    path('inventory-management/bulk-stock-in/',BulkStockInAPIView.as_view(),name='bulk-stock-in'),
     path('inventory-management/product-wise-total/', ProductWiseQuantityAPIView.as_view(), name='product_wise_total'),
     path('inventory-management/total-quantity/', TotalAllProductsQuantityAPIView.as_view(), name='total_all_products_quantity'),
     path('inventory-management/create-order/',CreateOrderAPIView.as_view(),name="create-order"),
     path('inventory-management/orders-list/',OrderListAPIView.as_view()),
+    path('inventory-management/orders/<str:order_id>/',CreateOrderAPIView.as_view(),name='order-detail'),
     path('inventory-management/stock-out/', InventoryTransferAPIView.as_view(), name='stock-out'),
     path('inventory-management/customers/', CustomerListAPIView.as_view(), name='customer-list'),
     path('inventory-management/summary/', InventorySummaryAPIView.as_view(), name='inventory_summary'),
@@ -32,6 +36,7 @@ urlpatterns = [
     
     path('charts/block-pie-chart/',BlockWiseProfitAPIView.as_view(),name='Block-pie-chart'),
     path('charts/daily-chart/',WeeklySalesChartAPIView.as_view(),name='daily-chart'),
+    path('dashboard/', DashboardAPIView.as_view(), name='dashboard'),
 
     path('categories/listview/', CategoryAPIView.as_view(), name='category-list'),
     path('categories/create/', CategoryAPIView.as_view(), name='category-create'),
@@ -45,6 +50,7 @@ urlpatterns = [
     path('items/update/<int:pk>/', ItemAPIView.as_view(), name='item-update'),
     path('items/delete/<int:pk>/', ItemAPIView.as_view(), name='item-delete'),
     path('items/detail/<int:pk>/', ItemDetailAPIView.as_view(), name='item-detail'),
+    path('items/import/', CatalogImportAPIView.as_view(), name='item-import'),
     path('employee/listview/', EmployeeListAPIView.as_view(), name='user-list'),
     path('employee/create/', EmployeeCreateAPIView.as_view(), name='user-create'),
     path('employee/update/<int:pk>/', EmployeeUpdateAPIView.as_view(), name='user-update'),
@@ -60,6 +66,10 @@ urlpatterns = [
     path('blocks/update/<int:pk>/', BlockAPIView.as_view(),name='block-update'),
     path('blocks/delete/<int:pk>/', BlockAPIView.as_view(),name='block-delete'),
     path('block-items/<int:block_id>/',ItemsInBlockAPIView.as_view(),name='block-items'),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
+    path('jobs/', JobAPIView.as_view(), name='job-list'),
+    path('jobs/<int:pk>/', JobAPIView.as_view(), name='job-detail'),
+    path('jobs/<int:pk>/download/', JobDownloadAPIView.as_view(), name='job-download'),
     
 
 ]
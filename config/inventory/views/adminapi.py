@@ -5,6 +5,15 @@ from ..models import Category
 from ..serializers import *
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from ..pagination import paginate, InvalidCursor
+from ..cache import cached_catalog
+from ..conditional import conditional
+from ..metrics import CanScrapeMetrics, render_prometheus
+from ..catalog_import import ON_CONFLICT, ImportFormatError, check_upload, guess_format, import_catalog
+from ..jobs import enqueue
+from ..models import job_output_storage
+from django.conf import settings
+from django.http import HttpResponse
 
 class CategoryAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -16,10 +25,16 @@ class CategoryAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @cached_catalog('categories')
+    @conditional(Category)
     def get(self, request):
         categories = Category.objects.filter(owner=request.user.effective_admin)
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        try:
+            page = paginate(request, categories, ('id',))
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CategorySerializer(page.rows, many=True)
+        return Response(page.envelope(serializer.data))
 
     def put(self, request, pk):
         category = get_object_or_404(Category, pk=pk,owner=request.user.effective_admin)
@@ -39,28 +54,39 @@ class CategoryAPIView(APIView):
 
 
 class CategoryListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    @cached_catalog('categories')
+    @conditional(Category)
     def get(self, request):
-        categories = Category.objects.all()
+        categories = Category.objects.filter(owner=request.user.effective_admin)
         serializer = CategoryListSerializer(categories, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class ItemAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated]
     def post(self, request):
-        print("Logged-in user:", request.user)
-        print("User type:", request.user.user_type)
-        print("Effective admin:", request.user.effective_admin)
         serializer = ItemSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(owner=request.user.effective_admin)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @cached_catalog('items')
+    @conditional(Item)
     def get(self, request):
         items = Item.objects.filter(owner=request.user.effective_admin)
-        serializer = ItemSerializer(items, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('category_id'):
+            try:
+                items = items.filter(category_id=int(request.query_params['category_id']))
+            except ValueError:
+                return Response({"error": "category_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = paginate(request, items, ('id',))
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ItemSerializer(page.rows, many=True)
+        return Response(page.envelope(serializer.data))
 
     def put(self, request, pk):
         item = get_object_or_404(Item, pk=pk,owner=request.user.effective_admin)
@@ -83,6 +109,7 @@ class ItemAPIView(APIView):
 
 class ItemDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    @conditional(Item)
     def get(self, request, pk):
         item = get_object_or_404(Item, pk=pk,owner=request.user.effective_admin)
         serializer = ItemSerializer(item)
@@ -91,16 +118,63 @@ class ItemDetailAPIView(APIView):
 
 class ItemByCategoryAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    @cached_catalog('items')
     def get(self, request):
         category_id = request.query_params.get('category_id')
         if not category_id:
             return Response({"error": "category_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        items = Item.objects.filter(category_id=category_id)
+        try:
+            items = Item.objects.filter(owner=request.user.effective_admin, category_id=int(category_id))
+        except ValueError:
+            return Response({"error": "category_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
         serializer = ItemShortSerializer(items, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class CatalogImportAPIView(APIView):
+    """
+    Create or update many items at once from an uploaded CSV or JSON Lines
+    file (`file`), with columns sku, name, category, unit_price and
+    selling_price. Categories are matched by name and created when missing.
+    Large uploads, or any with ?async=true, are imported by a job.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload the catalog as 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+        # Not ?format=, which DRF keeps for choosing the response renderer.
+        format = request.query_params.get('file_format') or guess_format(upload.name)
+        if format is None:
+            return Response(
+                {"error": "Pass ?file_format=csv or ?file_format=jsonl"}, status=status.HTTP_400_BAD_REQUEST,
+            )
+        on_conflict = request.query_params.get('on_conflict', 'update')
+        if on_conflict not in ON_CONFLICT:
+            return Response(
+                {"error": f"on_conflict must be one of {', '.join(ON_CONFLICT)}"}, status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            check_upload(upload, format)
+        except ImportFormatError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = request.user.effective_admin
+        if request.query_params.get('async') == 'true' or upload.size > settings.CATALOG_IMPORT_SYNC_MAX_BYTES:
+            name = job_output_storage().save(f"imports/{owner.id}/{upload.name}", upload)
+            job = enqueue(
+                'catalog_import', {'upload': name, 'format': format, 'on_conflict': on_conflict},
+                owner=owner, max_attempts=1,
+            )
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        summary = import_catalog(upload, format, owner, on_conflict=on_conflict)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
 
 
 class EmployeeCreateAPIView(APIView):
@@ -118,9 +192,13 @@ class EmployeeCreateAPIView(APIView):
 class EmployeeListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        users = CustomUser.objects.filter(user_type="employee")
-        serializer = CustomUserSerializer(users, many=True)
-        return Response(serializer.data)
+        users = CustomUser.objects.filter(user_type="employee", admin_owner=request.user.effective_admin)
+        try:
+            page = paginate(request, users, ('id',))
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CustomUserSerializer(page.rows, many=True)
+        return Response(page.envelope(serializer.data))
 
 
 class EmployeeUpdateAPIView(APIView):
@@ -156,8 +234,14 @@ class EmployeeDetailAPIView(APIView):
 
 
 class WareHouseLocationAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
-    def get(self, request):
+    permission_classes = [IsAuthenticated]
+    @cached_catalog('warehouses')
+    @conditional(WareHouseLocation)
+    def get(self, request, pk=None):
+        if pk is not None:
+            warehouse = get_object_or_404(WareHouseLocation, pk=pk,owner=request.user.effective_admin)
+            serializer = WareHouseLocationSerializer(warehouse)
+            return Response(serializer.data)
         warehouses = WareHouseLocation.objects.filter(owner=request.user.effective_admin)
         serializer = WareHouseLocationSerializer(warehouses, many=True)
         return Response(serializer.data)
@@ -173,13 +257,6 @@ class WareHouseLocationAPIView(APIView):
 
 
 
-    def get(self, request, pk):
-        warehouse = get_object_or_404(WareHouseLocation, pk=pk,owner=request.user.effective_admin)
-        serializer = WareHouseLocationSerializer(warehouse)
-        return Response(serializer.data)
-
-
-
     def put(self, request, pk):
         warehouse = get_object_or_404(WareHouseLocation, pk=pk,owner=request.user.effective_admin)
         serializer = WareHouseLocationSerializer(warehouse, data=request.data)
@@ -192,7 +269,7 @@ class WareHouseLocationAPIView(APIView):
 
 
     def delete(self, request, pk):
-        warehouse = get_object_or_404(WareHouseLocation, pk=pk)
+        warehouse = get_object_or_404(WareHouseLocation, pk=pk,owner=request.user.effective_admin)
         warehouse.delete()
         return Response({"msg":"warehouse deleted successfully"},status=status.HTTP_204_NO_CONTENT)
 
@@ -200,7 +277,7 @@ class WareHouseLocationAPIView(APIView):
 
 
 class BlockAPIView(APIView):
-    # permission_classes = [IsAuthenticated]    
+    permission_classes = [IsAuthenticated]
     def post(self, request):
         serializer = BlockSerializer(data=request.data)
         if serializer.is_valid():
@@ -209,10 +286,20 @@ class BlockAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+    @conditional(Block, owner_field='warehouse__owner')
     def get(self, request):
-        blocks = Block.objects.all()
-        serializer = BlockSerializer(blocks, many=True)
-        return Response(serializer.data)
+        blocks = Block.objects.filter(warehouse__owner=request.user.effective_admin)
+        if request.query_params.get('warehouse_id'):
+            try:
+                blocks = blocks.filter(warehouse_id=int(request.query_params['warehouse_id']))
+            except ValueError:
+                return Response({"error": "warehouse_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = paginate(request, blocks, ('id',))
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = BlockSerializer(page.rows, many=True)
+        return Response(page.envelope(serializer.data))
 
 
     def put(self, request, pk):
@@ -228,3 +315,9 @@ class BlockAPIView(APIView):
         block = get_object_or_404(Block, pk=pk)
         block.delete()
         return Response({"msg": "Block deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsAPIView(APIView):
+    permission_classes = [CanScrapeMetrics]
+    def get(self, request):
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
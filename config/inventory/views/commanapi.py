@@ -1,13 +1,13 @@
-from django.shortcuts import render
-from ..serializers import SignupSerializer,UserSerializer
+from ..serializers import SignupSerializer
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from django.contrib.auth import authenticate
+from ..analytics import category_wise_profit, item_wise_profit
+from ..authentication import TenantRefreshToken
+from ..routers import replica_reads
 from ..utils import success, error
 from ..models import *
-from django.db.models import Sum
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -25,7 +25,7 @@ class SignupAPIView(APIView):
         serializer = SignupSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = TenantRefreshToken.for_user(user)
 
             data = {
                 "user": {
@@ -58,7 +58,7 @@ class LoginAPIView(APIView):
             if not user.is_active:
                 return error("Account is inactive", status_code=status.HTTP_403_FORBIDDEN)
 
-            refresh = RefreshToken.for_user(user)
+            refresh = TenantRefreshToken.for_user(user)
 
             data = {
                 "user": {
@@ -79,42 +79,15 @@ class LoginAPIView(APIView):
 
 class OverallItemWiseProfitAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    @replica_reads
     def get(self, request):
-       
-        qs = ProfitLossReport.objects.values(
-            'item__name'
-        ).annotate(
-            total_profit=Sum('profit')
-        ).filter(total_profit__gte=0).order_by('item__name')
-
-        
-        data = [
-            {
-                "item": entry['item__name'],
-                "profit": float(entry['total_profit'] or 0)
-            }
-            for entry in qs
-        ]
-
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(item_wise_profit(request.user.effective_admin), status=status.HTTP_200_OK)
 
 
 
 
 class CategoryWiseProfitAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    @replica_reads
     def get(self, request):
-        qs = ProfitLossReport.objects.values(
-            'inventory__item__category__name'
-        ).annotate(
-            total_profit=Sum('profit')
-        ).filter(total_profit__gte=0).order_by('inventory__item__category__name')
-
-        data = [
-            {
-                "category": entry['inventory__item__category__name'],
-                "profit": float(entry['total_profit'] or 0)
-            }
-            for entry in qs
-        ]
-        return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(category_wise_profit(request.user.effective_admin), status=status.HTTP_200_OK)
\ No newline at end of file
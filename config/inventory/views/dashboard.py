@@ -0,0 +1,107 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .. import analytics
+from ..routers import choose_replica, reads_from
+
+
+def _json(body, status_code=status.HTTP_200_OK):
+    # DRF's encoder, so decimals and dates render as on the widgets' own endpoints.
+    return JsonResponse(body, status=status_code, encoder=JSONEncoder)
+
+
+def _error(message, errors=None, status_code=status.HTTP_400_BAD_REQUEST):
+    return _json({"success": False, "message": message, "errors": errors}, status_code)
+
+
+def _authenticate(request):
+    """
+    The caller's tenant admin, authenticated the way the APIViews are, and
+    the replica its reads should use (None for the primary).
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    user = drf_request.user
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return user.effective_admin, choose_replica(user.effective_admin)
+
+
+def _concurrent():
+    # SQLite runs queries inside this process, so on one interpreter the
+    # threads would only take turns; a database server can work on them at once.
+    concurrent = getattr(settings, 'DASHBOARD_CONCURRENT', None)
+    return connection.vendor != 'sqlite' if concurrent is None else concurrent
+
+
+def _run_widgets(calls):
+    return [function(owner, **kwargs) for function, owner, kwargs in calls]
+
+
+def _run_widgets_apart(calls):
+    # Runs on a worker thread with its own connection; release it the way
+    # the end of a request would.
+    try:
+        return _run_widgets(calls)
+    finally:
+        close_old_connections()
+
+
+class DashboardAPIView(View):
+    """
+    Every dashboard widget in one response, computed concurrently.
+
+    ?widgets=summary,weekly_sales picks widgets (all by default); the other
+    query parameters are those of the widgets' own endpoints (window and k
+    for top_selling_products, start and end for block_profit). Each widget
+    runs on its own thread and database connection, so the response takes
+    about as long as the slowest widget. On SQLite, or with
+    DASHBOARD_CONCURRENT = False, they run one after another on the
+    request's thread and connection instead. Served natively under ASGI; under WSGI Django
+    runs it in an event loop per request. Reads go to a replica like
+    @replica_reads handlers'.
+    """
+
+    async def get(self, request):
+        try:
+            owner, replica = await sync_to_async(_authenticate)(request)
+        except exceptions.APIException as exc:
+            return _json({"detail": exc.detail}, exc.status_code)
+
+        names = [name for value in request.GET.getlist('widgets') for name in value.split(',') if name]
+        names = list(dict.fromkeys(names)) or list(analytics.WIDGETS)
+        unknown = [name for name in names if name not in analytics.WIDGETS]
+        if unknown:
+            return _error(f"Unknown widgets: {', '.join(unknown)}. Choose from: {', '.join(analytics.WIDGETS)}")
+
+        calls = []
+        for name in names:
+            widget = analytics.WIDGETS[name]
+            try:
+                kwargs = widget.parse(request.GET)
+            except ValueError as exc:
+                return _error(str(exc), {"widget": name})
+            calls.append((widget.function, owner, kwargs))
+
+        # The worker threads inherit this context, and with it the replica.
+        with reads_from(replica):
+            if _concurrent():
+                batches = await asyncio.gather(*(
+                    sync_to_async(_run_widgets_apart, thread_sensitive=False)([call]) for call in calls
+                ))
+                results = [result for batch in batches for result in batch]
+            else:
+                results = await sync_to_async(_run_widgets)(calls)
+        return _json({
+            "success": True,
+            "message": "Dashboard fetched successfully",
+            "data": dict(zip(names, results)),
+        })
@@ -1,9 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from ..authentication import TenantRefreshToken
 from ..utils import success, error
 from ..models import CustomUser
 from ..serializers import SignupSerializer,UserSerializer
+from ..pagination import paginate, InvalidCursor
 class EmployeeSignupAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -20,7 +21,7 @@ class EmployeeSignupAPIView(APIView):
         serializer = SignupSerializer(data=data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = TenantRefreshToken.for_user(user)
 
             data = {
                 "user": {
@@ -36,15 +37,22 @@ class EmployeeSignupAPIView(APIView):
         return error("Signup failed", serializer.errors)
 
 class EmployeeListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, id=None):
+        admin_user = request.user.effective_admin
         if id:
             try:
-                user = CustomUser.objects.get(id=id, user_type=CustomUser.UserType.EMPLOYEE)
+                user = CustomUser.objects.get(id=id, user_type=CustomUser.UserType.EMPLOYEE, admin_owner=admin_user)
                 serializer = UserSerializer(user)
                 return success("Employee fetched successfully", serializer.data)
             except CustomUser.DoesNotExist:
                 return error("Employee not found", status_code=404)
         else:
-            employees = CustomUser.objects.filter(user_type=CustomUser.UserType.EMPLOYEE)
-            serializer = UserSerializer(employees, many=True)
-            return success("Employees fetched successfully", serializer.data)
+            employees = CustomUser.objects.filter(user_type=CustomUser.UserType.EMPLOYEE, admin_owner=admin_user)
+            try:
+                page = paginate(request, employees, ('id',))
+            except InvalidCursor as exc:
+                return error(str(exc))
+            serializer = UserSerializer(page.rows, many=True)
+            return success("Employees fetched successfully", page.envelope(serializer.data))
@@ -1,4 +1,3 @@
-from django.shortcuts import render
 from ..serializers import *
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -7,71 +6,61 @@ from ..utils import success, error
 from ..models import *
 from rest_framework.response import Response
 from django.utils import timezone
-from django.utils.timezone import now, timedelta
-from django.db.models.functions import TruncDate
-from django.db.models import F, Sum, DecimalField, ExpressionWrapper
-from django.db import transaction
-from django.utils.crypto import get_random_string
+from django.db.models.functions import Coalesce
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
-import csv
-import os
-from django.utils.timezone import now
 from django.conf import settings
-from decimal import Decimal
-from django.db.models import Sum, F, DecimalField
-import calendar
+from datetime import date
+from django.http import StreamingHttpResponse
+from ..stock import bulk_stock_in, create_inventory, stock_in, stock_out, StockError
+from ..idempotency import idempotent
+from ..orders import place_order
+from ..reports import day_bounds, iter_csv, profit_loss_rows
+from ..analytics import (
+    block_profit_share, inventory_summary, parse_date_range, parse_top_sellers, top_selling_products,
+    weekly_sales,
+)
+from ..pagination import paginate, InvalidCursor
+from ..readers import BlockInventoryItemReader, CustomerReader, OrderReader, InvalidFields
+from ..placement import suggest_placement
+from ..conditional import conditional
+from ..jobs import enqueue
+from ..routers import replica_reads
 
 class InventoryCheckAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
-        item_id = request.data.get('item_id')
-        quantity = int(request.data.get('quantity', 0))
-        
-        if not item_id or quantity <= 0:
-            return error("Invalid Input", status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            item = Item.objects.get(id=item_id)
-        except Item.DoesNotExist:
-            return error("Item not found", status.HTTP_404_NOT_FOUND)
-        
-        suggestions = []
-        remaining_quantity = quantity
-
-        blocks = Block.objects.all()
-
-        for block in blocks:
-            available_capacity = block.item_capacity - block.used_capacity
-
-            if available_capacity <= 0:
-                continue  # Block is full
-
-            if available_capacity >= remaining_quantity:
-                suggestions.append({
-                    "block_id": block.id,
-                    "block_name": block.name,
-                    "available_space": available_capacity,
-                    "can_store": remaining_quantity
-                })
-                remaining_quantity = 0
-                break
-            else:
-                suggestions.append({
-                    "block_id": block.id,
-                    "block_name": block.name,
-                    "available_space": available_capacity,
-                    "can_store": available_capacity
-                })
-                remaining_quantity -= available_capacity
+        serializer = InventoryCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return error("Invalid input", serializer.errors)
+        item_id = serializer.validated_data['item_id']
+        quantity = serializer.validated_data['quantity']
+        strategy = serializer.validated_data['strategy']
+        warehouse_id = serializer.validated_data.get('warehouse_id')
+
+        admin_user = request.user.effective_admin
+
+        if not Item.objects.filter(id=item_id, owner=admin_user).exists():
+            return error("Item not found", status_code=status.HTTP_404_NOT_FOUND)
+
+        if warehouse_id is not None and not WareHouseLocation.objects.filter(id=warehouse_id, owner=admin_user).exists():
+            return error("warehouse_id is not one of your warehouses")
+
+        suggestions, remaining_quantity = suggest_placement(
+            admin_user, quantity, strategy=strategy, warehouse_id=warehouse_id
+        )
 
         if remaining_quantity > 0:
             return error("Not enough space to store all items", status.HTTP_400_BAD_REQUEST)
-        
+
         return Response({
             "total_required_quantity": quantity,
+            "strategy": strategy,
             "suggestions": suggestions
         }, status=status.HTTP_200_OK)
-    
-    
+
+
 class CreateInventoryAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -83,42 +72,27 @@ class CreateInventoryAPIView(APIView):
         item_id = serializer.validated_data['item_id']
         block_id = serializer.validated_data['block_id']
         quantity = serializer.validated_data['quantity']
+        admin_user = request.user.effective_admin
 
         try:
-            item = Item.objects.get(id=item_id)
+            item = Item.objects.get(id=item_id, owner=admin_user)
         except Item.DoesNotExist:
-            return error("Item not found", status.HTTP_404_NOT_FOUND)
+            return error("Item not found", status_code=status.HTTP_404_NOT_FOUND)
 
         try:
-            block = Block.objects.get(id=block_id)
+            block = Block.objects.get(id=block_id, warehouse__owner=admin_user)
         except Block.DoesNotExist:
-            return error("Block not found", status.HTTP_404_NOT_FOUND)
+            return error("Block not found", status_code=status.HTTP_404_NOT_FOUND)
 
         if Inventory.objects.filter(item=item, block=block).exists():
             return error("Inventory for this item and block already exists")
 
-        if block.available_capacity() < quantity:
-            return error("Not enough block capacity")
-
-        user = CustomUser.objects.get(id=2)  # request.user if using auth
-
-        with transaction.atomic():
-            inventory = Inventory.objects.create(
-                item=item,
-                block=block,
-                current_quantity=quantity
-            )
-            block.used_capacity += quantity
-            block.save()
-
-            StockIn.objects.create(
-                inventory=inventory,
-                quantity=quantity,
-                cost_price=item.unit_price,
-                added_by=user
-            )
+        try:
+            create_inventory(item, block, quantity, request.user)
+        except StockError as exc:
+            return error(exc.message, exc.errors, status_code=exc.status_code)
 
-        return success("Inventory created successfully", status.HTTP_201_CREATED)
+        return success("Inventory created successfully", status_code=status.HTTP_201_CREATED)
 
 
 class UpdateInventoryAPIView(APIView):
@@ -134,67 +108,76 @@ class UpdateInventoryAPIView(APIView):
         quantity = serializer.validated_data['quantity']
 
         try:
-            item = Item.objects.get(id=item_id)
-        except Item.DoesNotExist:
-            return error("Item not found", status.HTTP_404_NOT_FOUND)
-
-        try:
-            block = Block.objects.get(id=block_id)
-        except Block.DoesNotExist:
-            return error("Block not found", status.HTTP_404_NOT_FOUND)
+            inventory = Inventory.objects.select_related('item').get(
+                item_id=item_id,
+                block_id=block_id,
+                item__owner=request.user.effective_admin
+            )
+        except Inventory.DoesNotExist:
+            return error("Inventory does not exist, please create it first", status_code=status.HTTP_404_NOT_FOUND)
 
         try:
-            inventory = Inventory.objects.get(item=item, block=block)
-        except Inventory.DoesNotExist:
-            return error("Inventory does not exist, please create it first", status.HTTP_404_NOT_FOUND)
+            stock_in(inventory, quantity, request.user, inventory.item.unit_price)
+        except StockError as exc:
+            return error(exc.message, exc.errors, status_code=exc.status_code)
 
-        if block.available_capacity() < quantity:
-            return error("Not enough available capacity in block")
+        return success("Inventory quantity updated successfully")
 
-        user = CustomUser.objects.get(id=2)  # request.user
 
-        with transaction.atomic():
-            inventory.current_quantity += quantity
-            inventory.save()
+class BulkStockInAPIView(APIView):
+    permission_classes = [IsAuthenticated]
 
-            block.used_capacity += quantity
-            block.save()
+    def post(self, request):
+        serializer = BulkStockInSerializer(data=request.data)
+        if not serializer.is_valid():
+            return error("Invalid input", serializer.errors)
 
-            StockIn.objects.create(
-                inventory=inventory,
-                quantity=quantity,
-                cost_price=item.unit_price,
-                added_by=user
+        try:
+            result = bulk_stock_in(
+                request.user.effective_admin,
+                request.user,
+                serializer.validated_data['items']
             )
+        except StockError as exc:
+            return error(exc.message, exc.errors, status_code=exc.status_code)
 
-        return success("Inventory quantity updated successfully", status.HTTP_200_OK)
+        return success("Stock received successfully", data=result, status_code=status.HTTP_201_CREATED)
 
 
 class ProductWiseQuantityAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
-    def get(self, request):
-        items = Item.objects.all()
-        data = []
+    permission_classes = [IsAuthenticated]
 
-        for item in items:
-            total_quantity = Inventory.objects.filter(item=item).aggregate(
-                total=Sum('current_quantity')
-            )['total'] or 0
+    @replica_reads
+    def get(self, request):
+        items = Item.objects.filter(owner=request.user.effective_admin).values(
+            'id', 'name', total=Coalesce('stock_total__total_quantity', 0)
+        )
+        try:
+            page = paginate(request, items, ('id',))
+        except InvalidCursor as exc:
+            return error(str(exc))
 
-            data.append({
-                "item_id": item.id,
-                "item_name": item.name,
-                "total_quantity": total_quantity
-            })
+        data = page.envelope([
+            {
+                "item_id": row['id'],
+                "item_name": row['name'],
+                "total_quantity": row['total']
+            }
+            for row in page.rows
+        ])
 
         return success("Product-wise quantity retrieved successfully", data=data)
     
 class TotalAllProductsQuantityAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated]
+
+    @replica_reads
     def get(self, request):
-        total_quantity = Inventory.objects.aggregate(
-            total=Sum('current_quantity')
-        )['total'] or 0
+        total_quantity = (
+            OwnerLedger.objects.filter(owner=request.user.effective_admin)
+            .values_list('on_hand', flat=True)
+            .first()
+        ) or 0
 
         return success(
             "Total quantity of all products retrieved successfully",
@@ -205,6 +188,8 @@ class TotalAllProductsQuantityAPIView(APIView):
 
 class CreateOrderAPIView(APIView):
     permission_classes = [IsAuthenticated]
+
+    @idempotent
     def post(self, request):
         serializer = OrderCreateSerializer(data=request.data)
         if not serializer.is_valid():
@@ -226,57 +211,24 @@ class CreateOrderAPIView(APIView):
             }
         )
 
-        with transaction.atomic():
-            
-            order_id = get_random_string(length=8).upper()
-            order = Order.objects.create(
-                order_id=order_id,
-                customer=customer,
-                status='confirmed',
-                owner=admin_user  
+        try:
+            order, _ = place_order(
+                admin_user,
+                request.user if request.user.is_authenticated else None,
+                customer,
+                items_data
             )
+        except StockError as exc:
+            return error(exc.message, exc.errors, status_code=exc.status_code)
 
-            for item_data in items_data:
-                inventory_id = item_data['inventory_id']
-                quantity = item_data['quantity']
-                selling_price = item_data['selling_price']
-
-                try:
-                    inventory = Inventory.objects.select_for_update().get(id=inventory_id)
-                except Inventory.DoesNotExist:
-                    transaction.set_rollback(True)
-                    return error(f"Inventory ID {inventory_id} not found", status_code=status.HTTP_404_NOT_FOUND)
-
-                if inventory.current_quantity < quantity:
-                    transaction.set_rollback(True)
-                    return error(f"Insufficient stock for {inventory.item.name}")
-
-                
-                inventory.current_quantity -= quantity
-                inventory.save()
-
-               
-                OrderItem.objects.create(
-                    order=order,
-                    inventory=inventory,
-                    item=inventory.item,
-                    quantity=quantity,
-                    selling_price=selling_price
-                )
-
-                
-                StockOut.objects.create(
-                    inventory=inventory,
-                    quantity=quantity,
-                    reason='sale',
-                    removed_by=request.user if request.user.is_authenticated else None
-                )
-
-            return success("Order placed successfully", data={"order_id": order.order_id}, status_code=status.HTTP_201_CREATED)
-        
+        return success("Order placed successfully", data={"order_id": order.order_id}, status_code=status.HTTP_201_CREATED)
+
+    @conditional(Order, related=('customer', 'items', 'items__item'))
     def get(self, request, order_id):
         try:
-            order = Order.objects.get(order_id=order_id)
+            order = Order.objects.select_related('customer').prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('item'))
+            ).get(order_id=order_id, owner=request.user.effective_admin)
         except Order.DoesNotExist:
             return error("Order not found", status_code=status.HTTP_404_NOT_FOUND)
 
@@ -285,7 +237,8 @@ class CreateOrderAPIView(APIView):
 
 
 class InventoryTransferAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         serializer = StockOutSerializer(data=request.data)
         if not serializer.is_valid():
@@ -295,334 +248,180 @@ class InventoryTransferAPIView(APIView):
         quantity = serializer.validated_data["quantity"]
         reason = serializer.validated_data["reason"]
 
-       
         try:
-            inventory = Inventory.objects.get(id=inventory_id)
+            inventory = Inventory.objects.select_related('item').get(
+                id=inventory_id, item__owner=request.user.effective_admin
+            )
         except Inventory.DoesNotExist:
             return error("Inventory not found", status_code=status.HTTP_404_NOT_FOUND)
 
-        
-        if inventory.current_quantity < quantity:
-            return error(
-                f"Not enough stock. Available: {inventory.current_quantity}"
-            )
-
-        inventory.current_quantity -= quantity
-        inventory.save()
-
-      
-        StockOut.objects.create(
-            inventory=inventory,
-            quantity=quantity,
-            reason=reason,
-            date=timezone.now(),
-            removed_by=request.user
-        )
+        try:
+            stock_out(inventory, quantity, reason, request.user)
+        except StockError as exc:
+            return error(exc.message, exc.errors, status_code=exc.status_code)
 
-        
         return success(f"{quantity} units removed for reason '{reason}'.")
 
 
 class ItemsInBlockAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, block_id):
-        block = get_object_or_404(Block, id=block_id)
-        inventory_items = Inventory.objects.filter(block=block).select_related('item')
+        block = get_object_or_404(Block, id=block_id, warehouse__owner=request.user.effective_admin)
+        try:
+            reader = BlockInventoryItemReader(request.query_params.get('fields'))
+        except InvalidFields as exc:
+            return error(str(exc))
+        inventory_items = reader.values(Inventory.objects.filter(block=block).order_by('id'))
         block_available=int(block.item_capacity)-int(block.used_capacity)
-        serializer = BlockInventoryItemSerializer(inventory_items, many=True)
         return Response({
             "block_id": block.id,
             "block_name": block.name,
             "block_capacity":block.item_capacity,
             "block_used_capacity":block.used_capacity,
             "block_available_capacity":block_available,
-            "items": serializer.data
+            "items": reader.render(inventory_items)
         }, status=status.HTTP_200_OK)
 
 
 
-def generate_daily_profit_loss_report():
-    today = timezone.now().date()
-
-    unique_item_ids = Inventory.objects.values_list('item', flat=True).distinct()
-
-    for item_id in unique_item_ids:
-        inventories = Inventory.objects.filter(item=item_id)
-
-        
-        stock_in_data = StockIn.objects.filter(
-            inventory__in=inventories,
-            created_at__date=today
-        ).aggregate(
-            total_in=Sum('quantity'),
-            total_cost=Sum(F('quantity') * F('cost_price'), output_field=DecimalField())
-        )
-
-        order_items_data = OrderItem.objects.filter(
-            inventory__in=inventories,
-            date__date=today
-        ).aggregate(
-            total_out=Sum('quantity'),
-            total_revenue=Sum(F('quantity') * F('selling_price'), output_field=DecimalField())
-        )
-
-        total_stock_in = stock_in_data['total_in'] or 0
-        total_stock_out = order_items_data['total_out'] or 0
-        total_cost = stock_in_data['total_cost'] or 0
-        total_revenue = order_items_data['total_revenue'] or 0
-        profit = total_revenue - total_cost
-
-        
-        ProfitLossReport.objects.update_or_create(
-            item_id=item_id,
-            generated_on=today,
-            defaults={
-                'total_stock_in': total_stock_in,
-                'total_stock_out': total_stock_out,
-                'total_cost': total_cost,
-                'total_revenue': total_revenue,
-                'profit': profit
-            }
-        )
-
-    return f"Profit & Loss reports generated for {len(unique_item_ids)} items."
-
-
-
-
 class ExportTodayProfitLossCSVAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         today = timezone.now().date()
-
-        reports = ProfitLossReport.objects.filter(
-            generated_on__date=today
-        ).select_related('item')
-
-        if not reports.exists():
+        try:
+            start_date = date.fromisoformat(request.query_params.get('start', str(today)))
+            end_date = date.fromisoformat(request.query_params.get('end', str(start_date)))
+        except ValueError:
+            return error("start and end must be dates in YYYY-MM-DD format")
+        if end_date < start_date:
+            return error("end must not be before start")
+
+        compress = request.query_params.get('compress') == 'gzip'
+        owner = request.user.effective_admin
+        if request.query_params.get('async') == 'true' or (end_date - start_date).days >= settings.EXPORT_SYNC_MAX_DAYS:
+            job = enqueue('profit_loss_export', {
+                'start': start_date.isoformat(), 'end': end_date.isoformat(), 'compress': compress,
+            }, owner=owner)
+            return success("Export queued", JobSerializer(job).data, status_code=status.HTTP_202_ACCEPTED)
+
+        start, _ = day_bounds(start_date)
+        _, end = day_bounds(end_date)
+
+        if not ProfitLossReport.objects.filter(
+            item__owner=owner, generated_on__gte=start, generated_on__lt=end
+        ).exists():
             return Response(
-                {"error": "No report found for today"},
+                {"error": "No report found for this period"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        file_name = f"profit_loss_report_{today}.csv"
-        report_dir = os.path.join(settings.MEDIA_ROOT, "reports")
-        os.makedirs(report_dir, exist_ok=True)
-        file_path = os.path.join(report_dir, file_name)
-
-        with open(file_path, mode='w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                'Item Name',
-                'Total Stock In', 'Total Stock Out',
-                'Total Cost', 'Total Revenue', 'Profit', 'Generated On'
-            ])
-            for report in reports:
-                writer.writerow([
-                    report.item.name,
-                    report.total_stock_in,
-                    report.total_stock_out,
-                    float(report.total_cost),
-                    float(report.total_revenue),
-                    float(report.profit),
-                    report.generated_on.strftime("%Y-%m-%d")
-                ])
-
-        download_url = f"{settings.MEDIA_URL}reports/{file_name}"
-        full_url = request.build_absolute_uri(download_url)
-
-        return Response({
-            "message": "CSV generated successfully",
-            "download_url": full_url
-        }, status=status.HTTP_200_OK)
+        file_name = f"profit_loss_report_{start_date}" + (f"_{end_date}" if end_date != start_date else "") + ".csv"
+        response = StreamingHttpResponse(
+            iter_csv(profit_loss_rows(owner, start_date, end_date), compress=compress),
+            content_type='application/gzip' if compress else 'text/csv'
+        )
+        if compress:
+            file_name += ".gz"
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
 
 
 class OrderListAPIView(APIView):
     # permission_classes = [IsAuthenticated]
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
+    @conditional(Order, related=('customer', 'items'))
     def get(self, request):
         admin_user = request.user.effective_admin  
-        orders = Order.objects.filter(owner=admin_user).select_related('customer').prefetch_related('items')
-        serializer = OrderListSerializer(orders, many=True)
-        return Response(serializer.data)
+        orders = Order.objects.filter(owner=admin_user)
+
+        params = request.query_params
+        if params.get('status'):
+            orders = orders.filter(status=params['status'])
+        if params.get('customer_id'):
+            try:
+                orders = orders.filter(customer_id=int(params['customer_id']))
+            except ValueError:
+                return error("customer_id must be an integer")
+        try:
+            if params.get('ordered_after'):
+                orders = orders.filter(ordered_at__gte=day_bounds(date.fromisoformat(params['ordered_after']))[0])
+            if params.get('ordered_before'):
+                orders = orders.filter(ordered_at__lt=day_bounds(date.fromisoformat(params['ordered_before']))[1])
+        except ValueError:
+            return error("ordered_after and ordered_before must be dates in YYYY-MM-DD format")
+
+        try:
+            reader = OrderReader(params.get('fields'))
+            page = paginate(request, reader.values(orders, 'id', 'ordered_at'), ('-ordered_at', '-id'))
+        except (InvalidCursor, InvalidFields) as exc:
+            return error(str(exc))
+        return Response(page.envelope(reader.render(page.rows)))
     
 
 class CustomerListAPIView(APIView):
     # permission_classes = [IsAuthenticated]
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         admin_user = request.user.effective_admin
         customers = Customer.objects.filter(owner=admin_user)
-        serializer = CustomerSerializer(customers, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('phone'):
+            customers = customers.filter(customer_phone=request.query_params['phone'])
+        try:
+            reader = CustomerReader(request.query_params.get('fields'))
+            page = paginate(request, reader.values(customers, 'id'), ('id',))
+        except (InvalidCursor, InvalidFields) as exc:
+            return error(str(exc))
+        return Response(page.envelope(reader.render(page.rows)))
     
 
 class InventorySummaryAPIView(APIView):
-    # permission_classes = [IsAuthenticated]
-    def get(self, request):
-        
-        total_stock_in = (
-            Inventory.objects.aggregate(total=Sum('current_quantity'))['total'] or 0
-        )
-
-        
-        total_unsold = total_stock_in
-
-        
-        total_sold = (
-            StockOut.objects.filter(reason='sale')
-            .aggregate(total=Sum('quantity'))['total'] or 0
-        )
-
-       
-        total_damaged = (
-            StockOut.objects.filter(reason='damage')
-            .aggregate(total=Sum('quantity'))['total'] or 0
-        )
-
-        response_data = {
-            "total_items": total_unsold + total_sold, 
-            "total_sold": total_sold,
-            "total_unsold": total_unsold,
-            "total_damaged": total_damaged
-        }
+    permission_classes = [IsAuthenticated]
 
-        return Response(response_data, status=status.HTTP_200_OK)
+    @replica_reads
+    def get(self, request):
+        return Response(inventory_summary(request.user.effective_admin), status=status.HTTP_200_OK)
     
 
 class BlockWiseProfitAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
-        user = request.user.effective_admin  
-        order_items = OrderItem.objects.filter(order__owner=user).annotate(
-            cost_price=F('item__unit_price'),
-            profit=ExpressionWrapper(
-                (F('selling_price') - F('item__unit_price')) * F('quantity'),
-                output_field=DecimalField()
-            )
-        )
-
-        
+        try:
+            dates = parse_date_range(request.query_params)
+        except ValueError as exc:
+            return error(str(exc))
 
-        block_profits = {}
-        for item in order_items:
-            block = getattr(item.inventory, 'block', None)
-            if block:
-                block_name = block.name
-                block_profits[block_name] = block_profits.get(block_name, Decimal('0')) + item.profit
-
-        total_profit = sum(block_profits.values())
-        print(total_profit)
-        print(block_profits)
-       
-        data = []
-        for block_name, profit in block_profits.items():
-            percent = (profit / total_profit * 100) if total_profit > 0 else 0
-            data.append({
-                "block": block_name,
-                "profit": round(profit, 2),
-                "percent": round(percent, 2)
-            })
-
-        return success("Block-wise profit percentage fetched successfully", {
-            "total_profit": round(total_profit, 2),
-            "block_wise_data": data
-        })
+        return success(
+            "Block-wise profit percentage fetched successfully",
+            block_profit_share(request.user.effective_admin, **dates),
+        )
     
 
 class WeeklySalesChartAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
-        user = request.user.effective_admin
-        today = now().date()
-        start_of_week = today - timedelta(days=today.weekday())  
-        start_of_prev_week = start_of_week - timedelta(days=7)
-
-        def get_weekly_data(start_date):
-            end_date = start_date + timedelta(days=6)
-            sales = (
-                OrderItem.objects.filter(order__owner=user, date__date__range=(start_date, end_date))
-                .annotate(
-                    revenue=ExpressionWrapper(
-                        F("selling_price") * F("quantity"), output_field=DecimalField()
-                    )
-                )
-                .annotate(day=TruncDate("date"))
-                .values("day")
-                .annotate(
-                    total=Sum("revenue"),
-                    total_quantity=Sum("quantity")
-                )
-                .order_by("day")
-            )
-
-            daily_map = {sale["day"]: float(sale["total"]) for sale in sales}
-
-            amount_data = []
-            quantity_data = []
-            total_amount = 0
-            total_quantity = 0
-            for i in range(7):
-                day = start_date + timedelta(days=i)
-                day_data = daily_map.get(day, {"amount": 0, "quantity": 0})
-                amount_data.append(day_data["amount"])
-                quantity_data.append(day_data["quantity"])
-                total_amount += day_data["amount"]
-                total_quantity += day_data["quantity"]
-
-        
-        current_week_data, current_week_total = get_weekly_data(start_of_week)
-        prev_week_data, prev_week_total = get_weekly_data(start_of_prev_week)
-
-     
-        categories = list(calendar.day_name)  
-        return success("Weekly sales fetched successfully", {
-            "categories": categories,
-            "series": [
-                {
-                    "name": "Current Week",
-                    "data": current_amount,
-                    "quantity": current_qty,
-                    "total": round(current_total, 2),
-                    "total_quantity": current_total_qty
-                },
-                {
-                    "name": "Previous Week",
-                    "data": prev_amount,
-                    "quantity": prev_qty,
-                    "total": round(prev_total, 2),
-                    "total_quantity": prev_total_qty
-                }
-            ]
-        })
+        return success("Weekly sales fetched successfully", weekly_sales(request.user.effective_admin))
     
 
 class TopSellingProductsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
-        user = request.user.effective_admin
-
-        top_items = (
-            OrderItem.objects
-            .filter(order__owner=user)
-            .values("item__name", "item__sku")
-            .annotate(quantity_sold=Sum("quantity"))
-            .order_by("-quantity_sold")[:5]
-        )
-
-        data = [
-            {
-                "item_name": item["item__name"],
-                "sku": item["item__sku"],
-                "quantity_sold": item["quantity_sold"]
-            }
-            for item in top_items
-        ]
+        try:
+            params = parse_top_sellers(request.query_params)
+        except ValueError as exc:
+            return error(str(exc))
 
-        return success("Top selling products fetched successfully", data)
\ No newline at end of file
+        data = top_selling_products(request.user.effective_admin, **params)
+        return success("Top selling products fetched successfully", data)
@@ -0,0 +1,39 @@
+import os
+
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from ..models import Job
+from ..pagination import InvalidCursor, paginate
+from ..serializers import JobSerializer
+from ..utils import error, success
+
+
+class JobAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk=None):
+        jobs = Job.objects.filter(owner=request.user.effective_admin)
+        if pk is not None:
+            job = get_object_or_404(jobs, pk=pk)
+            return success("Job fetched successfully", JobSerializer(job).data)
+
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'])
+        try:
+            page = paginate(request, jobs, ('-created_at', '-id'))
+        except InvalidCursor as exc:
+            return error(str(exc))
+        return success("Jobs fetched successfully", page.envelope(JobSerializer(page.rows, many=True).data))
+
+
+class JobDownloadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk, owner=request.user.effective_admin)
+        if job.status != Job.Status.SUCCEEDED or not job.output:
+            return error("This job has no output to download", status_code=404)
+        return FileResponse(job.output.open('rb'), as_attachment=True, filename=os.path.basename(job.output.name))
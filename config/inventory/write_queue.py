@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+class WriteQueue:
+    """
+    A re-entrant lock handed to waiters strictly in arrival order.
+
+    SQLite lets one connection write at a time and its busy handler polls,
+    so under load an unlucky writer can keep losing the race until its
+    timeout runs out. Queueing in-process writers here first means each
+    one gets the database lock in turn, and the lock is only ever contended
+    across processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._owner = None
+        self._depth = 0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self._lock:
+            if self._owner == me:
+                self._depth += 1
+                return
+            if self._owner is None and not self._waiters:
+                self._owner, self._depth = me, 1
+                self.acquired += 1
+                return
+            turn = threading.Event()
+            self._waiters.append((me, turn))
+        started = time.perf_counter()
+        # release() makes us the owner before setting the event.
+        turn.wait()
+        with self._lock:
+            self.acquired += 1
+            self.waited_seconds += time.perf_counter() - started
+
+    def release(self):
+        with self._lock:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("WriteQueue released by a thread that does not hold it")
+            self._depth -= 1
+            if self._depth:
+                return
+            if self._waiters:
+                self._owner, turn = self._waiters.popleft()
+                self._depth = 1
+                turn.set()
+            else:
+                self._owner = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+queue = WriteQueue()
+
+
+def _queued(using):
+    return getattr(settings, 'SQLITE_WRITE_QUEUE', False) and connections[using].vendor == 'sqlite'
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() for the stock and order write paths. With
+    SQLITE_WRITE_QUEUE on a SQLite database, the transaction first waits its
+    turn in the process-wide WriteQueue and holds it until it commits or
+    rolls back; otherwise it is a plain atomic block.
+    """
+    if not _queued(using):
+        with transaction.atomic(using=using):
+            yield
+        return
+    with queue, transaction.atomic(using=using):
+        yield